@@ -0,0 +1,87 @@
+"""Measure grid page latency with per-row and joined category lookups.
+
+Builds a throw-away index with ``--models`` LoRAs spread over a few
+categories and times fetching a page of 50, 200 and 1000 rows:
+
+    python benchmarks/bench_grid.py [--models N] [--rounds N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+from loradb.agents.indexing_agent import IndexingAgent
+
+
+def populate(indexer: IndexingAgent, models: int, categories: int = 20) -> None:
+    with indexer.batch():
+        ids = [indexer.create_category(f"Category {i}") for i in range(categories)]
+        for i in range(models):
+            filename = f"model_{i:06d}.safetensors"
+            indexer.add_metadata(
+                {
+                    "filename": filename,
+                    "modelspec.title": f"Model {i}",
+                    "modelspec.architecture": "stable-diffusion-xl-v1-base/lora",
+                    "ss_base_model_version": "sdxl_base_v1-0",
+                }
+            )
+            for cid in ids[i % categories : i % categories + 2]:
+                indexer.assign_category(filename, cid)
+
+
+def per_row(indexer: IndexingAgent, limit: int) -> None:
+    entries = indexer.search("*", limit=limit)
+    for e in entries:
+        e["categories"] = indexer.get_categories_for(e["filename"])
+
+
+def joined(indexer: IndexingAgent, limit: int) -> None:
+    indexer.search("*", limit=limit, with_categories=True)
+
+
+def batched(indexer: IndexingAgent, limit: int) -> None:
+    entries = indexer.search("*", limit=limit)
+    cats = indexer.get_categories_for_many(e["filename"] for e in entries)
+    for e in entries:
+        e["categories"] = cats[e["filename"]]
+
+
+def bench(fn: Callable[[IndexingAgent, int], None], indexer: IndexingAgent, limit: int, rounds: int) -> List[float]:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(indexer, limit)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as td:
+        # Point the upload folder at an empty directory so no reindex runs
+        config.UPLOAD_DIR = Path(td) / "uploads"
+        indexer = IndexingAgent(db_path=Path(td) / "index.db")
+        populate(indexer, args.models)
+        print(f"{args.models} models, {args.rounds} rounds, median page latency")
+        for limit in (50, 200, 1000):
+            for label, fn in [("per-row", per_row), ("joined", joined), ("batched", batched)]:
+                timings = bench(fn, indexer, limit, args.rounds)
+                print(f"{limit:>5} rows {label:>8}: {statistics.median(timings) * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":  # pragma: no cover - script entry
+    main()
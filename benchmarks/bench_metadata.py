@@ -0,0 +1,109 @@
+"""Compare the header-only metadata reader with ``safetensors.safe_open``.
+
+Run with one or more existing ``.safetensors`` files, or without arguments to
+generate a sparse synthetic LoRA of ``--size-mb`` megabytes:
+
+    python benchmarks/bench_metadata.py [FILES...] [--rounds N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loradb.agents.metadata_extractor_agent import MetadataExtractorAgent
+
+
+def make_synthetic(path: Path, size_mb: int, tensors: int = 800) -> None:
+    """Write a sparse safetensors file with ``tensors`` entries."""
+    data_size = size_mb * 1024 * 1024
+    per_tensor = data_size // tensors // 2 * 2
+    header: Dict[str, dict] = {
+        "__metadata__": {
+            "modelspec.title": "synthetic",
+            "ss_tag_frequency": json.dumps({"set": {f"tag{i}": i for i in range(500)}}),
+        }
+    }
+    for i in range(tensors):
+        header[f"lora_unet_block_{i}.weight"] = {
+            "dtype": "F16",
+            "shape": [per_tensor // 2],
+            "data_offsets": [i * per_tensor, (i + 1) * per_tensor],
+        }
+    raw = json.dumps(header).encode()
+    with path.open("wb") as fh:
+        fh.write(struct.pack("<Q", len(raw)))
+        fh.write(raw)
+        fh.truncate(8 + len(raw) + per_tensor * tensors)
+
+
+def safe_open_reader(framework: str) -> Callable[[Path], dict] | None:
+    """Return a reader mirroring the previous ``safe_open`` based path."""
+    modules = {"pt": "torch", "np": "numpy"}
+    try:
+        from safetensors import safe_open
+
+        __import__(modules[framework])
+    except ImportError:
+        return None
+
+    def read(path: Path) -> dict:
+        with safe_open(str(path), framework=framework) as f:
+            return dict(f.metadata() or {})
+
+    return read
+
+
+def bench(fn: Callable[[Path], dict], files: List[Path], rounds: int) -> List[float]:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for path in files:
+            fn(path)
+        timings.append((time.perf_counter() - start) / len(files))
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", type=Path)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--size-mb", type=int, default=1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as td:
+        files = args.files
+        if not files:
+            synthetic = Path(td) / "synthetic.safetensors"
+            make_synthetic(synthetic, args.size_mb)
+            files = [synthetic]
+        total = sum(os.path.getsize(f) for f in files)
+        print(f"{len(files)} file(s), {total / 1024 / 1024:.0f} MB total, {args.rounds} rounds")
+
+        readers = {"header-only": MetadataExtractorAgent().extract}
+        for label, framework in [("safe_open(np)", "np"), ("safe_open(pt)", "pt")]:
+            reader = safe_open_reader(framework)
+            if reader is None:
+                print(f"{label:>16}: skipped (dependency not installed)")
+                continue
+            readers[label] = reader
+        for label, fn in readers.items():
+            timings = bench(fn, files, args.rounds)
+            print(
+                f"{label:>16}: median {statistics.median(timings) * 1e3:8.3f} ms/file, "
+                f"min {min(timings) * 1e3:8.3f} ms/file"
+            )
+
+
+if __name__ == "__main__":  # pragma: no cover - script entry
+    main()
@@ -1,13 +1,26 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
+import logging
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-import shutil
-from typing import Iterable, Dict, List, Optional
+from typing import Callable, Dict, Iterable, List, Optional
 
-from safetensors import safe_open
+import config
+from loradb.agents import IndexingAgent, MetadataExtractorAgent, UploaderAgent
+from loradb.agents.indexing_agent import PREVIEW_EXTENSIONS
+from loradb.agents.uploader_agent import (
+    IMPORT_STRATEGIES,
+    DuplicateContentError,
+    place_file,
+)
 
-from loradb.agents import IndexingAgent, UploaderAgent
+logger = logging.getLogger(__name__)
 
 
 def load_category_map(cat_dir: Path) -> Dict[str, List[str]]:
@@ -30,14 +43,93 @@ def load_category_map(cat_dir: Path) -> Dict[str, List[str]]:
 
 def extract_metadata(path: Path) -> dict[str, str]:
     """Read metadata from a safetensors file without requiring torch."""
-    metadata = {"filename": path.name}
-    try:
-        with safe_open(str(path), framework=None) as f:
-            meta = f.metadata() or {}
-            metadata.update(meta)
-    except Exception as exc:  # pragma: no cover - best effort
-        metadata["error"] = str(exc)
-    return metadata
+    return MetadataExtractorAgent().extract(path)
+
+
+def default_journal(safe_dir: Path) -> Path:
+    """Return the journal location used for imports from ``safe_dir``."""
+    key = hashlib.sha256(str(safe_dir.resolve()).encode()).hexdigest()[:16]
+    return Path(config.DB_PATH).parent / f"bulk_import-{key}.journal"
+
+
+class ImportJournal:
+    """Append-only record of the source files an import has finished.
+
+    Each line is a JSON object with the ``source`` path relative to the
+    import root. Lines are written after the batch they belong to has been
+    committed, so a crashed import skips exactly the finished files when it
+    is started again.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.done: set[str] = set()
+        try:
+            with path.open("r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        self.done.add(json.loads(line)["source"])
+                    except (ValueError, KeyError):
+                        # Torn last line of a crashed run
+                        continue
+        except FileNotFoundError:
+            pass
+
+    def record(self, entries: Iterable[Dict[str, str]]) -> None:
+        entries = list(entries)
+        lines = [json.dumps(e) + "\n" for e in entries]
+        if not lines:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as fh:
+            fh.writelines(lines)
+        self.done.update(e["source"] for e in entries)
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def _previews_for(st_file: Path, safe_dir: Path, img_dir: Path) -> List[Path]:
+    rel = st_file.relative_to(safe_dir).with_suffix("")
+    preview_dir = img_dir / rel
+    if not preview_dir.is_dir():
+        return []
+    return [p for p in sorted(preview_dir.iterdir()) if p.suffix.lower() in PREVIEW_EXTENSIONS]
+
+
+def _copy_previews(
+    st_file: Path, previews: List[Path], upload_dir: Path, strategy: str = "copy"
+) -> List[str]:
+    copied: List[str] = []
+    for index, img in enumerate(previews):
+        if index == 0:
+            dest_name = f"{st_file.stem}{img.suffix.lower()}"
+        else:
+            dest_name = f"{st_file.stem}_{index}{img.suffix.lower()}"
+        dest_path = upload_dir / dest_name
+        counter = 1
+        while dest_path.exists():
+            dest_path = upload_dir / f"{dest_path.stem}_{counter}{dest_path.suffix}"
+            counter += 1
+        place_file(img, dest_path, strategy)
+        copied.append(dest_path.name)
+    return copied
+
+
+def format_progress(stats: Dict[str, float]) -> str:
+    """Return a one line progress bar with throughput and ETA."""
+    done, total = stats["done"], stats["total"]
+    elapsed = stats["elapsed"]
+    rate = done / elapsed if elapsed else 0.0
+    mb_rate = stats["bytes"] / elapsed / 1024**2 if elapsed else 0.0
+    eta = (total - done) / rate if rate else 0.0
+    width = 30
+    filled = int(width * done / total) if total else width
+    return (
+        f"[{'#' * filled}{'-' * (width - filled)}] {done}/{total} "
+        f"{rate:6.1f} files/s {mb_rate:7.1f} MiB/s "
+        f"ETA {int(eta // 60)}m{int(eta % 60):02d}s"
+    )
 
 
 def import_loras(
@@ -46,39 +138,210 @@ def import_loras(
     uploader: UploaderAgent,
     indexer: IndexingAgent,
     category_map: Optional[Dict[str, List[str]]] = None,
-) -> None:
-    """Walk ``safe_dir`` and import all ``.safetensors`` files found."""
-    for st_file in safe_dir.rglob("*.safetensors"):
-        # copy LoRA file
-        with st_file.open("rb") as fh:
-            dest = uploader.save_file(st_file.name, fh)
-        meta = extract_metadata(dest)
-        indexer.add_metadata(meta)
-        if category_map and st_file.name in category_map:
-            for cat in category_map[st_file.name]:
-                cid = indexer.create_category(cat)
-                indexer.assign_category(dest.name, cid)
-
-        # copy associated previews
-        rel = st_file.relative_to(safe_dir).with_suffix("")
-        preview_dir = img_dir / rel
-        if not preview_dir.is_dir():
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    dry_run: bool = False,
+    journal: Optional[Path] = None,
+    progress: Optional[Callable[[Dict[str, float]], None]] = None,
+    strategy: str = "copy",
+) -> Dict[str, float]:
+    """Walk ``safe_dir`` and import all ``.safetensors`` files found.
+
+    A pool of ``workers`` threads stages every file and parses its
+    header while this thread writes the index, categories and previews in
+    one transaction per ``batch_size`` files. Finished files are recorded in
+    ``journal`` (by default next to the database) so an interrupted import
+    continues where it stopped; the journal is removed once everything is
+    imported.
+
+    Files are deduplicated by content like regular uploads. A file identical
+    to an already stored LoRA is not copied; its categories are assigned to
+    the stored LoRA instead and its previews are skipped. Only the first of
+    several files with the same name is imported, and files already stored
+    and indexed under their name are skipped and counted as ``existing``.
+    A stored but unindexed file, left behind by a failed run, is imported
+    again.
+
+    ``strategy`` selects how files get into the library: ``"copy"`` writes
+    a new copy, ``"reflink"`` clones it copy-on-write, ``"hardlink"`` adds a
+    second name for the source and ``"move"`` hardlinks and then removes the
+    source. Each falls back to the next cheaper-to-support method and
+    finally to a copy when the filesystem refuses (see
+    :py:data:`~loradb.agents.uploader_agent.IMPORT_STRATEGIES`). Linked files
+    are only hashed when a stored file has the same size. Sources of
+    duplicates are never removed.
+
+    With ``dry_run`` headers are read and the planned work is counted but
+    nothing is written. ``progress`` receives the running statistics after
+    every batch. While files are written the index is marked incomplete so
+    the server reindexes whatever a crashed import stored; the mark is
+    cleared again after a run without failures. Returns the final
+    statistics.
+    """
+    if strategy not in IMPORT_STRATEGIES:
+        raise ValueError(f"Unknown import strategy: {strategy}")
+    if uploader.indexer is None:
+        uploader.indexer = indexer
+    category_map = category_map or {}
+    workers = workers or config.REINDEX_WORKERS
+    batch_size = batch_size or config.REINDEX_BATCH_SIZE
+    journal_log = ImportJournal(journal or default_journal(safe_dir))
+
+    stats: Dict[str, float] = {
+        "total": 0,
+        "done": 0,
+        "imported": 0,
+        "duplicates": 0,
+        "resumed": 0,
+        "name_clashes": 0,
+        "existing": 0,
+        "failed": 0,
+        "previews": 0,
+        "linked": 0,
+        "bytes": 0,
+        "elapsed": 0.0,
+    }
+    todo: List[Path] = []
+    seen: set[str] = set()
+    for st_file in sorted(safe_dir.rglob("*.safetensors")):
+        if st_file.name in seen:
+            logger.warning("Skipping %s, another file has the same name", st_file)
+            stats["name_clashes"] += 1
+            continue
+        seen.add(st_file.name)
+        if str(st_file.relative_to(safe_dir)) in journal_log.done:
+            stats["resumed"] += 1
             continue
-        index = 0
-        for img in sorted(preview_dir.iterdir()):
-            if img.suffix.lower() not in {".png", ".jpg", ".jpeg", ".gif"}:
-                continue
-            if index == 0:
-                dest_name = f"{st_file.stem}{img.suffix.lower()}"
-            else:
-                dest_name = f"{st_file.stem}_{index}{img.suffix.lower()}"
-            dest_path = uploader.upload_dir / dest_name
-            counter = 1
-            while dest_path.exists():
-                dest_path = uploader.upload_dir / f"{dest_path.stem}_{counter}{dest_path.suffix}"
-                counter += 1
-            shutil.copyfile(img, dest_path)
-            index += 1
+        if (uploader.upload_dir / st_file.name).exists() and indexer.has_entry(
+            st_file.name
+        ):
+            logger.warning("Skipping %s, %s is already stored", st_file, st_file.name)
+            stats["existing"] += 1
+            continue
+        todo.append(st_file)
+    stats["total"] = len(todo)
+    start = time.monotonic()
+    category_ids: Dict[str, int] = {}
+
+    def stage(st_file: Path) -> Dict:
+        """Worker part: stage and parse one file."""
+        if dry_run:
+            return {"source": st_file, "meta": extract_metadata(st_file)}
+        staged, sha256, method = uploader.stage_path(st_file, st_file.name, strategy)
+        return {
+            "source": st_file,
+            "staged": staged,
+            "sha256": sha256,
+            "method": method,
+            "meta": extract_metadata(staged),
+        }
+
+    def assign(members: Dict[str, List[str]]) -> None:
+        """Assign the collected ``category -> filenames`` of one batch."""
+        missing = [cat for cat in members if cat not in category_ids]
+        if missing:
+            category_ids.update(indexer.create_categories(missing))
+        for cat, filenames in members.items():
+            indexer.assign_many(filenames, category_ids[cat])
+
+    def write(batch: List[Future]) -> None:
+        """Writer part: store files and index a whole batch in one transaction."""
+        finished: List[Dict[str, str]] = []
+        members: Dict[str, List[str]] = {}
+        moved: List[Path] = []
+        with indexer.batch():
+            for future in batch:
+                try:
+                    item = future.result()
+                except Exception as exc:
+                    stats["failed"] += 1
+                    logger.error("Import failed: %s", exc)
+                    continue
+                st_file = item["source"]
+                stats["bytes"] += st_file.stat().st_size
+                previews = _previews_for(st_file, safe_dir, img_dir)
+                if dry_run:
+                    stats["imported"] += 1
+                    stats["previews"] += len(previews)
+                    continue
+                try:
+                    dest = uploader.store_staged(item["staged"], st_file.name, item["sha256"])
+                except DuplicateContentError as exc:
+                    for cat in category_map.get(st_file.name, []):
+                        members.setdefault(cat, []).append(exc.existing)
+                    stats["duplicates"] += 1
+                    status = "duplicate"
+                except OSError as exc:
+                    stats["failed"] += 1
+                    logger.error("Import of %s failed: %s", st_file, exc)
+                    continue
+                else:
+                    meta = dict(item["meta"], filename=dest.name)
+                    indexer.add_metadata(meta, dest)
+                    for cat in category_map.get(st_file.name, []):
+                        members.setdefault(cat, []).append(dest.name)
+                    copied = _copy_previews(st_file, previews, uploader.upload_dir, strategy)
+                    indexer.index_previews(copied)
+                    if strategy == "move":
+                        moved.extend([st_file, *previews])
+                    if item["method"] != "copy":
+                        stats["linked"] += 1
+                    stats["imported"] += 1
+                    stats["previews"] += len(copied)
+                    status = "imported"
+                finally:
+                    item["staged"].unlink(missing_ok=True)
+                finished.append(
+                    {"source": str(st_file.relative_to(safe_dir)), "status": status}
+                )
+            assign(members)
+        # Sources are only dropped once their files are committed
+        for path in moved:
+            path.unlink(missing_ok=True)
+        journal_log.record(finished)
+        stats["done"] += len(batch)
+        stats["elapsed"] = time.monotonic() - start
+        if progress:
+            progress(stats)
+
+    if todo and not dry_run:
+        indexer.mark_incomplete()
+    # Keep one batch staged ahead so workers copy while the writer commits.
+    # A batch stays in ``queued`` until it is written.
+    queued: deque = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                for offset in range(0, len(todo), batch_size):
+                    queued.append(
+                        [pool.submit(stage, f) for f in todo[offset : offset + batch_size]]
+                    )
+                    if len(queued) > 1:
+                        write(queued[0])
+                        queued.popleft()
+                while queued:
+                    write(queued[0])
+                    queued.popleft()
+            finally:
+                for batch in queued:
+                    for future in batch:
+                        future.cancel()
+    finally:
+        # Staged files of batches that were never written
+        for batch in queued:
+            for future in batch:
+                if future.cancelled() or future.exception() is not None:
+                    continue
+                staged = future.result().get("staged")
+                if staged is not None:
+                    staged.unlink(missing_ok=True)
+
+    stats["elapsed"] = time.monotonic() - start
+    if not dry_run and not stats["failed"]:
+        journal_log.remove()
+        if todo:
+            indexer.mark_complete()
+    return stats
 
 
 def main() -> None:
@@ -91,13 +354,67 @@ def main() -> None:
         nargs="?",
         help="Optional directory with category text files",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.REINDEX_WORKERS,
+        help="Number of threads copying and parsing files",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=config.REINDEX_BATCH_SIZE,
+        help="Number of files written per database transaction",
+    )
+    parser.add_argument(
+        "--strategy",
+        choices=sorted(IMPORT_STRATEGIES),
+        default="copy",
+        help="How files are brought into the library; falls back to copying",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report what would be imported",
+    )
+    parser.add_argument(
+        "--journal",
+        type=Path,
+        help="Journal file used to resume an interrupted import",
+    )
     args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
 
-    uploader = UploaderAgent()
     indexer = IndexingAgent()
+    uploader = UploaderAgent(indexer=indexer)
+
+    def show(stats: Dict[str, float]) -> None:
+        sys.stderr.write("\r" + format_progress(stats))
+        sys.stderr.flush()
 
     cat_map = load_category_map(args.categories) if args.categories else {}
-    import_loras(args.safetensors, args.images, uploader, indexer, cat_map)
+    stats = import_loras(
+        args.safetensors,
+        args.images,
+        uploader,
+        indexer,
+        cat_map,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+        journal=args.journal,
+        progress=show,
+        strategy=args.strategy,
+    )
+    sys.stderr.write("\n")
+    prefix = "Would import" if args.dry_run else "Imported"
+    print(
+        f"{prefix} {stats['imported']} of {stats['total']} files "
+        f"({stats['bytes'] / 1024**3:.1f} GiB, {stats['previews']} previews) "
+        f"in {stats['elapsed']:.1f}s; {stats['linked']} linked, "
+        f"{stats['duplicates']} duplicates, {stats['existing']} names taken, "
+        f"{stats['resumed']} already imported, {stats['failed']} failed"
+    )
 
 
 if __name__ == "__main__":  # pragma: no cover - script entry
@@ -7,10 +7,17 @@ server and stored locally until it has not been accessed for a while.
 
 from __future__ import annotations
 
+import hashlib
+import json
+import logging
+import os
+import stat
 import threading
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, Iterable, Optional
 
 import httpx
 from inotify_simple import INotify, flags
@@ -22,55 +29,619 @@ except ModuleNotFoundError:  # Python <3.11 fallback
 
 CONFIG_PATH = Path(__file__).with_name("config.toml")
 
+# Partially downloaded files live in this hidden subdirectory of ``data_dir``
+# so writing them does not raise events on the watched placeholders.
+PARTIAL_DIR = ".partial"
+
+# Bytes read from the response per iteration while streaming a download
+CHUNK_SIZE = 1024 * 1024
+
+# Access statistics of the disk cache, kept across restarts
+STATS_FILE = ".cache_stats.json"
+
+# Seconds between writes of the statistics file
+STATS_SAVE_INTERVAL = 30
+
+# Last change feed sequence number applied to ``data_dir``
+SYNC_STATE_FILE = ".sync_state.json"
+
+# Changes requested per page of the change feed
+SYNC_PAGE_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadCancelled(Exception):
+    """Raised when a background download gives way to a foreground one."""
+
+
+def make_placeholder(path: Path) -> None:
+    """Create an empty placeholder at ``path`` without opening it.
+
+    ``mknod`` does not raise an inotify ``OPEN`` event, so creating a
+    placeholder never looks like an application asking for the file.
+    """
+    try:
+        os.mknod(path, stat.S_IFREG | 0o644)
+    except FileExistsError:
+        pass
+
+
+class CacheManager:
+    """Keep downloaded models within a byte budget.
+
+    Every open of a model is recorded. When the downloaded files exceed
+    ``budget_bytes`` the least recently used (``policy="lru"``) or least
+    frequently used (``policy="lfu"``) files are turned back into
+    placeholders. Pinned files and files that are currently open are never
+    evicted. Statistics and hit/miss counters survive restarts through
+    ``data_dir/.cache_stats.json``.
+
+    The sizes of the downloaded files are read from ``data_dir`` once and
+    then kept current by :py:meth:`fetched`, :py:meth:`dropped` and the
+    evictions, so checking the budget never rescans the directory.
+    """
+
+    POLICIES = ("lru", "lfu")
+
+    def __init__(
+        self,
+        data_dir: Path,
+        budget_bytes: int,
+        policy: str = "lru",
+        pinned: Iterable[str] = (),
+    ) -> None:
+        if policy not in self.POLICIES:
+            raise ValueError(f"unknown cache policy {policy!r}")
+        self.data_dir = data_dir
+        self.budget_bytes = budget_bytes
+        self.policy = policy
+        self.pinned = set(pinned)
+        self.stats_path = data_dir / STATS_FILE
+        # name -> {"last_access": timestamp, "opens": count}, plus "sha256"
+        # of the downloaded copy while there is one
+        self.files: Dict[str, Dict[str, float]] = {}
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "bytes_fetched": 0,
+            "bytes_prefetched": 0,
+            "evictions": 0,
+            "bytes_evicted": 0,
+        }
+        self.open_counts: Dict[str, int] = {}
+        # name -> size of every downloaded file, and their total
+        self.sizes: Dict[str, int] = {}
+        self.used_bytes = 0
+        self._lock = threading.Lock()
+        self._saved = 0.0
+        self.load()
+        self.rescan()
+
+    def load(self) -> None:
+        try:
+            data = json.loads(self.stats_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return
+        self.files = data.get("files", {})
+        self.counters.update(data.get("counters", {}))
+
+    def save(self, force: bool = False) -> None:
+        """Write the statistics, at most every ``STATS_SAVE_INTERVAL`` seconds."""
+        now = time.monotonic()
+        if not force and now - self._saved < STATS_SAVE_INTERVAL:
+            return
+        with self._lock:
+            data = json.dumps({"files": self.files, "counters": self.counters})
+        tmp = self.stats_path.with_suffix(".tmp")
+        tmp.write_text(data)
+        os.replace(tmp, self.stats_path)
+        self._saved = now
+
+    def opened(self, name: str, local: bool) -> None:
+        """Record an open of ``name``; ``local`` tells if it was downloaded."""
+        with self._lock:
+            entry = self.files.setdefault(name, {"last_access": 0.0, "opens": 0})
+            entry["last_access"] = time.time()
+            entry["opens"] += 1
+            self.counters["hits" if local else "misses"] += 1
+            self.open_counts[name] = self.open_counts.get(name, 0) + 1
+
+    def closed(self, name: str) -> None:
+        with self._lock:
+            entry = self.files.get(name)
+            if entry:
+                entry["last_access"] = time.time()
+            count = self.open_counts.get(name, 0) - 1
+            if count > 0:
+                self.open_counts[name] = count
+            else:
+                self.open_counts.pop(name, None)
+
+    def fetched(
+        self, name: str, size: int, prefetch: bool = False, sha256: Optional[str] = None
+    ) -> None:
+        with self._lock:
+            self.counters["bytes_prefetched" if prefetch else "bytes_fetched"] += size
+            entry = self.files.setdefault(name, {"last_access": time.time(), "opens": 0})
+            entry["sha256"] = sha256
+            self.used_bytes += size - self.sizes.get(name, 0)
+            self.sizes[name] = size
+
+    def dropped(self, name: str) -> None:
+        """Record that the local copy of ``name`` was removed."""
+        with self._lock:
+            self.files.get(name, {}).pop("sha256", None)
+            self.used_bytes -= self.sizes.pop(name, 0)
+
+    def checksum(self, name: str) -> Optional[str]:
+        """Return the SHA-256 of the downloaded copy of ``name`` if known."""
+        with self._lock:
+            return self.files.get(name, {}).get("sha256")
+
+    def has_room(self, size: int) -> bool:
+        """Return ``True`` if ``size`` more bytes fit without evicting."""
+        with self._lock:
+            return self.used_bytes + size <= self.budget_bytes
+
+    def frequent(self, limit: int) -> list[str]:
+        """Return the ``limit`` most often opened models, most recent first on ties."""
+        with self._lock:
+            ranked = sorted(
+                self.files.items(),
+                key=lambda item: (-item[1]["opens"], -item[1]["last_access"]),
+            )
+        return [name for name, entry in ranked[:limit] if entry["opens"]]
+
+    def forget(self, name: str) -> None:
+        """Drop statistics of a model that no longer exists on the server."""
+        with self._lock:
+            self.files.pop(name, None)
+            self.used_bytes -= self.sizes.pop(name, 0)
+
+    def rescan(self) -> None:
+        """Read the sizes of the downloaded files from ``data_dir``."""
+        local = {}
+        with os.scandir(self.data_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".safetensors") and entry.is_file():
+                    size = entry.stat().st_size
+                    if size:
+                        local[entry.name] = size
+        with self._lock:
+            self.sizes = local
+            self.used_bytes = sum(local.values())
+
+    def _sort_key(self, name: str) -> tuple:
+        entry = self.files.get(name, {"last_access": 0.0, "opens": 0})
+        if self.policy == "lfu":
+            return (entry["opens"], entry["last_access"])
+        return (entry["last_access"],)
+
+    def make_room(self, incoming: int = 0, keep: Iterable[str] = (), expire_seconds: float = 0) -> int:
+        """Evict files until ``incoming`` more bytes fit into the budget.
+
+        Files idle for longer than ``expire_seconds`` are evicted as well if
+        that is set. ``keep`` names files that must stay. Returns the number
+        of evicted files.
+        """
+        keep = set(keep) | self.pinned
+        with self._lock:
+            keep |= set(self.open_counts)
+            cutoff = time.time() - expire_seconds if expire_seconds else None
+            if self.used_bytes + incoming <= self.budget_bytes and cutoff is None:
+                return 0
+            local = dict(self.sizes)
+            candidates = sorted(
+                (name for name in local if name not in keep), key=self._sort_key
+            )
+            used = self.used_bytes + incoming
+        evicted = 0
+        for name in candidates:
+            idle = cutoff is not None and self._sort_key(name)[-1] < cutoff
+            if used <= self.budget_bytes and not idle:
+                continue
+            path = self.data_dir / name
+            path.unlink(missing_ok=True)
+            make_placeholder(path)
+            used -= local[name]
+            evicted += 1
+            with self._lock:
+                self.counters["evictions"] += 1
+                self.counters["bytes_evicted"] += local[name]
+                self.files.get(name, {}).pop("sha256", None)
+                self.used_bytes -= self.sizes.pop(name, 0)
+        return evicted
+
+    def metrics(self) -> Dict[str, float]:
+        """Return hit rate, fetched and evicted bytes and current usage."""
+        with self._lock:
+            metrics = dict(self.counters)
+            cached_files, cached_bytes = len(self.sizes), self.used_bytes
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = round(metrics["hits"] / lookups, 4) if lookups else 0.0
+        metrics["cached_files"] = cached_files
+        metrics["cached_bytes"] = cached_bytes
+        metrics["budget_bytes"] = self.budget_bytes
+        return metrics
+
+
+class Prefetcher:
+    """Download models that are likely to be opened soon in the background.
+
+    Candidates are the configured ``names``, pinned models, the ``recent``
+    most often opened models and, with ``related`` enabled, models sharing a
+    category with every model that gets opened. One file is fetched at a
+    time, throttled to ``rate`` bytes per second (``0`` for no limit), and
+    only into free cache space so prefetching never evicts anything. A
+    foreground download sets :py:attr:`cancel`; the prefetch then stops,
+    keeps its partial file and resumes once no foreground download runs.
+    """
+
+    def __init__(
+        self,
+        downloader: "LazyDownloader",
+        names: Iterable[str] = (),
+        related: bool = True,
+        recent: int = 5,
+        rate: float = 0,
+    ) -> None:
+        self.downloader = downloader
+        self.names = list(names)
+        self.related = related
+        self.recent = recent
+        self.rate = rate
+        self.cancel = threading.Event()
+        # ("file" | "related", name) items, deduplicated via ``_queued``
+        self.queue: deque = deque()
+        self._queued: set = set()
+        self._cond = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name="prefetch", daemon=True)
+
+    def start(self) -> None:
+        self.add(self.names)
+        self.add(sorted(self.downloader.cache.pinned))
+        self.add(self.downloader.cache.frequent(self.recent))
+        self.thread.start()
+
+    def add(self, names: Iterable[str], kind: str = "file", front: bool = False) -> None:
+        """Queue ``names`` for prefetching unless they are queued already."""
+        with self._cond:
+            for name in names:
+                item = (kind, name)
+                if item in self._queued:
+                    continue
+                self._queued.add(item)
+                if front:
+                    self.queue.appendleft(item)
+                else:
+                    self.queue.append(item)
+            self._cond.notify()
+
+    def opened(self, name: str) -> None:
+        """Queue the models related to the just opened ``name``."""
+        if self.related:
+            self.add([name], kind="related")
+
+    def _next(self) -> tuple[str, str]:
+        with self._cond:
+            while not self.queue:
+                self._cond.wait()
+            item = self.queue.popleft()
+            self._queued.discard(item)
+            return item
+
+    def _wait_for_foreground(self) -> None:
+        # ``schedule`` registers a download before setting ``cancel``, so a
+        # download starting after ``busy`` was checked still cancels us.
+        while True:
+            self.cancel.clear()
+            if not self.downloader.busy():
+                return
+            time.sleep(0.5)
+
+    def run(self) -> None:
+        client, server = self.downloader.client, self.downloader.server_url
+        while True:
+            kind, name = self._next()
+            try:
+                if kind == "related":
+                    resp = client.get(f"{server}/related/{name}")
+                    resp.raise_for_status()
+                    self.add(resp.json())
+                    continue
+                self._wait_for_foreground()
+                if self.downloader.download(
+                    name, cancel=self.cancel, rate=self.rate, prefetch=True
+                ):
+                    logger.info("Prefetched %s", name)
+            except DownloadCancelled:
+                self.add([name], front=True)
+            except (httpx.HTTPError, OSError, ValueError) as exc:
+                logger.warning("Prefetch of %s failed: %s", name, exc)
+
 
 class LazyDownloader:
-    """Monitor placeholder files and download them on demand."""
+    """Monitor placeholder files and download them on demand.
+
+    Downloads run on a pool of ``workers`` threads so the inotify loop keeps
+    draining events. Data is streamed to ``data_dir/.partial`` and renamed
+    over the placeholder once its SHA-256 matches the server manifest.
+    Failed transfers are resumed with a ``Range`` request up to ``retries``
+    times. Disk usage is bounded by ``cache``; ``expire_seconds`` optionally
+    also evicts files idle for that long. Placeholders follow the server's
+    change feed every ``sync_interval`` seconds. An optional ``prefetch``
+    configuration (the keyword arguments of :py:class:`Prefetcher`) enables
+    background downloads.
+    """
 
     def __init__(
         self,
         server_url: str,
         data_dir: Path,
-        expire_seconds: int = 60,
+        expire_seconds: int = 0,
         username: Optional[str] = None,
         password: Optional[str] = None,
+        workers: int = 4,
+        retries: int = 3,
+        cache: Optional[CacheManager] = None,
+        sync_interval: int = 60,
+        prefetch: Optional[Dict[str, Any]] = None,
     ) -> None:
         self.server_url = server_url.rstrip("/")
         self.data_dir = data_dir
         self.expire_seconds = expire_seconds
         self.username = username or ""
         self.password = password or ""
-        self.access_times: Dict[Path, float] = {}
+        self.retries = retries
+        self.sync_interval = sync_interval
+        self.sync_state_path = data_dir / SYNC_STATE_FILE
+        self.last_sync = 0.0
+        self.cache = cache or CacheManager(data_dir, budget_bytes=50 * 1024**3)
         self.inotify = INotify()
         # `inotify_simple` does not provide a combined CLOSE flag, so listen to
         # both close events explicitly
         close_flags = flags.CLOSE_WRITE | flags.CLOSE_NOWRITE
         self.inotify.add_watch(str(self.data_dir), flags.OPEN | close_flags)
-        self.client = httpx.Client(follow_redirects=False)
+        self.client = httpx.Client(follow_redirects=False, timeout=30)
+        self.partial_dir = self.data_dir / PARTIAL_DIR
+        self.partial_dir.mkdir(exist_ok=True)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="download")
+        # name -> running download, guarded by ``_lock``
+        self.pending: Dict[str, Future] = {}
+        # name -> latest change that arrived while the download ran
+        self._deferred: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # Serialize foreground and prefetch downloads of the same file
+        self._name_locks: Dict[str, threading.Lock] = {}
+        self.prefetcher = Prefetcher(self, **prefetch) if prefetch is not None else None
 
-    def ensure_placeholders(self) -> None:
-        resp = self.client.get(f"{self.server_url}/search", params={"query": "*"})
-        resp.raise_for_status()
-        for entry in resp.json():
-            path = self.data_dir / entry["filename"]
-            path.touch(exist_ok=True)
+    def _load_seq(self) -> int:
+        try:
+            return int(json.loads(self.sync_state_path.read_text())["seq"])
+        except (FileNotFoundError, ValueError, KeyError):
+            return 0
+
+    def _save_seq(self, seq: int) -> None:
+        tmp = self.sync_state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"seq": seq}))
+        os.replace(tmp, self.sync_state_path)
+
+    def sync(self) -> int:
+        """Apply server changes since the last sync and return their count.
 
-    def download(self, name: str) -> None:
-        url = f"{self.server_url}/uploads/{name}"
-        resp = self.client.get(url)
+        New models get a placeholder, deleted ones are removed and local
+        copies whose size or SHA-256 no longer matches the server become
+        placeholders again. Changes to a file that is being downloaded are applied once
+        the download finishes. The last applied sequence number is stored in
+        ``data_dir``.
+        """
+        seq = self._load_seq()
+        applied = 0
+        while True:
+            resp = self.client.get(
+                f"{self.server_url}/changes",
+                params={"since": seq, "limit": SYNC_PAGE_SIZE},
+            )
+            resp.raise_for_status()
+            page = resp.json()
+            if seq > page["latest"]:
+                # The server database was recreated, start over
+                seq = 0
+                continue
+            for change in page["changes"]:
+                self._apply_change(change)
+            applied += len(page["changes"])
+            seq = page["next"]
+            self._save_seq(seq)
+            if not page["more"]:
+                break
+        self.last_sync = time.monotonic()
+        return applied
+
+    def _apply_change(self, change: Dict[str, Any]) -> None:
+        name = Path(change["filename"]).name
+        if not name.endswith(".safetensors"):
+            return
+        path = self.data_dir / name
+        with self._lock:
+            if name in self.pending:
+                # Applied by ``_finished`` once the download is done
+                self._deferred[name] = change
+                return
+        if change["deleted"]:
+            path.unlink(missing_ok=True)
+            self.cache.forget(name)
+            return
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            make_placeholder(path)
+            return
+        if not size:
+            return
+        replaced = change["size"] is not None and size != change["size"]
+        known = self.cache.checksum(name)
+        if known and change.get("sha256") and known != change["sha256"]:
+            replaced = True
+        if replaced:
+            # The model was replaced on the server
+            path.unlink(missing_ok=True)
+            make_placeholder(path)
+            self.cache.dropped(name)
+
+    def manifest_entry(self, name: str) -> Dict[str, Any]:
+        """Return size and SHA-256 the server manifest lists for ``name``."""
+        resp = self.client.post(f"{self.server_url}/manifest", json={"filenames": [name]})
         resp.raise_for_status()
-        (self.data_dir / name).write_bytes(resp.content)
+        for entry in resp.json()["files"]:
+            if entry["filename"] == name:
+                return entry
+        raise FileNotFoundError(name)
+
+    def schedule(self, name: str) -> Future:
+        """Queue a download of ``name`` unless one is already running."""
+        with self._lock:
+            future = self.pending.get(name)
+            if future is None:
+                future = self.pool.submit(self.download, name)
+                self.pending[name] = future
+                future.add_done_callback(lambda f, n=name: self._finished(n, f))
+        if self.prefetcher is not None:
+            self.prefetcher.cancel.set()
+        return future
+
+    def busy(self) -> bool:
+        """Return ``True`` while a foreground download is running."""
+        with self._lock:
+            return bool(self.pending)
+
+    def _name_lock(self, name: str) -> threading.Lock:
+        with self._lock:
+            return self._name_locks.setdefault(name, threading.Lock())
+
+    def _finished(self, name: str, future: Future) -> None:
+        with self._lock:
+            self.pending.pop(name, None)
+            change = self._deferred.pop(name, None)
+        exc = future.exception()
+        if exc is not None:
+            logger.error("Download of %s failed: %s", name, exc)
+        if change is not None:
+            self._apply_change(change)
+
+    def download(
+        self,
+        name: str,
+        cancel: Optional[threading.Event] = None,
+        rate: float = 0,
+        prefetch: bool = False,
+    ) -> bool:
+        """Fetch ``name`` and atomically replace its placeholder.
+
+        Bytes already in the partial file are kept and the rest is requested
+        with ``Range``; ``If-Range`` makes the server send the whole file
+        again if it changed meanwhile. Setting ``cancel`` aborts the transfer
+        with :py:class:`DownloadCancelled`. Prefetches are skipped instead of
+        evicting other files. Returns ``False`` if nothing was downloaded.
+        """
+        with self._name_lock(name):
+            path = self.data_dir / name
+            if path.exists() and path.stat().st_size > 0:
+                return False
+            entry = self.manifest_entry(name)
+            expected = entry["sha256"]
+            state = {"sha256": expected, "validator": f'"{expected}"' if expected else None}
+            if prefetch:
+                if not self.cache.has_room(entry["size"]):
+                    return False
+            else:
+                self.cache.make_room(entry["size"], keep=[name])
+            partial = self.partial_dir / name
+            attempt = 0
+            while True:
+                try:
+                    sha256 = self._fetch(name, partial, state, cancel, rate)
+                    break
+                except httpx.TransportError:
+                    attempt += 1
+                    if attempt > self.retries:
+                        raise
+                    time.sleep(min(2 ** attempt, 30))
+            expected = state["sha256"]
+            if expected and sha256 != expected:
+                partial.unlink(missing_ok=True)
+                raise ValueError(f"{name}: checksum mismatch")
+            size = partial.stat().st_size
+            os.replace(partial, path)
+            self.cache.fetched(name, size, prefetch, sha256)
+            return True
+
+    def _fetch(
+        self,
+        name: str,
+        partial: Path,
+        state: Dict[str, Optional[str]],
+        cancel: Optional[threading.Event] = None,
+        rate: float = 0,
+    ) -> str:
+        """Stream the missing part of ``name`` into ``partial``.
+
+        ``state`` holds the expected SHA-256 under ``"sha256"`` and the
+        ``If-Range`` value under ``"validator"``. Both are taken from the
+        response headers before the body is written, so a retry after a
+        transfer broke off resumes even if the manifest had no hash. Returns
+        the SHA-256 of the complete file.
+        """
+        digest = hashlib.sha256()
+        offset = 0
+        if partial.exists() and state["validator"]:
+            with partial.open("rb") as fh:
+                while chunk := fh.read(CHUNK_SIZE):
+                    digest.update(chunk)
+                    offset += len(chunk)
+        headers = {}
+        if offset:
+            headers = {"Range": f"bytes={offset}-", "If-Range": state["validator"]}
+        url = f"{self.server_url}/download/{name}"
+        with self.client.stream("GET", url, headers=headers) as resp:
+            if resp.status_code == 416:
+                # The partial file already holds every byte
+                return digest.hexdigest()
+            resp.raise_for_status()
+            if resp.status_code != 206:
+                digest = hashlib.sha256()
+                offset = 0
+            announced = resp.headers.get("x-content-sha256")
+            state["sha256"] = state["sha256"] or announced
+            if state["sha256"]:
+                state["validator"] = f'"{state["sha256"]}"'
+            else:
+                # Weak ETags cannot be used with If-Range, the date can
+                state["validator"] = resp.headers.get("last-modified")
+            start, received = time.monotonic(), 0
+            with partial.open("r+b" if offset else "wb") as out:
+                out.seek(offset)
+                out.truncate()
+                for chunk in resp.iter_bytes(CHUNK_SIZE):
+                    if cancel is not None and cancel.is_set():
+                        raise DownloadCancelled(name)
+                    out.write(chunk)
+                    digest.update(chunk)
+                    if rate:
+                        received += len(chunk)
+                        delay = received / rate - (time.monotonic() - start)
+                        if delay > 0:
+                            time.sleep(delay)
+                out.flush()
+                os.fsync(out.fileno())
+        return digest.hexdigest()
 
     def cleanup(self) -> None:
-        now = time.time()
-        for path, ts in list(self.access_times.items()):
-            if (
-                now - ts > self.expire_seconds
-                and path.exists()
-                and path.stat().st_size > 0
-            ):
-                path.unlink(missing_ok=True)
-                path.touch()
-                del self.access_times[path]
+        with self._lock:
+            downloading = list(self.pending)
+        self.cache.make_room(keep=downloading, expire_seconds=self.expire_seconds)
+        self.cache.save()
 
     def run(self) -> None:
         if self.username and self.password:
@@ -83,41 +654,81 @@ class LazyDownloader:
             # is disabled.
             if resp.status_code != 303:
                 resp.raise_for_status()
-        self.ensure_placeholders()
+        self.sync()
+        if self.prefetcher is not None:
+            self.prefetcher.start()
         while True:
             for event in self.inotify.read(timeout=1000):
+                if not event.name.endswith(".safetensors"):
+                    continue
                 path = self.data_dir / event.name
                 if event.mask & flags.OPEN:
-                    if path.stat().st_size == 0:
-                        self.download(event.name)
-                    self.access_times[path] = time.time()
+                    try:
+                        local = path.stat().st_size > 0
+                    except FileNotFoundError:
+                        continue
+                    self.cache.opened(event.name, local)
+                    if not local:
+                        self.schedule(event.name)
+                    if self.prefetcher is not None:
+                        self.prefetcher.opened(event.name)
                 elif event.mask & (flags.CLOSE_WRITE | flags.CLOSE_NOWRITE):
-                    self.access_times[path] = time.time()
+                    self.cache.closed(event.name)
             self.cleanup()
+            if time.monotonic() - self.last_sync >= self.sync_interval:
+                try:
+                    self.sync()
+                except httpx.HTTPError as exc:
+                    logger.warning("Sync failed: %s", exc)
+                    self.last_sync = time.monotonic()
 
 
-def load_config() -> tuple[str, Path, str, str]:
+def load_config() -> Dict[str, Any]:
     with CONFIG_PATH.open("rb") as fh:
         cfg = tomllib.load(fh)
-    server_url = cfg.get("server_url", "http://127.0.0.1:9090")
     data_dir = Path(cfg.get("data_dir", "./lora_mount"))
-    username = cfg.get("username", "")
-    password = cfg.get("password", "")
     data_dir.mkdir(parents=True, exist_ok=True)
-    return server_url, data_dir, username, password
+    cache = CacheManager(
+        data_dir,
+        budget_bytes=int(float(cfg.get("cache_budget_gb", 50)) * 1024**3),
+        policy=cfg.get("cache_policy", "lru"),
+        pinned=cfg.get("pinned", []),
+    )
+    return {
+        "server_url": cfg.get("server_url", "http://127.0.0.1:9090"),
+        "data_dir": data_dir,
+        "username": cfg.get("username", ""),
+        "password": cfg.get("password", ""),
+        "workers": int(cfg.get("download_workers", 4)),
+        "retries": int(cfg.get("download_retries", 3)),
+        "expire_seconds": int(cfg.get("expire_seconds", 0)),
+        "sync_interval": int(cfg.get("sync_interval", 60)),
+        "prefetch": {
+            "names": cfg.get("prefetch", []),
+            "related": bool(cfg.get("prefetch_related", True)),
+            "recent": int(cfg.get("prefetch_recent", 5)),
+            "rate": float(cfg.get("prefetch_rate_mb", 0)) * 1024**2,
+        }
+        if cfg.get("prefetch_enabled", True)
+        else None,
+        "cache": cache,
+    }
 
 
 def main() -> None:
-    server, data_dir, username, password = load_config()
-    downloader = LazyDownloader(server, data_dir, username=username, password=password)
+    logging.basicConfig(level=logging.INFO)
+    cfg = load_config()
+    downloader = LazyDownloader(**cfg)
     thread = threading.Thread(target=downloader.run, daemon=True)
     thread.start()
-    print(f"Listening for accesses in {data_dir} (Ctrl+C to stop)")
+    print(f"Listening for accesses in {cfg['data_dir']} (Ctrl+C to stop)")
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
         print("Stopping...")
+        downloader.cache.save(force=True)
+        print(json.dumps(downloader.cache.metrics(), indent=2))
 
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 """Configuration for paths used by the application."""
 
+import os
 from pathlib import Path
 
 # Resolve all paths relative to this config file so running the app from any
@@ -18,5 +19,75 @@ TEMPLATE_DIR = BASE_DIR / "loradb" / "templates"
 # Location of the SQLite database for users and search index
 DB_PATH = Path.home() / ".modelhome" / "index.db"
 
+# Number of threads reading safetensors headers during a reindex
+REINDEX_WORKERS = min(8, os.cpu_count() or 1)
+
+# Number of files written per transaction during a reindex
+REINDEX_BATCH_SIZE = 500
+
+# Number of parsed metadata entries kept in memory for detail views
+METADATA_CACHE_SIZE = 256
+
+# Number of LoRA stems whose preview URLs are cached in memory
+PREVIEW_CACHE_SIZE = 4096
+
+# Seconds before cached preview URLs are looked up again
+PREVIEW_CACHE_TTL = 3600
+
+# Seconds to remember that a stem has no previews at all
+PREVIEW_NEGATIVE_TTL = 30
+
+# Bytes copied per read when writing uploaded files to disk
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Partial files of resumable upload sessions. Keep this on the same
+# filesystem as UPLOAD_DIR so finished uploads are moved with a rename.
+STAGING_DIR = BASE_DIR / "loradb" / "staging"
+
+# Seconds after which an upload session without new chunks is discarded
+UPLOAD_SESSION_TTL = 24 * 3600
+
+# Largest chunk size a client may choose for an upload session; every chunk
+# is held in memory while it is verified and written
+UPLOAD_SESSION_MAX_CHUNK = 64 * 1024 * 1024
+
+# What to do with uploads identical to a stored LoRA: "reject" them, "link"
+# them to the existing file (reflink or hardlink) or keep a copy with "off"
+DEDUPE_MODE = "reject"
+
+# Number of background threads extracting metadata of uploaded files
+INGEST_WORKERS = 1
+
+# Number of finished upload jobs whose status is kept for ``/jobs``
+INGEST_JOB_HISTORY = 1000
+
+# Downscaled copies of preview images, one folder per width
+THUMB_DIR = BASE_DIR / "loradb" / "thumbs"
+
+# Widths in pixels at which thumbnails are generated for ``srcset``
+THUMB_WIDTHS = (256, 512, 1024)
+
+# Thumbnail image format, "webp" or "jpeg", and its encoder quality
+THUMB_FORMAT = "webp"
+THUMB_QUALITY = 80
+
+# Number of background threads generating thumbnails
+THUMB_WORKERS = min(4, os.cpu_count() or 1)
+
+# Seconds browsers may cache a thumbnail
+THUMB_MAX_AGE = 30 * 24 * 3600
+
+# Limits for uploaded preview archives: number of images and their total
+# uncompressed size in bytes
+PREVIEW_ZIP_MAX_MEMBERS = 1000
+PREVIEW_ZIP_MAX_BYTES = 2 * 1024**3
+
+# Number of threads extracting and checking images of a preview archive
+PREVIEW_ZIP_WORKERS = min(4, os.cpu_count() or 1)
+
+# Seconds between background passes correcting the dashboard counters
+# against the index and the upload folder; 0 disables them
+STATS_RECONCILE_INTERVAL = 6 * 3600
+
 # Secret key for session cookies
 SECRET_KEY = "change_this_secret"
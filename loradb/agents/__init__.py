@@ -2,10 +2,14 @@ from .uploader_agent import UploaderAgent
 from .metadata_extractor_agent import MetadataExtractorAgent
 from .indexing_agent import IndexingAgent
 from .frontend_agent import FrontendAgent
+from .ingest_agent import IngestAgent
+from .thumbnail_agent import ThumbnailAgent
 
 __all__ = [
     "UploaderAgent",
     "MetadataExtractorAgent",
     "IndexingAgent",
     "FrontendAgent",
+    "IngestAgent",
+    "ThumbnailAgent",
 ]
@@ -1,24 +1,57 @@
+from __future__ import annotations
+
 import random
 import re
 from pathlib import Path
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, Iterable, List
+from urllib.parse import quote
 
 from jinja2 import Environment, FileSystemLoader
 
+import config
+from ..cache import LRUCache
+
+if TYPE_CHECKING:  # pragma: no cover - imported for type hints only
+    from .indexing_agent import IndexingAgent
+    from .thumbnail_agent import ThumbnailAgent
+
 
 class FrontendAgent:
     """Render HTML views for the LoRA gallery using Bootstrap."""
 
-    def __init__(self, uploads_dir: Path, template_dir: Path) -> None:
+    def __init__(
+        self,
+        uploads_dir: Path,
+        template_dir: Path,
+        indexer: IndexingAgent | None = None,
+        thumbnailer: ThumbnailAgent | None = None,
+    ) -> None:
         self.uploads_dir = uploads_dir
         self.env = Environment(loader=FileSystemLoader(template_dir))
-        # Cache mapping a file stem to the list of preview URLs
-        self.preview_cache: Dict[str, List[str]] = {}
+        self.env.filters["srcset"] = self.srcset
+        # Generates thumbnails of new previews; without it templates get an
+        # empty ``srcset`` and browsers load the full size images.
+        self.thumbnailer = thumbnailer
+        # Preview lookups use the indexer's preview index when available and
+        # fall back to scanning ``uploads_dir`` otherwise.
+        self.indexer = indexer
+        # Cache mapping a file stem to the list of preview URLs. Stems without
+        # previews are cached as well, but only for a short time.
+        self.preview_cache = LRUCache(
+            config.PREVIEW_CACHE_SIZE, ttl=config.PREVIEW_CACHE_TTL
+        )
+
+    def _cache_previews(self, stem: str, urls: List[str]) -> None:
+        ttl = None if urls else config.PREVIEW_NEGATIVE_TTL
+        self.preview_cache.put(stem, urls, ttl=ttl)
 
     def _find_previews(self, stem: str) -> List[str]:
-        """Return preview URLs for ``stem`` using a simple cache."""
-        if stem in self.preview_cache:
-            return self.preview_cache[stem]
+        """Return preview URLs for ``stem`` using a bounded cache."""
+        cached = self.preview_cache.get(stem)
+        if cached is not None:
+            return cached
+        if self.indexer is not None:
+            return self.find_previews_many([stem])[stem]
         # Only match files for this exact stem. We allow either an exact
         # filename match (``<stem>.png``) or a numeric suffix
         # (``<stem>_1.png``). Previous glob patterns like ``<stem>_*.png``
@@ -32,9 +65,77 @@ class FrontendAgent:
             if pattern.match(p.name):
                 matches.append(str(p))
         urls = [f"/uploads/{Path(m).name}" for m in sorted(matches)]
-        self.preview_cache[stem] = urls
+        self._cache_previews(stem, urls)
         return urls
 
+    def find_previews_many(self, stems: Iterable[str]) -> Dict[str, List[str]]:
+        """Return preview URLs for all ``stems`` with one index lookup."""
+        result: Dict[str, List[str]] = {}
+        missing: List[str] = []
+        for stem in stems:
+            cached = self.preview_cache.get(stem)
+            if cached is not None:
+                result[stem] = cached
+            else:
+                missing.append(stem)
+        if not missing:
+            return result
+        if self.indexer is None:
+            for stem in missing:
+                result[stem] = self._find_previews(stem)
+            return result
+        for stem, names in self.indexer.get_previews_many(missing).items():
+            urls = [f"/uploads/{name}" for name in names]
+            self._cache_previews(stem, urls)
+            result[stem] = urls
+        return result
+
+    def add_previews(self, paths: Iterable[Path]) -> None:
+        """Register newly stored preview images."""
+        names = [Path(p).name for p in paths]
+        if self.indexer is not None:
+            self.indexer.index_previews(names)
+        if self.thumbnailer is not None:
+            self.thumbnailer.submit(names)
+        self._invalidate_names(names)
+
+    def remove_previews(self, names: Iterable[str]) -> None:
+        """Forget deleted preview images."""
+        names = list(names)
+        if self.indexer is not None:
+            self.indexer.remove_previews(names)
+        if self.thumbnailer is not None:
+            self.thumbnailer.remove(names)
+        self._invalidate_names(names)
+
+    def srcset(self, url: str | None) -> str:
+        """Return a ``srcset`` value with the thumbnails of preview ``url``.
+
+        The name is percent-encoded because spaces and commas separate the
+        candidates of a ``srcset``.
+        """
+        if not url or self.thumbnailer is None:
+            return ""
+        name = quote(url.rsplit("/", 1)[-1])
+        return ", ".join(
+            f"/thumbs/{w}/{name} {w}w" for w in self.thumbnailer.widths
+        )
+
+    def _invalidate_names(self, names: Iterable[str]) -> None:
+        for name in names:
+            stem = Path(name).stem
+            self.invalidate_preview_cache(stem)
+            self.invalidate_preview_cache(stem.rsplit("_", 1)[0])
+
+    def assign_preview_urls(self, entries: List[Dict[str, str]]) -> None:
+        """Set a random ``preview_url`` and its ``preview_srcset`` on ``entries``."""
+        stems = [Path(e.get("filename", "")).stem for e in entries]
+        previews = self.find_previews_many(stems)
+        for e, stem in zip(entries, stems):
+            urls = previews[stem]
+            e["preview_url"] = random.choice(urls) if urls else None
+            e["preview_srcset"] = self.srcset(e["preview_url"])
+
     def invalidate_preview_cache(self, stem: str | None = None) -> None:
         """Remove ``stem`` from the preview cache or clear it entirely."""
         if stem is None:
@@ -55,11 +156,12 @@ class FrontendAgent:
         selected_category: str | None = None,
         limit: int = 50,
         user: Dict[str, str] | None = None,
+        sort: str = "relevance",
+        next_cursor: str | None = None,
+        architecture: str = "",
+        base_model: str = "",
     ) -> str:
-        for e in entries:
-            stem = Path(e.get("filename", "")).stem
-            previews = self._find_previews(stem)
-            e["preview_url"] = random.choice(previews) if previews else None
+        self.assign_preview_urls(entries)
         template = self.env.get_template("grid.html")
         return template.render(
             title="LoRA Gallery",
@@ -69,16 +171,18 @@ class FrontendAgent:
             selected_category=selected_category or "",
             limit=limit,
             user=user,
+            sort=sort,
+            sort_modes=["relevance", "newest", "name", "size"],
+            next_cursor=next_cursor or "",
+            architecture=architecture,
+            base_model=base_model,
         )
 
     def render_showcase(
         self, entries: List[Dict[str, str]], user: Dict[str, str] | None = None
     ) -> str:
         """Render the public showcase grid."""
-        for e in entries:
-            stem = Path(e.get("filename", "")).stem
-            previews = self._find_previews(stem)
-            e["preview_url"] = random.choice(previews) if previews else None
+        self.assign_preview_urls(entries)
         template = self.env.get_template("showcase.html")
         return template.render(title="Model Showcase", entries=entries, user=user)
 
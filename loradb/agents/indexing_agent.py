@@ -1,12 +1,87 @@
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+import base64
+import binascii
+import hashlib
+import json
+import logging
 import math
+import os
+import re
+import threading
+import time
 
 import sqlite3
 from pathlib import Path
 
 import config
+from ..cache import LRUCache
+from ..suggest import SuggestIndex
 from .metadata_extractor_agent import MetadataExtractorAgent
 
+logger = logging.getLogger(__name__)
+
+#: File extensions treated as preview images.
+PREVIEW_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif"}
+
+# Preview names are either ``<stem>.<ext>`` or ``<stem>_<n>.<ext>``
+_NUMBERED_PREVIEW_RE = re.compile(r"^(.+)_[0-9]+$")
+
+# Maximum number of bound parameters used for ``IN (...)`` lookups
+_MAX_VARS = 900
+
+# Writes touching more entries than this drop the suggestion index instead of
+# updating it; it is rebuilt from the database on the next lookup.
+_SUGGEST_UPDATE_LIMIT = 100
+
+#: Bumped whenever the content stored in ``lora_index`` changes so existing
+#: databases are rebuilt on startup.
+SCHEMA_VERSION = 1
+
+
+def file_sha256(path: Path) -> str:
+    """Return the hex SHA-256 digest of the file at ``path``."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while True:
+            chunk = fh.read(config.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_tag_frequency(raw: str) -> Dict[str, int]:
+    """Return normalized ``tag -> count`` pairs from ``ss_tag_frequency``.
+
+    Kohya style metadata stores ``{"<dataset dir>": {"<tag>": count}}`` as a
+    JSON string. Counts of the same tag in several dataset folders are
+    summed. Flat ``{"<tag>": count}`` objects and plain comma separated tag
+    lists are accepted as well. Tags are stripped and lower-cased.
+    """
+    if not raw:
+        return {}
+    try:
+        parsed = json.loads(raw)
+    except (TypeError, ValueError):
+        parsed = {t: 1 for t in str(raw).split(",")}
+    if not isinstance(parsed, dict):
+        return {}
+    sources = [v for v in parsed.values() if isinstance(v, dict)] or [parsed]
+    tags: Dict[str, int] = {}
+    for source in sources:
+        for tag, count in source.items():
+            tag = str(tag).strip().lower()
+            if not tag:
+                continue
+            try:
+                count = int(count)
+            except (TypeError, ValueError):
+                count = 1
+            tags[tag] = tags.get(tag, 0) + count
+    return tags
+
 
 class IndexingAgent:
     """Maintain search index for LoRA metadata using SQLite FTS5."""
@@ -16,26 +91,67 @@ class IndexingAgent:
     NO_CATEGORY_ID = 0
     #: Display name for the dynamic "no category" entry.
     NO_CATEGORY_NAME = "No Category"
+    #: Sort modes accepted by :py:meth:`search` and friends.
+    SORT_MODES = ("relevance", "newest", "name", "size")
+    #: bm25 weights for the filename, name, architecture, tags and
+    #: base_model columns used by the ``relevance`` sort.
+    BM25_WEIGHTS = (2.0, 10.0, 1.0, 5.0, 1.0)
 
     def __init__(self, db_path: Path | None = None) -> None:
         self.db_path = Path(db_path or config.DB_PATH)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        # filename -> (fingerprint, metadata) for recently viewed files
+        self.metadata_cache = LRUCache(config.METADATA_CACHE_SIZE)
+        # Built lazily by ``suggest`` and kept in sync by the write helpers
+        self._suggest: SuggestIndex | None = None
         recreated = self._ensure_table()
-        if recreated or self._is_index_empty():
+        if self._get_state("previews_indexed") != "1":
+            self.rebuild_preview_index()
+        if recreated:
+            self.reindex_all(full=True)
+        elif self._is_index_empty() or not self._reindex_complete():
+            # Either nothing was indexed yet or a previous pass was
+            # interrupted; the incremental pass picks up where it stopped.
             self.reindex_all()
 
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Group all writes issued inside the block into one transaction.
+
+        Batches may be nested; only the outermost block commits. If the block
+        raises, the outermost block rolls the transaction back instead.
+        """
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield
+            except BaseException:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.conn.rollback()
+                    # In-memory suggestions may include rolled back rows
+                    self._suggest = None
+                raise
+            else:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.conn.commit()
+
     def _ensure_table(self) -> bool:
         cur = self.conn.cursor()
         # Check existing table schema; recreate if outdated
         cur.execute("PRAGMA table_info(lora_index)")
         cols = [r[1] for r in cur.fetchall()]
         required = ["filename", "name", "architecture", "tags", "base_model"]
+        version = cur.execute("PRAGMA user_version").fetchone()[0]
         recreated = False
         if not cols:
             # Table did not exist, we'll need to index from scratch
             recreated = True
-        elif cols != required:
+        elif cols != required or version < SCHEMA_VERSION:
             # Existing table uses an old schema, drop it so we can recreate
             cur.execute("DROP TABLE IF EXISTS lora_index")
             recreated = True
@@ -67,9 +183,335 @@ class IndexingAgent:
             )
             """
         )
+        # The UNIQUE constraint covers lookups by filename; this one covers
+        # listing and counting the members of a category.
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_category_map_category "
+            "ON lora_category_map(category_id, filename)"
+        )
+        # File fingerprints from the last reindex pass. Files whose size,
+        # mtime and inode are unchanged are skipped by ``reindex_all``. The
+        # full extracted metadata is kept alongside as JSON so detail views
+        # do not need to reopen the file. ``sha256`` is the content hash,
+        # valid for the stored fingerprint, used to detect duplicate uploads.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS lora_files (
+                filename TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                inode INTEGER,
+                metadata TEXT,
+                sha256 TEXT
+            )
+            """
+        )
+        self._ensure_columns("lora_files", {"metadata": "TEXT", "sha256": "TEXT"})
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_lora_files_size ON lora_files(size)")
+        # Maps a LoRA stem to its preview images. Every image is stored under
+        # its own stem and, for numbered previews, the stem without the
+        # ``_<n>`` suffix so lookups never need to list the upload folder.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS preview_index (
+                stem TEXT,
+                filename TEXT,
+                PRIMARY KEY(stem, filename)
+            ) WITHOUT ROWID
+            """
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_preview_filename ON preview_index(filename)"
+        )
+        # Tags parsed from ``ss_tag_frequency``, one row per LoRA and tag,
+        # plus per-tag totals maintained on every insert and delete.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS lora_tags (
+                filename TEXT,
+                tag TEXT,
+                count INTEGER,
+                PRIMARY KEY(filename, tag)
+            ) WITHOUT ROWID
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_lora_tags_tag ON lora_tags(tag, filename)")
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tag_stats (
+                tag TEXT PRIMARY KEY,
+                loras INTEGER,
+                total INTEGER
+            ) WITHOUT ROWID
+            """
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tag_stats_loras ON tag_stats(loras DESC, tag)"
+        )
+        # Plain B-tree copy of the facet columns of ``lora_index``. ``entry_id``
+        # is the rowid of the matching ``lora_index`` row so filters can be
+        # joined without scanning the FTS table. ``name`` and the file
+        # ``size`` back the indexes used to page the name and size sorts.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS lora_facets (
+                filename TEXT PRIMARY KEY,
+                entry_id INTEGER,
+                architecture TEXT,
+                base_model TEXT,
+                name TEXT COLLATE NOCASE,
+                size INTEGER
+            ) WITHOUT ROWID
+            """
+        )
+        added = self._ensure_columns(
+            "lora_facets", {"name": "TEXT COLLATE NOCASE", "size": "INTEGER"}
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_facets_architecture ON lora_facets(architecture)"
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_facets_base_model ON lora_facets(base_model)"
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_facets_entry ON lora_facets(entry_id)"
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_facets_name ON lora_facets(name, entry_id)"
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_facets_size ON lora_facets(size, entry_id)"
+        )
+        # Change feed for mirrors: the latest change of every LoRA file. A
+        # new change replaces the previous row so ``seq`` only grows and
+        # ``AUTOINCREMENT`` keeps it from being reused after deletes.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS lora_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT UNIQUE,
+                deleted INTEGER,
+                changed REAL
+            )
+            """
+        )
+        if cur.execute("SELECT 1 FROM lora_changes LIMIT 1").fetchone() is None:
+            # Databases created before the change feed existed
+            cur.execute(
+                """
+                INSERT OR IGNORE INTO lora_changes(filename, deleted, changed)
+                SELECT filename, 0, ? FROM lora_index
+                """,
+                (time.time(),),
+            )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS index_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+            """
+        )
+        # Counters for the dashboard, updated by the write helpers so pages
+        # never count rows or stat files: ``loras`` indexed entries,
+        # ``previews`` preview images, ``bytes`` stored in LoRA files and
+        # ``uncategorized`` indexed LoRAs without a category.
+        # ``category_stats`` holds the number of LoRAs per category.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS library_stats (
+                key TEXT PRIMARY KEY,
+                value INTEGER
+            ) WITHOUT ROWID
+            """
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS category_stats (
+                category_id INTEGER PRIMARY KEY,
+                loras INTEGER
+            )
+            """
+        )
+        if recreated:
+            # Fingerprints and tags refer to rows of the dropped table. Files
+            # found again by the following reindex are re-announced as added.
+            self._record_changes(
+                [r[0] for r in cur.execute("SELECT filename FROM lora_files")], deleted=True
+            )
+            cur.execute("DELETE FROM lora_files")
+            cur.execute("DELETE FROM lora_tags")
+            cur.execute("DELETE FROM tag_stats")
+            cur.execute("DELETE FROM lora_facets")
+        elif cur.execute("SELECT 1 FROM lora_facets LIMIT 1").fetchone() is None:
+            # Databases created before the facet table existed
+            cur.execute(
+                """
+                INSERT OR REPLACE INTO lora_facets(
+                    filename, entry_id, architecture, base_model, name, size
+                )
+                SELECT l.filename, l.rowid, l.architecture, l.base_model, l.name,
+                    COALESCE((SELECT size FROM lora_files f WHERE f.filename = l.filename), 0)
+                FROM lora_index l
+                """
+            )
+        elif added:
+            # Facet rows written before the sort columns existed
+            cur.execute(
+                """
+                UPDATE lora_facets SET
+                    name = (SELECT name FROM lora_index WHERE rowid = lora_facets.entry_id),
+                    size = COALESCE(
+                        (SELECT size FROM lora_files f WHERE f.filename = lora_facets.filename), 0
+                    )
+                """
+            )
+        if recreated or self._get_stat("uncategorized", None) is None:
+            # New database or one created before the counters existed
+            self.reconcile_stats()
+        cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         self.conn.commit()
         return recreated
 
+    def _ensure_columns(self, table: str, columns: Dict[str, str]) -> List[str]:
+        """Add ``columns`` missing from ``table`` created by older versions.
+
+        Returns the names of the added columns.
+        """
+        existing = {r[1] for r in self.conn.execute(f"PRAGMA table_info({table})")}
+        added = []
+        for name, decl in columns.items():
+            if name not in existing:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+                added.append(name)
+        return added
+
+    def _get_state(self, key: str) -> str | None:
+        row = self.conn.execute(
+            "SELECT value FROM index_state WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO index_state(key, value) VALUES (?, ?)",
+            (key, value),
+        )
+
+    def _get_stat(self, key: str, default: int | None = 0) -> int | None:
+        row = self.conn.execute(
+            "SELECT value FROM library_stats WHERE key = ?", (key,)
+        ).fetchone()
+        return int(row[0]) if row else default
+
+    def _set_stat(self, key: str, value: int) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO library_stats(key, value) VALUES (?, ?)",
+            (key, value),
+        )
+
+    def _bump_stat(self, key: str, delta: int) -> None:
+        if delta:
+            self.conn.execute(
+                """
+                INSERT INTO library_stats(key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = value + excluded.value
+                """,
+                (key, delta),
+            )
+
+    def _bump_category(self, category_id: int, delta: int) -> None:
+        if delta:
+            self.conn.execute(
+                """
+                INSERT INTO category_stats(category_id, loras) VALUES (?, ?)
+                ON CONFLICT(category_id) DO UPDATE SET loras = loras + excluded.loras
+                """,
+                (category_id, delta),
+            )
+
+    def reconcile_stats(self, rescan: bool = False) -> Dict[str, int]:
+        """Recompute the dashboard counters from the index tables.
+
+        With ``rescan`` the preview index is rebuilt from the upload folder
+        first. Returns the corrections applied as ``key -> difference``;
+        category counters are reported as ``category:<id>``.
+        """
+        if rescan:
+            self.rebuild_preview_index()
+        drift: Dict[str, int] = {}
+        with self.batch():
+            actual = {
+                "loras": "SELECT COUNT(*) FROM lora_index",
+                "previews": "SELECT COUNT(DISTINCT filename) FROM preview_index",
+                "bytes": "SELECT COALESCE(SUM(size), 0) FROM lora_files",
+                "uncategorized": """
+                    SELECT COUNT(*) FROM lora_facets f WHERE NOT EXISTS (
+                        SELECT 1 FROM lora_category_map m WHERE m.filename = f.filename
+                    )
+                """,
+            }
+            for key, query in actual.items():
+                value = int(self.conn.execute(query).fetchone()[0])
+                if value != self._get_stat(key):
+                    drift[key] = value - self._get_stat(key)
+                self._set_stat(key, value)
+            stored = dict(self.conn.execute("SELECT category_id, loras FROM category_stats"))
+            counted = dict(
+                self.conn.execute(
+                    "SELECT category_id, COUNT(*) FROM lora_category_map GROUP BY category_id"
+                )
+            )
+            for cid in stored.keys() | counted.keys():
+                diff = counted.get(cid, 0) - stored.get(cid, 0)
+                if diff:
+                    drift[f"category:{cid}"] = diff
+            self.conn.execute("DELETE FROM category_stats")
+            self.conn.executemany(
+                "INSERT INTO category_stats(category_id, loras) VALUES (?, ?)",
+                counted.items(),
+            )
+        if drift:
+            logger.info("Corrected statistics drift: %s", drift)
+        return drift
+
+    def start_stats_reconciler(self, interval: float | None = None) -> threading.Thread | None:
+        """Run :py:meth:`reconcile_stats` every ``interval`` seconds.
+
+        Defaults to ``config.STATS_RECONCILE_INTERVAL``; ``0`` disables the
+        background pass. Returns the daemon thread, if started.
+        """
+        if interval is None:
+            interval = config.STATS_RECONCILE_INTERVAL
+        if not interval:
+            return None
+
+        def run() -> None:
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reconcile_stats(rescan=True)
+                except Exception:
+                    logger.exception("Statistics reconciliation failed")
+
+        thread = threading.Thread(target=run, name="stats-reconciler", daemon=True)
+        thread.start()
+        return thread
+
+    def _reindex_complete(self) -> bool:
+        """Return ``False`` if the last reindex pass did not finish."""
+        return self._get_state("reindex_complete") != "0"
+
+    def mark_incomplete(self) -> None:
+        """Make the next start run an incremental reindex pass."""
+        with self.batch():
+            self._set_state("reindex_complete", "0")
+
+    def mark_complete(self) -> None:
+        """Undo :py:meth:`mark_incomplete` once every pending file is indexed."""
+        with self.batch():
+            self._set_state("reindex_complete", "1")
+
     def _is_index_empty(self) -> bool:
         """Return True if the index table has no rows."""
         cur = self.conn.cursor()
@@ -79,24 +521,25 @@ class IndexingAgent:
 
     def _uncategorized_exists(self) -> bool:
         """Return ``True`` if any LoRA has no category assigned."""
-        cur = self.conn.cursor()
-        cur.execute(
-            """
-            SELECT 1 FROM lora_index l
-            LEFT JOIN lora_category_map m ON l.filename = m.filename
-            WHERE m.filename IS NULL
-            LIMIT 1
+        return self._get_stat("uncategorized") > 0
+
+    def _is_uncategorized(self, filename: str) -> bool:
+        """Return whether ``filename`` is indexed and has no category."""
+        row = self.conn.execute(
             """
-        )
-        return cur.fetchone() is not None
+            SELECT 1 FROM lora_facets f WHERE f.filename = ? AND NOT EXISTS (
+                SELECT 1 FROM lora_category_map m WHERE m.filename = f.filename
+            )
+            """,
+            (filename,),
+        ).fetchone()
+        return row is not None
 
     # --- Statistics helpers ----------------------------------------------
 
     def lora_count(self) -> int:
         """Return the total number of indexed LoRA files."""
-        cur = self.conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM lora_index")
-        return int(cur.fetchone()[0])
+        return self._get_stat("loras")
 
     def category_count(self) -> int:
         """Return the number of categories, including the dynamic one."""
@@ -109,21 +552,16 @@ class IndexingAgent:
 
     def preview_count(self) -> int:
         """Return the number of preview images stored in the uploads folder."""
-        uploads = Path(config.UPLOAD_DIR)
-        if not uploads.exists():
-            return 0
-        exts = ["*.png", "*.jpg", "*.jpeg", "*.gif"]
-        return sum(len(list(uploads.glob(p))) for p in exts)
+        return self._get_stat("previews")
 
     def top_categories(self, limit: int = 10) -> List[Dict[str, str]]:
         """Return ``limit`` categories with the most assigned LoRAs."""
         cur = self.conn.cursor()
         rows = cur.execute(
             """
-            SELECT c.id, c.name, COUNT(m.filename) AS cnt
+            SELECT c.id, c.name, COALESCE(s.loras, 0) AS cnt
             FROM categories c
-            LEFT JOIN lora_category_map m ON c.id = m.category_id
-            GROUP BY c.id
+            LEFT JOIN category_stats s ON s.category_id = c.id
             ORDER BY cnt DESC, c.name
             LIMIT ?
             """,
@@ -131,14 +569,7 @@ class IndexingAgent:
         ).fetchall()
         categories = [{"id": r[0], "name": r[1], "count": int(r[2])} for r in rows]
         # Insert uncategorised entry if required
-        cur.execute(
-            """
-            SELECT COUNT(*) FROM lora_index l
-            LEFT JOIN lora_category_map m ON l.filename = m.filename
-            WHERE m.filename IS NULL
-            """
-        )
-        uncategorised = int(cur.fetchone()[0])
+        uncategorised = self._get_stat("uncategorized")
         if uncategorised:
             categories.append(
                 {
@@ -166,54 +597,705 @@ class IndexingAgent:
 
         return categories
 
-    def add_metadata(self, data: Dict[str, str]) -> None:
+    def _insert_entries(self, entries: List[Dict[str, str]]) -> None:
+        """Insert index rows and parsed tags for ``entries``.
+
+        Only the tag names, most frequent first, are stored in the FTS
+        ``tags`` column; counts go to ``lora_tags``.
+        """
+        if len(entries) > _SUGGEST_UPDATE_LIMIT:
+            self._suggest = None
+        for data in entries:
+            filename = data.get("filename", "")
+            architecture = data.get("modelspec.architecture", "")
+            base_model = data.get("ss_base_model_version", "")
+            tags = parse_tag_frequency(data.get("ss_tag_frequency", ""))
+            ordered = sorted(tags.items(), key=lambda t: (-t[1], t[0]))
+            if not self.conn.execute(
+                "SELECT 1 FROM lora_facets WHERE filename = ?", (filename,)
+            ).fetchone() and not self.conn.execute(
+                "SELECT 1 FROM lora_category_map WHERE filename = ? LIMIT 1", (filename,)
+            ).fetchone():
+                self._bump_stat("uncategorized", 1)
+            cur = self.conn.execute(
+                """
+                INSERT INTO lora_index(filename, name, architecture, tags, base_model)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (
+                    filename,
+                    data.get("modelspec.title", ""),
+                    architecture,
+                    ", ".join(t for t, _ in ordered),
+                    base_model,
+                ),
+            )
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO lora_facets(
+                    filename, entry_id, architecture, base_model, name, size
+                )
+                VALUES (?, ?, ?, ?, ?,
+                    COALESCE((SELECT size FROM lora_files WHERE filename = ?), 0))
+                """,
+                (
+                    filename,
+                    cur.lastrowid,
+                    architecture,
+                    base_model,
+                    data.get("modelspec.title", ""),
+                    filename,
+                ),
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO lora_tags(filename, tag, count) VALUES (?, ?, ?)",
+                [(filename, t, c) for t, c in ordered],
+            )
+            self.conn.executemany(
+                """
+                INSERT INTO tag_stats(tag, loras, total) VALUES (?, 1, ?)
+                ON CONFLICT(tag) DO UPDATE
+                SET loras = loras + 1, total = total + excluded.total
+                """,
+                ordered,
+            )
+            if self._suggest is not None:
+                self._suggest.add("model", filename, self._display_name(data))
+                for tag, _ in ordered:
+                    self._suggest.add("tag", tag, tag)
+        self._bump_stat("loras", len(entries))
+        self._record_changes([data.get("filename", "") for data in entries])
+
+    def _record_changes(self, filenames: List[str], deleted: bool = False) -> None:
+        """Append ``filenames`` to the change feed as added or deleted."""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO lora_changes(filename, deleted, changed) VALUES (?, ?, ?)",
+            [(f, int(deleted), now) for f in filenames],
+        )
+
+    def changes(self, since: int = 0, limit: int = 1000) -> Tuple[List[Dict[str, str]], int]:
+        """Return up to ``limit`` changes after sequence number ``since``.
+
+        Every LoRA appears once with its latest state: ``deleted`` files have
+        no ``size`` or ``sha256``. The second value is the newest sequence
+        number; a client whose ``since`` exceeds it follows a database that
+        was recreated and should start over from ``0``.
+        """
+        rows = self.conn.execute(
+            """
+            SELECT c.seq, c.filename, c.deleted, c.changed, f.size, f.sha256
+            FROM lora_changes c
+            LEFT JOIN lora_files f ON f.filename = c.filename AND NOT c.deleted
+            WHERE c.seq > ?
+            ORDER BY c.seq
+            LIMIT ?
+            """,
+            (since, limit),
+        ).fetchall()
+        latest = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM lora_changes").fetchone()[0]
+        return [
+            {
+                "seq": seq,
+                "filename": filename,
+                "deleted": bool(deleted),
+                "changed": changed,
+                "size": size,
+                "sha256": sha256,
+            }
+            for seq, filename, deleted, changed, size, sha256 in rows
+        ], latest
+
+    def _delete_entries(
+        self, filenames: List[str], rowids: Dict[str, List[int]] | None = None
+    ) -> None:
+        """Delete index rows, facets and tags of ``filenames``.
+
+        ``rowids`` maps filenames to known ``lora_index`` rowids and avoids
+        scanning the FTS table for them.
+        """
+        if len(filenames) > _SUGGEST_UPDATE_LIMIT:
+            self._suggest = None
+        deleted = 0
+        for filename in filenames:
+            if self._suggest is not None:
+                self._suggest.remove("model", filename)
+            if rowids is None:
+                cur = self.conn.execute(
+                    "DELETE FROM lora_index WHERE filename = ?", (filename,)
+                )
+            else:
+                cur = self.conn.executemany(
+                    "DELETE FROM lora_index WHERE rowid = ?",
+                    [(r,) for r in rowids.pop(filename, [])],
+                )
+            deleted += max(cur.rowcount, 0)
+            if self._is_uncategorized(filename):
+                self._bump_stat("uncategorized", -1)
+            self.conn.execute("DELETE FROM lora_facets WHERE filename = ?", (filename,))
+            tags = self.conn.execute(
+                "SELECT tag, count FROM lora_tags WHERE filename = ?", (filename,)
+            ).fetchall()
+            if not tags:
+                continue
+            self.conn.executemany(
+                "UPDATE tag_stats SET loras = loras - 1, total = total - ? WHERE tag = ?",
+                [(c, t) for t, c in tags],
+            )
+            self.conn.execute("DELETE FROM lora_tags WHERE filename = ?", (filename,))
+        self._bump_stat("loras", -deleted)
+        if self._suggest is not None:
+            for (tag,) in self.conn.execute("SELECT tag FROM tag_stats WHERE loras <= 0"):
+                self._suggest.remove("tag", tag)
+        self.conn.execute("DELETE FROM tag_stats WHERE loras <= 0")
+
+    @staticmethod
+    def _fingerprint(path: Path) -> tuple[int, int, int]:
+        st = path.stat()
+        return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def add_metadata(self, data: Dict[str, str], path: Path | None = None) -> None:
+        """Add ``data`` to the index.
+
+        If the ``path`` of the indexed file is given, its fingerprint and the
+        full metadata are stored as well so :py:meth:`get_metadata` can serve
+        them without reparsing the file.
+        """
+        with self.batch():
+            filename = data.get("filename", "")
+            # Replace an earlier entry for the same file, found through its
+            # facet row so the FTS table is not scanned
+            row = self.conn.execute(
+                "SELECT entry_id FROM lora_facets WHERE filename = ?", (filename,)
+            ).fetchone()
+            if row is not None:
+                self._delete_entries([filename], rowids={filename: [row[0]]})
+            self._insert_entries([data])
+            if path is not None:
+                self._store_file(path.name, self._fingerprint(path), data)
+
+    def _count_file_size(self, filename: str, size: int) -> None:
+        """Account for ``filename`` being stored with ``size`` bytes."""
+        row = self.conn.execute(
+            "SELECT size FROM lora_files WHERE filename = ?", (filename,)
+        ).fetchone()
+        previous = (row[0] or 0) if row else 0
+        self._bump_stat("bytes", size - previous)
+
+    def _delete_files(self, filenames: Iterable[str]) -> None:
+        """Drop the fingerprints of ``filenames`` and their stored bytes."""
+        for filename in filenames:
+            row = self.conn.execute(
+                "SELECT size FROM lora_files WHERE filename = ?", (filename,)
+            ).fetchone()
+            if row is None:
+                continue
+            self._bump_stat("bytes", -(row[0] or 0))
+            self.conn.execute("DELETE FROM lora_files WHERE filename = ?", (filename,))
+            self.metadata_cache.pop(filename)
+
+    def _store_file(
+        self, filename: str, fingerprint: tuple[int, int, int], data: Dict[str, str]
+    ) -> None:
+        self._count_file_size(filename, fingerprint[0])
+        self.conn.execute(
+            "UPDATE lora_facets SET size = ? WHERE filename = ?", (fingerprint[0], filename)
+        )
+        # A known content hash stays valid while the fingerprint is unchanged
         self.conn.execute(
             """
-            INSERT INTO lora_index(filename, name, architecture, tags, base_model)
+            INSERT INTO lora_files(filename, size, mtime_ns, inode, metadata)
             VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(filename) DO UPDATE SET
+                size = excluded.size,
+                mtime_ns = excluded.mtime_ns,
+                inode = excluded.inode,
+                metadata = excluded.metadata,
+                sha256 = CASE
+                    WHEN (size, mtime_ns, inode)
+                        = (excluded.size, excluded.mtime_ns, excluded.inode)
+                    THEN sha256
+                END
             """,
-            (
-                data.get("filename", ""),
-                data.get("modelspec.title", ""),
-                data.get("modelspec.architecture", ""),
-                data.get("ss_tag_frequency", ""),
-                data.get("ss_base_model_version", ""),
-            ),
+            (filename, *fingerprint, json.dumps(data)),
         )
-        self.conn.commit()
+        self.metadata_cache.pop(filename)
+
+    def set_file_hash(self, path: Path, sha256: str) -> None:
+        """Record the content hash of the LoRA file at ``path``.
+
+        The hash is tied to the current fingerprint of the file; stored
+        metadata is kept only if the fingerprint did not change.
+        """
+        fingerprint = self._fingerprint(path)
+        with self.batch():
+            self._count_file_size(path.name, fingerprint[0])
+            self.conn.execute(
+                "UPDATE lora_facets SET size = ? WHERE filename = ?",
+                (fingerprint[0], path.name),
+            )
+            self.conn.execute(
+                """
+                INSERT INTO lora_files(filename, size, mtime_ns, inode, sha256)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(filename) DO UPDATE SET
+                    size = excluded.size,
+                    mtime_ns = excluded.mtime_ns,
+                    inode = excluded.inode,
+                    sha256 = excluded.sha256,
+                    metadata = CASE
+                        WHEN (size, mtime_ns, inode)
+                            = (excluded.size, excluded.mtime_ns, excluded.inode)
+                        THEN metadata
+                    END
+                """,
+                (path.name, *fingerprint, sha256),
+            )
+        self.metadata_cache.pop(path.name)
+
+    def get_file_hash(self, path: Path) -> str | None:
+        """Return the SHA-256 of ``path`` if it is known for its fingerprint."""
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, inode, sha256 FROM lora_files WHERE filename = ?",
+            (path.name,),
+        ).fetchone()
+        if row and tuple(row[:3]) == self._fingerprint(path):
+            return row[3]
+        return None
+
+    def has_file_size(self, size: int, exclude: str | None = None) -> bool:
+        """Return whether a stored LoRA other than ``exclude`` has ``size`` bytes."""
+        row = self.conn.execute(
+            "SELECT 1 FROM lora_files WHERE size = ? AND filename != ? LIMIT 1",
+            (size, exclude or ""),
+        ).fetchone()
+        return row is not None
+
+    def find_duplicate(self, sha256: str, size: int, exclude: str | None = None) -> str | None:
+        """Return the name of a stored LoRA with content hash ``sha256``.
+
+        Only files of the same ``size`` are compared. Files indexed before
+        hashes were recorded, or changed since, are hashed on demand and the
+        result is stored, so the whole library is covered without hashing
+        every file up front.
+        """
+        uploads = Path(config.UPLOAD_DIR)
+        rows = self.conn.execute(
+            "SELECT filename, size, mtime_ns, inode, sha256 FROM lora_files WHERE size = ?",
+            (size,),
+        ).fetchall()
+        for filename, *fingerprint, known in rows:
+            if filename == exclude:
+                continue
+            path = uploads / filename
+            try:
+                current = self._fingerprint(path)
+            except FileNotFoundError:
+                continue
+            if known is None or tuple(fingerprint) != current:
+                known = file_sha256(path)
+                self.set_file_hash(path, known)
+            if known == sha256:
+                return filename
+        return None
+
+    def file_manifest(self, filenames: Iterable[str] | None = None) -> List[Dict[str, str]]:
+        """Return size, modification time and hash of stored LoRA files.
+
+        Without ``filenames`` every known file is listed. ``sha256`` is
+        ``None`` for files whose content hash was not computed yet.
+        """
+        query = "SELECT filename, size, mtime_ns, sha256 FROM lora_files"
+        if filenames is None:
+            rows = self.conn.execute(query + " ORDER BY filename").fetchall()
+        else:
+            names = list(dict.fromkeys(filenames))
+            rows = []
+            for i in range(0, len(names), _MAX_VARS):
+                chunk = names[i : i + _MAX_VARS]
+                rows += self.conn.execute(
+                    query + f" WHERE filename IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+        return [
+            {"filename": name, "size": size, "mtime_ns": mtime_ns, "sha256": sha256}
+            for name, size, mtime_ns, sha256 in rows
+        ]
+
+    def get_metadata(self, path: Path) -> Dict[str, str]:
+        """Return the full metadata of the LoRA file at ``path``.
+
+        Metadata is served from an in-process LRU or the ``lora_files`` table
+        as long as the file fingerprint is unchanged. Otherwise the file is
+        parsed again and both its stored metadata and index entry are
+        refreshed.
+        """
+        fingerprint = self._fingerprint(path)
+        cached = self.metadata_cache.get(path.name)
+        if cached and cached[0] == fingerprint:
+            return dict(cached[1])
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, inode, metadata FROM lora_files WHERE filename = ?",
+            (path.name,),
+        ).fetchone()
+        if row and tuple(row[:3]) == fingerprint and row[3]:
+            meta = json.loads(row[3])
+        else:
+            meta = MetadataExtractorAgent().extract(path)
+            with self.batch():
+                if row and tuple(row[:3]) != fingerprint:
+                    # File changed on disk, the index entry is outdated too
+                    self._delete_entries([path.name])
+                    self._insert_entries([meta])
+                self._store_file(path.name, fingerprint, meta)
+        self.metadata_cache.put(path.name, (fingerprint, meta))
+        return dict(meta)
 
     def search(
         self,
         query: str,
         limit: int | None = None,
         offset: int = 0,
+        with_categories: bool = False,
+        sort: str = "relevance",
+        cursor: str | None = None,
+        architecture: str | None = None,
+        base_model: str | None = None,
     ) -> List[Dict[str, str]]:
-        cur = self.conn.cursor()
-        if query == "*":
+        """Return index entries matching the FTS ``query``.
+
+        With ``with_categories`` every entry also carries its category names
+        under ``categories``, fetched by the same query. See
+        :py:meth:`search_page` for the remaining parameters.
+        """
+        entries, _ = self.search_page(
+            query,
+            limit,
+            offset,
+            with_categories,
+            sort=sort,
+            cursor=cursor,
+            architecture=architecture,
+            base_model=base_model,
+        )
+        return entries
+
+    def search_page(
+        self,
+        query: str,
+        limit: int | None = None,
+        offset: int = 0,
+        with_categories: bool = False,
+        category_id: int | None = None,
+        sort: str = "relevance",
+        cursor: str | None = None,
+        architecture: str | None = None,
+        base_model: str | None = None,
+    ) -> Tuple[List[Dict[str, str]], str | None]:
+        """Return a page of matching entries and the cursor of the next page.
+
+        ``sort`` is one of :py:attr:`SORT_MODES`. ``relevance`` ranks FTS
+        matches by bm25 using :py:attr:`BM25_WEIGHTS` and keeps index order
+        for ``*``; ``newest`` and ``size`` sort descending, ``name``
+        ascending. Passing the returned cursor continues after the last entry
+        of this page without an ``OFFSET`` scan; ``offset`` is ignored then.
+        The next cursor is ``None`` when ``limit`` is not set or no further
+        rows exist. ``category_id``, ``architecture`` and ``base_model``
+        restrict the results to exact facet values. ``ValueError`` is raised
+        for unknown sort modes or malformed cursors.
+        """
+        if sort not in self.SORT_MODES:
+            raise ValueError(f"unknown sort mode {sort!r}")
+        sql, params = self._page_sql(
+            query,
+            limit,
+            offset,
+            with_categories,
+            category_id,
+            sort,
+            cursor,
+            architecture,
+            base_model,
+        )
+        rows = self.conn.execute(sql, params).fetchall()
+        next_cursor = None
+        if limit is not None and rows and len(rows) == limit:
+            last = rows[-1]
+            next_cursor = self._encode_cursor(sort, last[-2], last[-1])
+        return self._rows_to_entries(rows, with_categories), next_cursor
+
+    def _page_sql(
+        self,
+        query: str,
+        limit: int | None,
+        offset: int,
+        with_categories: bool,
+        category_id: int | None,
+        sort: str,
+        cursor: str | None,
+        architecture: str | None,
+        base_model: str | None,
+    ) -> Tuple[str, List]:
+        """Return the statement and parameters of one :py:meth:`search_page`.
+
+        Only bm25 ranking has to look at every match. The other sorts seek
+        the cursor position on the ``lora_index`` rowid or on the indexed
+        ``name`` and ``size`` columns of ``lora_facets`` and stop after
+        ``limit`` rows.
+        """
+        columns = self._entry_columns(with_categories)
+        if sort == "relevance" and query and query != "*":
+            joins, where, params = self._filter_sql(
+                query, category_id, architecture, base_model
+            )
+            weights = ", ".join(str(w) for w in self.BM25_WEIGHTS)
+            sql = (
+                f"SELECT {columns}, bm25(lora_index, {weights}) AS sort_key, "
+                f"l.rowid AS sort_rowid FROM lora_index l{joins} "
+                f"WHERE {' AND '.join(where)}"
+            )
+            sql = f"SELECT * FROM ({sql})"
+            if cursor:
+                last_key, last_rowid = self._decode_cursor(cursor, sort)
+                sql += " WHERE (sort_key > ? OR (sort_key = ? AND sort_rowid > ?))"
+                params.extend([last_key, last_key, last_rowid])
+                offset = 0
+            order = "sort_key, sort_rowid"
+        elif sort in ("relevance", "newest"):
+            joins, where, params = self._filter_sql(
+                query, category_id, architecture, base_model
+            )
+            op, direction = (">", "ASC") if sort == "relevance" else ("<", "DESC")
+            if cursor:
+                _, last_rowid = self._decode_cursor(cursor, sort)
+                where.append(f"l.rowid {op} ?")
+                params.append(last_rowid)
+                offset = 0
             sql = (
-                "SELECT filename, name, architecture, tags, base_model FROM lora_index"
+                f"SELECT {columns}, l.rowid AS sort_key, l.rowid AS sort_rowid "
+                f"FROM lora_index l{joins}"
             )
-            params = []
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            order = f"l.rowid {direction}"
         else:
-            sql = "SELECT filename, name, architecture, tags, base_model FROM lora_index WHERE lora_index MATCH ?"
-            params = [query]
+            joins, where, params = self._filter_sql(
+                query, category_id, architecture, base_model, facets_joined=True
+            )
+            op, direction = (">", "ASC") if sort == "name" else ("<", "DESC")
+            if cursor:
+                last_key, last_rowid = self._decode_cursor(cursor, sort)
+                where.append(f"(fa.{sort}, fa.entry_id) {op} (?, ?)")
+                params.extend([last_key, last_rowid])
+                offset = 0
+            # Without a text query the planner would scan the FTS table
+            # first; CROSS JOIN keeps the walk over the facet index outermost.
+            join = "JOIN" if query and query != "*" else "CROSS JOIN"
+            sql = (
+                f"SELECT {columns}, fa.{sort} AS sort_key, fa.entry_id AS sort_rowid "
+                f"FROM lora_facets fa {join} lora_index l ON l.rowid = fa.entry_id{joins}"
+            )
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            order = f"fa.{sort} {direction}, fa.entry_id {direction}"
+        sql += f" ORDER BY {order}"
         if limit is not None:
             sql += " LIMIT ? OFFSET ?"
             params.extend([limit, offset])
         elif offset:
             sql += " LIMIT -1 OFFSET ?"
             params.append(offset)
-        rows = cur.execute(sql, params).fetchall()
-        return [
-            {
+        return sql, params
+
+    def _filter_sql(
+        self,
+        query: str,
+        category_id: int | None = None,
+        architecture: str | None = None,
+        base_model: str | None = None,
+        facets_joined: bool = False,
+    ) -> Tuple[str, List[str], List]:
+        """Return joins, WHERE clauses and parameters selecting ``lora_index l``.
+
+        With ``facets_joined`` the caller already joins ``lora_facets fa``
+        and categories are matched on its filename.
+        """
+        joins = ""
+        where: List[str] = []
+        params: List = []
+        if architecture is not None or base_model is not None:
+            if not facets_joined:
+                joins += " JOIN lora_facets fa ON fa.entry_id = l.rowid"
+            if architecture is not None:
+                where.append("fa.architecture = ?")
+                params.append(architecture)
+            if base_model is not None:
+                where.append("fa.base_model = ?")
+                params.append(base_model)
+        owner = "fa" if facets_joined else "l"
+        if category_id == self.NO_CATEGORY_ID:
+            joins += f" LEFT JOIN lora_category_map m ON {owner}.filename = m.filename"
+            where.append("m.filename IS NULL")
+        elif category_id is not None:
+            joins += f" JOIN lora_category_map m ON {owner}.filename = m.filename"
+            where.append("m.category_id = ?")
+            params.append(category_id)
+        if query and query != "*":
+            where.append("l.lora_index MATCH ?")
+            params.append(query)
+        return joins, where, params
+
+    def facets(
+        self,
+        query: str = "*",
+        category_id: int | None = None,
+        architecture: str | None = None,
+        base_model: str | None = None,
+        tag_limit: int = 20,
+    ) -> Dict[str, List[Dict[str, str]]]:
+        """Return per-value counts of the LoRAs matching the given filters.
+
+        The result maps ``architecture``, ``base_model``, ``category`` and
+        ``tag`` to lists of ``{"value", "count"}`` dictionaries sorted by
+        count; category entries carry an ``id`` as well. Without any filter
+        the counts come straight from the indexed side tables, otherwise
+        they are grouped over the matching ``lora_facets`` rows; the FTS
+        table is only joined for a text query.
+        """
+        match = bool(query) and query != "*"
+        filtered = (
+            match
+            or category_id is not None
+            or architecture is not None
+            or base_model is not None
+        )
+        joins, where, params = self._filter_sql(
+            query, category_id, architecture, base_model, facets_joined=True
+        )
+        if match:
+            joins = " JOIN lora_index l ON l.rowid = fa.entry_id" + joins
+        source = f"lora_facets fa{joins}"
+
+        def select(
+            columns: str, extra: str = "", cond: str | None = None, tail: str = ""
+        ) -> List[tuple]:
+            clauses = where + ([cond] if cond else [])
+            sql = f"SELECT {columns} FROM {source}{extra}"
+            if clauses:
+                sql += " WHERE " + " AND ".join(clauses)
+            return self.conn.execute(sql + tail, params).fetchall()
+
+        def grouped(column: str) -> List[Dict[str, str]]:
+            rows = select(
+                f"fa.{column}, COUNT(*) AS cnt",
+                tail=f" GROUP BY fa.{column} ORDER BY cnt DESC, fa.{column}",
+            )
+            return [{"value": r[0], "count": r[1]} for r in rows]
+
+        result = {
+            "architecture": grouped("architecture"),
+            "base_model": grouped("base_model"),
+        }
+        if filtered:
+            rows = select(
+                "c.id, c.name, COUNT(*) AS cnt",
+                " JOIN lora_category_map cm ON cm.filename = fa.filename"
+                " JOIN categories c ON c.id = cm.category_id",
+                tail=" GROUP BY c.id ORDER BY cnt DESC, c.name",
+            )
+            uncategorised = select(
+                "COUNT(*)",
+                cond="NOT EXISTS (SELECT 1 FROM lora_category_map x"
+                " WHERE x.filename = fa.filename)",
+            )[0][0]
+        else:
+            rows = self.conn.execute(
+                """
+                SELECT c.id, c.name, s.loras FROM category_stats s
+                JOIN categories c ON c.id = s.category_id
+                WHERE s.loras > 0 ORDER BY s.loras DESC, c.name
+                """
+            ).fetchall()
+            uncategorised = self._get_stat("uncategorized")
+        categories = [{"id": r[0], "value": r[1], "count": r[2]} for r in rows]
+        if uncategorised:
+            categories.append(
+                {
+                    "id": self.NO_CATEGORY_ID,
+                    "value": self.NO_CATEGORY_NAME,
+                    "count": uncategorised,
+                }
+            )
+            categories.sort(key=lambda c: -c["count"])
+        result["category"] = categories
+        if not tag_limit:
+            result["tag"] = []
+        elif filtered:
+            rows = select(
+                "t.tag, COUNT(*) AS cnt",
+                " JOIN lora_tags t ON t.filename = fa.filename",
+                tail=f" GROUP BY t.tag ORDER BY cnt DESC, t.tag LIMIT {int(tag_limit)}",
+            )
+            result["tag"] = [{"value": r[0], "count": r[1]} for r in rows]
+        else:
+            result["tag"] = [
+                {"value": t["tag"], "count": t["loras"]}
+                for t in self.top_tags(tag_limit)
+            ]
+        return result
+
+    @staticmethod
+    def _encode_cursor(sort: str, key, rowid: int) -> str:
+        raw = json.dumps([sort, key, rowid]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, sort: str) -> tuple:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            cursor_sort, key, rowid = json.loads(raw)
+        except (binascii.Error, ValueError, TypeError) as exc:
+            raise ValueError("invalid cursor") from exc
+        if cursor_sort != sort or not isinstance(rowid, int):
+            raise ValueError("cursor does not match the sort mode")
+        return key, rowid
+
+    def _entry_columns(self, with_categories: bool) -> str:
+        columns = "l.filename, l.name, l.architecture, l.tags, l.base_model"
+        if with_categories:
+            # Category names joined with the ASCII unit separator, which
+            # cannot appear in names typed into the category forms.
+            columns += (
+                ", (SELECT group_concat(c.name, char(31)) FROM lora_category_map cm"
+                " JOIN categories c ON c.id = cm.category_id"
+                " WHERE cm.filename = l.filename)"
+            )
+        return columns
+
+    def _rows_to_entries(self, rows: List[tuple], with_categories: bool) -> List[Dict[str, str]]:
+        entries = []
+        for r in rows:
+            entry = {
                 "filename": r[0],
                 "name": r[1],
                 "architecture": r[2],
                 "tags": r[3],
                 "base_model": r[4],
             }
-            for r in rows
-        ]
+            if with_categories:
+                names = sorted(r[5].split("\x1f")) if r[5] else []
+                entry["categories"] = names or [self.NO_CATEGORY_NAME]
+            entries.append(entry)
+        return entries
+
+    def has_entry(self, filename: str) -> bool:
+        """Return whether ``filename`` is indexed, without scanning the FTS table."""
+        return (
+            self.conn.execute(
+                "SELECT 1 FROM lora_facets WHERE filename = ?", (filename,)
+            ).fetchone()
+            is not None
+        )
 
     def get_entry(self, filename: str) -> Dict[str, str] | None:
         """Return a single index entry identified by ``filename``."""
@@ -233,34 +1315,368 @@ class IndexingAgent:
             }
         return None
 
-    def reindex_all(self) -> None:
-        """Index all safetensors files found in the upload directory."""
+    def reindex_all(
+        self,
+        full: bool = False,
+        workers: int | None = None,
+        batch_size: int | None = None,
+        progress: Callable[[int, int, float], None] | None = None,
+    ) -> Dict[str, float]:
+        """Index all safetensors files found in the upload directory.
+
+        Headers are read by a thread pool and written in one transaction per
+        ``batch_size`` files. Files whose ``(size, mtime, inode)`` fingerprint
+        matches the previous pass are skipped, and entries for files that
+        disappeared are dropped. Fingerprints are committed together with
+        their index rows, so an interrupted pass resumes where it stopped.
+
+        Parameters
+        ----------
+        full:
+            Discard the existing index and fingerprints before scanning.
+        workers:
+            Number of header reader threads. Defaults to
+            ``config.REINDEX_WORKERS``.
+        batch_size:
+            Number of files written per transaction. Defaults to
+            ``config.REINDEX_BATCH_SIZE``.
+        progress:
+            Optional callback receiving ``(done, total, files_per_second)``
+            after every batch.
+
+        Returns a dictionary with the ``scanned``, ``indexed``, ``skipped``
+        and ``removed`` file counts and the ``elapsed`` time in seconds.
+        """
+        stats: Dict[str, float] = {
+            "scanned": 0,
+            "indexed": 0,
+            "skipped": 0,
+            "removed": 0,
+            "elapsed": 0.0,
+        }
         uploads = Path(config.UPLOAD_DIR)
         if not uploads.exists():
-            return
+            return stats
+        workers = workers or config.REINDEX_WORKERS
+        batch_size = batch_size or config.REINDEX_BATCH_SIZE
+        start = time.monotonic()
+
+        with self.batch():
+            if full:
+                self._record_changes(
+                    [r[0] for r in self.conn.execute("SELECT filename FROM lora_files")],
+                    deleted=True,
+                )
+                self.conn.execute("DELETE FROM lora_index")
+                self.conn.execute("DELETE FROM lora_files")
+                self.conn.execute("DELETE FROM lora_tags")
+                self.conn.execute("DELETE FROM tag_stats")
+                self.conn.execute("DELETE FROM lora_facets")
+                self._set_stat("loras", 0)
+                self._set_stat("bytes", 0)
+                self._set_stat("uncategorized", 0)
+                self.metadata_cache.clear()
+            self._set_state("reindex_complete", "0")
+        known: Dict[str, tuple[int, int, int] | None] = {}
+        for filename, size, mtime_ns, inode, stored in self.conn.execute(
+            "SELECT filename, size, mtime_ns, inode, metadata IS NOT NULL FROM lora_files"
+        ):
+            # Rows holding only a content hash still need to be indexed
+            known[filename] = (size, mtime_ns, inode) if stored else None
+        rowids: Dict[str, List[int]] = {}
+        for rowid, filename in self.conn.execute(
+            "SELECT rowid, filename FROM lora_index"
+        ):
+            rowids.setdefault(filename, []).append(rowid)
+
+        pending: List[tuple[Path, tuple[int, int, int]]] = []
+        seen: set[str] = set()
+        with os.scandir(uploads) as it:
+            for entry in it:
+                if not entry.name.endswith(".safetensors") or not entry.is_file():
+                    continue
+                st = entry.stat()
+                fingerprint = (st.st_size, st.st_mtime_ns, st.st_ino)
+                seen.add(entry.name)
+                if known.get(entry.name) == fingerprint:
+                    stats["skipped"] += 1
+                    continue
+                pending.append((Path(entry.path), fingerprint))
+        stats["scanned"] = len(seen)
+
+        removed = [name for name in known if name not in seen]
+        if removed:
+            with self.batch():
+                self._delete_entries(removed, rowids)
+                self._record_changes(removed, deleted=True)
+                self._delete_files(removed)
+            stats["removed"] = len(removed)
+
+        total = len(pending)
         extractor = MetadataExtractorAgent()
-        for file in uploads.glob("*.safetensors"):
-            meta = extractor.extract(file)
-            self.add_metadata(meta)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for offset in range(0, total, batch_size):
+                chunk = pending[offset : offset + batch_size]
+                metas = list(pool.map(extractor.extract, [p for p, _ in chunk]))
+                with self.batch():
+                    self._delete_entries([path.name for path, _ in chunk], rowids)
+                    self._insert_entries(metas)
+                    for (path, fp), meta in zip(chunk, metas):
+                        self._store_file(path.name, fp, meta)
+                done = offset + len(chunk)
+                stats["indexed"] = done
+                elapsed = time.monotonic() - start
+                rate = done / elapsed if elapsed else 0.0
+                logger.info("Reindexed %d/%d files (%.1f files/s)", done, total, rate)
+                if progress:
+                    progress(done, total, rate)
+
+        with self.batch():
+            self._set_state("reindex_complete", "1")
+        stats["elapsed"] = time.monotonic() - start
+        return stats
 
     def remove_metadata(self, filename: str) -> None:
         """Remove a LoRA entry from the index by filename."""
-        self.conn.execute(
-            "DELETE FROM lora_index WHERE filename = ?",
-            (filename,),
+        with self.batch():
+            self._delete_entries([filename])
+            self._record_changes([filename], deleted=True)
+            self._delete_files([filename])
+
+    # --- Suggestions -----------------------------------------------------
+
+    @staticmethod
+    def _display_name(data: Dict[str, str]) -> str:
+        filename = data.get("filename", "")
+        return data.get("modelspec.title") or Path(filename).stem
+
+    def _suggest_index(self) -> SuggestIndex:
+        """Return the suggestion index, building it from the database first."""
+        index = self._suggest
+        if index is None:
+            with self._lock:
+                items = [
+                    ("model", r[0], r[1] or Path(r[0]).stem)
+                    for r in self.conn.execute("SELECT filename, name FROM lora_index")
+                ]
+                items.extend(
+                    ("tag", r[0], r[0])
+                    for r in self.conn.execute("SELECT tag FROM tag_stats")
+                )
+                items.extend(
+                    ("category", str(r[0]), r[1])
+                    for r in self.conn.execute("SELECT id, name FROM categories")
+                )
+                index = self._suggest = SuggestIndex(items)
+        return index
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, str]]:
+        """Return model names, tags and categories matching ``prefix``.
+
+        Model suggestions carry their ``filename`` and categories their
+        ``id`` so the caller can link to them directly.
+        """
+        results = []
+        for kind, ref, value in self._suggest_index().complete(prefix, limit):
+            item: Dict[str, str] = {"type": kind, "value": value}
+            if kind == "model":
+                item["filename"] = ref
+            elif kind == "category":
+                item["id"] = int(ref)
+            results.append(item)
+        return results
+
+    # --- Tag queries -----------------------------------------------------
+
+    def top_tags(self, limit: int = 20) -> List[Dict[str, int]]:
+        """Return the ``limit`` tags used by the most LoRAs."""
+        rows = self.conn.execute(
+            "SELECT tag, loras, total FROM tag_stats ORDER BY loras DESC, tag LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [{"tag": r[0], "loras": r[1], "count": r[2]} for r in rows]
+
+    def tag_autocomplete(self, prefix: str, limit: int = 10) -> List[Dict[str, int]]:
+        """Return up to ``limit`` tags starting with ``prefix``, most used first."""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return self.top_tags(limit)
+        rows = self.conn.execute(
+            """
+            SELECT tag, loras, total FROM tag_stats
+            WHERE tag >= ? AND tag < ?
+            ORDER BY loras DESC, tag LIMIT ?
+            """,
+            (prefix, prefix + "\U0010ffff", limit),
+        ).fetchall()
+        return [{"tag": r[0], "loras": r[1], "count": r[2]} for r in rows]
+
+    def search_by_tags(
+        self,
+        tags: Iterable[str],
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> List[Dict[str, str]]:
+        """Return LoRAs carrying all of ``tags``.
+
+        The rarest tag is resolved first through the ``lora_tags`` tag index
+        and every further tag only probes the remaining candidates.
+        """
+        wanted = sorted({t.strip().lower() for t in tags if t.strip()})
+        if not wanted:
+            return []
+        marks = ",".join("?" * len(wanted))
+        counts = dict(
+            self.conn.execute(
+                f"SELECT tag, loras FROM tag_stats WHERE tag IN ({marks})", wanted
+            ).fetchall()
         )
-        self.conn.commit()
+        if len(counts) < len(wanted):
+            return []
+        wanted.sort(key=lambda t: counts[t])
+        sql = "SELECT t0.filename FROM lora_tags t0"
+        for i in range(1, len(wanted)):
+            sql += (
+                f" JOIN lora_tags t{i} ON t{i}.filename = t0.filename AND t{i}.tag = ?"
+            )
+        sql += " WHERE t0.tag = ? ORDER BY t0.filename"
+        params: List = wanted[1:] + wanted[:1]
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+        elif offset:
+            sql += " LIMIT -1 OFFSET ?"
+            params.append(offset)
+        filenames = [r[0] for r in self.conn.execute(sql, params)]
+        if not filenames:
+            return []
+        entries = {}
+        for i in range(0, len(filenames), _MAX_VARS):
+            chunk = filenames[i : i + _MAX_VARS]
+            rows = self.conn.execute(
+                f"SELECT {self._entry_columns(False)} FROM lora_index l "
+                f"WHERE l.filename IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for e in self._rows_to_entries(rows, False):
+                entries.setdefault(e["filename"], e)
+        return [entries[f] for f in filenames if f in entries]
+
+    # --- Preview index ---------------------------------------------------
+
+    @staticmethod
+    def _preview_stems(filename: str) -> List[str]:
+        """Return the LoRA stems the preview ``filename`` may belong to."""
+        stem = Path(filename).stem
+        stems = [stem]
+        match = _NUMBERED_PREVIEW_RE.match(stem)
+        if match:
+            stems.append(match.group(1))
+        return stems
+
+    def index_previews(self, filenames: Iterable[str]) -> None:
+        """Add preview image ``filenames`` to the preview index."""
+        stems = [
+            (name, self._preview_stems(name))
+            for name in filenames
+            if Path(name).suffix.lower() in PREVIEW_EXTENSIONS
+        ]
+        query = "INSERT OR IGNORE INTO preview_index(stem, filename) VALUES (?, ?)"
+        with self.batch():
+            # Every image has exactly one row under its own stem, so those
+            # inserts count the new images
+            cur = self.conn.executemany(query, [(own[0], name) for name, own in stems])
+            self._bump_stat("previews", max(cur.rowcount, 0))
+            self.conn.executemany(
+                query, [(stem, name) for name, own in stems for stem in own[1:]]
+            )
+
+    def remove_previews(self, filenames: Iterable[str]) -> None:
+        """Drop preview image ``filenames`` from the preview index."""
+        filenames = list(filenames)
+        with self.batch():
+            cur = self.conn.executemany(
+                "DELETE FROM preview_index WHERE stem = ? AND filename = ?",
+                [(Path(name).stem, name) for name in filenames],
+            )
+            self._bump_stat("previews", -max(cur.rowcount, 0))
+            self.conn.executemany(
+                "DELETE FROM preview_index WHERE filename = ?",
+                [(name,) for name in filenames],
+            )
+
+    def rebuild_preview_index(self, directory: Path | None = None) -> int:
+        """Rebuild the preview index with a single scan of ``directory``.
+
+        Defaults to ``config.UPLOAD_DIR`` and returns the number of preview
+        images found.
+        """
+        uploads = Path(directory or config.UPLOAD_DIR)
+        names: List[str] = []
+        if uploads.exists():
+            with os.scandir(uploads) as it:
+                names = [
+                    e.name
+                    for e in it
+                    if Path(e.name).suffix.lower() in PREVIEW_EXTENSIONS
+                    and e.is_file()
+                ]
+        with self.batch():
+            self.conn.execute("DELETE FROM preview_index")
+            self._set_stat("previews", 0)
+            self.index_previews(names)
+            self._set_state("previews_indexed", "1")
+        return len(names)
+
+    def get_previews(self, stem: str) -> List[str]:
+        """Return the sorted preview filenames for ``stem``."""
+        return self.get_previews_many([stem])[stem]
+
+    def get_previews_many(self, stems: Iterable[str]) -> Dict[str, List[str]]:
+        """Return sorted preview filenames for each of ``stems``."""
+        stems = list(dict.fromkeys(stems))
+        result: Dict[str, List[str]] = {stem: [] for stem in stems}
+        for i in range(0, len(stems), _MAX_VARS):
+            chunk = stems[i : i + _MAX_VARS]
+            marks = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT stem, filename FROM preview_index WHERE stem IN ({marks}) "
+                "ORDER BY stem, filename",
+                chunk,
+            )
+            for stem, filename in rows:
+                result[stem].append(filename)
+        return result
 
     # --- Category management helpers ------------------------------------
 
     def create_category(self, name: str) -> int:
         """Create a category if it does not exist and return its id."""
-        cur = self.conn.cursor()
-        cur.execute("INSERT OR IGNORE INTO categories(name) VALUES (?)", (name,))
-        self.conn.commit()
-        cur.execute("SELECT id FROM categories WHERE name = ?", (name,))
-        row = cur.fetchone()
-        return int(row[0]) if row else 0
+        return self.create_categories([name]).get(name, 0)
+
+    def create_categories(self, names: Iterable[str]) -> Dict[str, int]:
+        """Create the missing categories of ``names`` in one transaction.
+
+        Returns a mapping of every name to its category id.
+        """
+        names = list(dict.fromkeys(names))
+        ids: Dict[str, int] = {}
+        with self.batch():
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO categories(name) VALUES (?)",
+                [(name,) for name in names],
+            )
+            for i in range(0, len(names), _MAX_VARS):
+                chunk = names[i : i + _MAX_VARS]
+                marks = ",".join("?" * len(chunk))
+                for cid, name in self.conn.execute(
+                    f"SELECT id, name FROM categories WHERE name IN ({marks})", chunk
+                ):
+                    ids[name] = int(cid)
+        if self._suggest is not None:
+            for name, cid in ids.items():
+                self._suggest.add("category", str(cid), name)
+        return ids
 
     def list_categories(self) -> List[Dict[str, str]]:
         cur = self.conn.cursor()
@@ -277,22 +1693,14 @@ class IndexingAgent:
         cur = self.conn.cursor()
         rows = cur.execute(
             """
-            SELECT c.id, c.name, COUNT(m.filename) AS cnt
+            SELECT c.id, c.name, COALESCE(s.loras, 0) AS cnt
             FROM categories c
-            LEFT JOIN lora_category_map m ON c.id = m.category_id
-            GROUP BY c.id
+            LEFT JOIN category_stats s ON s.category_id = c.id
             ORDER BY c.name
             """
         ).fetchall()
         categories = [{"id": r[0], "name": r[1], "count": int(r[2])} for r in rows]
-        cur.execute(
-            """
-            SELECT COUNT(*) FROM lora_index l
-            LEFT JOIN lora_category_map m ON l.filename = m.filename
-            WHERE m.filename IS NULL
-            """
-        )
-        uncategorised = int(cur.fetchone()[0])
+        uncategorised = self._get_stat("uncategorized")
         if uncategorised:
             categories.insert(
                 0,
@@ -306,27 +1714,121 @@ class IndexingAgent:
 
     def delete_category(self, category_id: int) -> None:
         """Delete a category and its assignments."""
-        self.conn.execute("DELETE FROM categories WHERE id = ?", (category_id,))
-        self.conn.execute(
-            "DELETE FROM lora_category_map WHERE category_id = ?",
-            (category_id,),
-        )
-        self.conn.commit()
+        if self._suggest is not None:
+            self._suggest.remove("category", str(category_id))
+        with self.batch():
+            # Members without another category become uncategorized
+            orphaned = self.conn.execute(
+                """
+                SELECT COUNT(*) FROM lora_category_map m
+                JOIN lora_facets f ON f.filename = m.filename
+                WHERE m.category_id = ? AND NOT EXISTS (
+                    SELECT 1 FROM lora_category_map o
+                    WHERE o.filename = m.filename AND o.category_id != m.category_id
+                )
+                """,
+                (category_id,),
+            ).fetchone()[0]
+            self._bump_stat("uncategorized", orphaned)
+            self.conn.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+            self.conn.execute(
+                "DELETE FROM lora_category_map WHERE category_id = ?",
+                (category_id,),
+            )
+            self.conn.execute(
+                "DELETE FROM category_stats WHERE category_id = ?", (category_id,)
+            )
 
     def assign_category(self, filename: str, category_id: int) -> None:
-        self.conn.execute(
-            "INSERT OR IGNORE INTO lora_category_map(filename, category_id) VALUES (?, ?)",
-            (filename, category_id),
-        )
-        self.conn.commit()
+        self.assign_many([filename], category_id)
 
     def unassign_category(self, filename: str, category_id: int) -> None:
         """Remove ``filename`` from the given ``category_id`` mapping."""
-        self.conn.execute(
-            "DELETE FROM lora_category_map WHERE filename = ? AND category_id = ?",
-            (filename, category_id),
-        )
-        self.conn.commit()
+        self.unassign_many([filename], category_id)
+
+    def _count_uncategorized(self, filenames: List[str]) -> int:
+        """Return how many of ``filenames`` are indexed without a category."""
+        total = 0
+        for i in range(0, len(filenames), _MAX_VARS):
+            chunk = filenames[i : i + _MAX_VARS]
+            marks = ",".join("?" * len(chunk))
+            total += self.conn.execute(
+                f"""
+                SELECT COUNT(*) FROM lora_facets f
+                WHERE f.filename IN ({marks}) AND NOT EXISTS (
+                    SELECT 1 FROM lora_category_map m WHERE m.filename = f.filename
+                )
+                """,
+                chunk,
+            ).fetchone()[0]
+        return total
+
+    def _write_mapping(self, query: str, filenames: Iterable[str], category_id: int) -> int:
+        """Run ``query`` for every filename and keep the counters current.
+
+        Returns the number of mapping rows changed.
+        """
+        filenames = list(dict.fromkeys(filenames))
+        with self.batch():
+            before = self._count_uncategorized(filenames)
+            cur = self.conn.executemany(query, [(f, category_id) for f in filenames])
+            self._bump_stat("uncategorized", self._count_uncategorized(filenames) - before)
+        return max(cur.rowcount, 0)
+
+    def assign_many(self, filenames: Iterable[str], category_id: int) -> int:
+        """Add all ``filenames`` to ``category_id`` in one transaction.
+
+        Returns the number of new assignments.
+        """
+        with self.batch():
+            added = self._write_mapping(
+                "INSERT OR IGNORE INTO lora_category_map(filename, category_id) VALUES (?, ?)",
+                filenames,
+                category_id,
+            )
+            self._bump_category(category_id, added)
+        return added
+
+    def unassign_many(self, filenames: Iterable[str], category_id: int) -> int:
+        """Remove all ``filenames`` from ``category_id`` in one transaction.
+
+        Returns the number of removed assignments.
+        """
+        with self.batch():
+            removed = self._write_mapping(
+                "DELETE FROM lora_category_map WHERE filename = ? AND category_id = ?",
+                filenames,
+                category_id,
+            )
+            self._bump_category(category_id, -removed)
+        return removed
+
+    def move_between_categories(
+        self,
+        source_id: int,
+        target_id: int,
+        filenames: Iterable[str] | None = None,
+    ) -> int:
+        """Move LoRAs from ``source_id`` to ``target_id`` in one transaction.
+
+        Without ``filenames`` every member of ``source_id`` is moved; given
+        filenames that are not in ``source_id`` are ignored. Returns the
+        number of moved LoRAs.
+        """
+        with self.batch():
+            members = [
+                r[0]
+                for r in self.conn.execute(
+                    "SELECT filename FROM lora_category_map WHERE category_id = ?",
+                    (source_id,),
+                )
+            ]
+            if filenames is not None:
+                wanted = set(filenames)
+                members = [f for f in members if f in wanted]
+            self.unassign_many(members, source_id)
+            self.assign_many(members, target_id)
+        return len(members)
 
     def get_categories_for(self, filename: str) -> List[str]:
         cur = self.conn.cursor()
@@ -344,6 +1846,30 @@ class IndexingAgent:
             names.append(self.NO_CATEGORY_NAME)
         return names
 
+    def get_categories_for_many(self, filenames: Iterable[str]) -> Dict[str, List[str]]:
+        """Return category names for each of ``filenames`` in bulk."""
+        filenames = list(dict.fromkeys(filenames))
+        result: Dict[str, List[str]] = {f: [] for f in filenames}
+        cur = self.conn.cursor()
+        for i in range(0, len(filenames), _MAX_VARS):
+            chunk = filenames[i : i + _MAX_VARS]
+            marks = ",".join("?" * len(chunk))
+            rows = cur.execute(
+                f"""
+                SELECT m.filename, c.name FROM categories c
+                JOIN lora_category_map m ON c.id = m.category_id
+                WHERE m.filename IN ({marks})
+                ORDER BY m.filename, c.name
+                """,
+                chunk,
+            )
+            for filename, name in rows:
+                result[filename].append(name)
+        for names in result.values():
+            if not names:
+                names.append(self.NO_CATEGORY_NAME)
+        return result
+
     def get_categories_with_ids(self, filename: str) -> List[Dict[str, str]]:
         """Return categories for ``filename`` including the category IDs."""
         cur = self.conn.cursor()
@@ -360,76 +1886,52 @@ class IndexingAgent:
             return [{"id": r[0], "name": r[1]} for r in rows]
         return [{"id": self.NO_CATEGORY_ID, "name": self.NO_CATEGORY_NAME}]
 
+    def related(self, filename: str, limit: int = 10) -> List[str]:
+        """Return LoRAs sharing categories with ``filename``.
+
+        Files sharing the most categories come first.
+        """
+        rows = self.conn.execute(
+            """
+            SELECT other.filename FROM lora_category_map own
+            JOIN lora_category_map other
+                ON other.category_id = own.category_id AND other.filename != own.filename
+            WHERE own.filename = ?
+            GROUP BY other.filename
+            ORDER BY COUNT(*) DESC, other.filename
+            LIMIT ?
+            """,
+            (filename, limit),
+        ).fetchall()
+        return [r[0] for r in rows]
+
     def search_by_category(
         self,
         category_id: int,
         query: str = "*",
         limit: int | None = None,
         offset: int = 0,
+        with_categories: bool = False,
+        sort: str = "relevance",
+        cursor: str | None = None,
     ) -> List[Dict[str, str]]:
         """Return LoRAs in ``category_id`` optionally filtered by a query."""
-        cur = self.conn.cursor()
-        if category_id == self.NO_CATEGORY_ID:
-            if query == "*" or not query:
-                sql = (
-                    "SELECT l.filename, l.name, l.architecture, l.tags, l.base_model "
-                    "FROM lora_index l LEFT JOIN lora_category_map m ON l.filename = m.filename "
-                    "WHERE m.filename IS NULL"
-                )
-                params: List = []
-            else:
-                sql = (
-                    "SELECT l.filename, l.name, l.architecture, l.tags, l.base_model "
-                    "FROM lora_index l LEFT JOIN lora_category_map m ON l.filename = m.filename "
-                    "WHERE m.filename IS NULL AND l MATCH ?"
-                )
-                params = [query]
-        else:
-            if query == "*" or not query:
-                sql = (
-                    "SELECT l.filename, l.name, l.architecture, l.tags, l.base_model "
-                    "FROM lora_index l JOIN lora_category_map m ON l.filename = m.filename "
-                    "WHERE m.category_id = ?"
-                )
-                params = [category_id]
-            else:
-                sql = (
-                    "SELECT l.filename, l.name, l.architecture, l.tags, l.base_model "
-                    "FROM lora_index l JOIN lora_category_map m ON l.filename = m.filename "
-                    "WHERE m.category_id = ? AND l MATCH ?"
-                )
-                params = [category_id, query]
-        if limit is not None:
-            sql += " LIMIT ? OFFSET ?"
-            params.extend([limit, offset])
-        elif offset:
-            sql += " LIMIT -1 OFFSET ?"
-            params.append(offset)
-        rows = cur.execute(sql, params).fetchall()
-        return [
-            {
-                "filename": r[0],
-                "name": r[1],
-                "architecture": r[2],
-                "tags": r[3],
-                "base_model": r[4],
-            }
-            for r in rows
-        ]
+        entries, _ = self.search_page(
+            query,
+            limit,
+            offset,
+            with_categories,
+            category_id=category_id,
+            sort=sort,
+            cursor=cursor,
+        )
+        return entries
 
     # --- Additional helpers for dashboard --------------------------------
 
     def storage_volume(self) -> int:
         """Return the total size in bytes of all LoRA files."""
-        uploads = Path(config.UPLOAD_DIR)
-        total = 0
-        if uploads.exists():
-            for p in uploads.glob("*.safetensors"):
-                try:
-                    total += p.stat().st_size
-                except OSError:
-                    pass
-        return total
+        return self._get_stat("bytes")
 
     def recent_loras(self, limit: int = 5) -> List[Dict[str, str]]:
         """Return most recently indexed LoRAs."""
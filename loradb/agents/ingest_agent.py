@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict
+
+import config
+from .indexing_agent import IndexingAgent
+from .metadata_extractor_agent import MetadataExtractorAgent
+
+
+class IngestAgent:
+    """Extract metadata and index uploaded files on background threads.
+
+    Every submitted file becomes a job with an id whose state moves from
+    ``queued`` over ``running`` to ``done`` or ``failed``. Only the most recent
+    ``config.INGEST_JOB_HISTORY`` jobs are remembered.
+
+    While jobs are outstanding the index is marked incomplete, so files
+    queued when the process dies are picked up by the incremental reindex
+    on the next start. The mark is cleared again once the queue has drained
+    without a failed job.
+    """
+
+    def __init__(
+        self,
+        indexer: IndexingAgent,
+        extractor: MetadataExtractorAgent | None = None,
+        workers: int | None = None,
+    ) -> None:
+        self.indexer = indexer
+        self.extractor = extractor or MetadataExtractorAgent()
+        self.workers = workers or config.INGEST_WORKERS
+        self.jobs: OrderedDict[str, Dict[str, str]] = OrderedDict()
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        # Queued and running jobs; ``_state_lock`` orders the index state writes
+        self._outstanding = 0
+        self._failed = False
+        self._state_lock = threading.Lock()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"ingest-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, path: Path) -> str:
+        """Queue ``path`` for indexing and return the job id.
+
+        The first job after the queue drained writes the index state, so
+        call this off the event loop.
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "filename": Path(path).name,
+            "status": "queued",
+            "submitted": time.time(),
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+            while len(self.jobs) > config.INGEST_JOB_HISTORY:
+                self.jobs.popitem(last=False)
+        with self._state_lock:
+            self._outstanding += 1
+            if self._outstanding == 1:
+                self.indexer.mark_incomplete()
+        self._start()
+        self._queue.put((job, Path(path)))
+        return job_id
+
+    def status(self, job_id: str) -> Dict[str, str] | None:
+        """Return a copy of the job ``job_id`` or ``None`` if unknown."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def join(self) -> None:
+        """Block until every queued job has finished."""
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            job, path = self._queue.get()
+            try:
+                job["status"] = "running"
+                meta = self.extractor.extract(path)
+                self.indexer.add_metadata(meta, path)
+                if "error" in meta:
+                    job["error"] = meta["error"]
+                job["status"] = "done"
+            except Exception as exc:
+                job["error"] = str(exc)
+                job["status"] = "failed"
+            finally:
+                job["finished"] = time.time()
+                self._finished(job["status"] == "failed")
+                self._queue.task_done()
+
+    def _finished(self, failed: bool) -> None:
+        with self._state_lock:
+            self._failed = self._failed or failed
+            self._outstanding -= 1
+            if not self._outstanding and not self._failed:
+                self.indexer.mark_complete()
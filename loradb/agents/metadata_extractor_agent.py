@@ -1,7 +1,77 @@
+import json
+import math
+import os
 from pathlib import Path
 from typing import Dict
 
-from safetensors import safe_open
+#: Upper bound for the JSON header accepted by ``read_header``. The
+#: safetensors format itself refuses headers larger than 100 MB.
+MAX_HEADER_SIZE = 100 * 1024 * 1024
+
+#: Bytes read by the first ``pread``. Most LoRA headers fit into this so the
+#: whole header is usually read with a single system call.
+_PREFETCH_SIZE = 64 * 1024
+
+
+def read_header(filepath: Path) -> Dict[str, dict]:
+    """Return the parsed JSON header of a safetensors file.
+
+    Only the 8 byte little-endian length prefix and the header itself are
+    read; tensor data is never touched. The result maps tensor names to their
+    ``dtype``, ``shape`` and ``data_offsets`` plus the optional
+    ``__metadata__`` dictionary. ``ValueError`` is raised for files that are
+    not valid safetensors.
+    """
+    fd = os.open(filepath, os.O_RDONLY)
+    try:
+        head = os.pread(fd, 8 + _PREFETCH_SIZE, 0)
+        if len(head) < 8:
+            raise ValueError("file too small for a safetensors header")
+        size = int.from_bytes(head[:8], "little")
+        if size > MAX_HEADER_SIZE:
+            raise ValueError(f"header of {size} bytes exceeds limit")
+        raw = head[8 : 8 + size]
+        if len(raw) < size:
+            raw += os.pread(fd, size - len(raw), 8 + len(raw))
+        if len(raw) < size:
+            raise ValueError("truncated safetensors header")
+    finally:
+        os.close(fd)
+    try:
+        header = json.loads(raw)
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError(f"invalid safetensors header: {exc}") from exc
+    if not isinstance(header, dict):
+        raise ValueError("invalid safetensors header: not an object")
+    return header
+
+
+def summarize_tensors(header: Dict[str, dict]) -> Dict[str, str]:
+    """Return cheap derived statistics for the tensors listed in ``header``.
+
+    The result contains ``tensor_count``, ``tensor_dtypes`` (``dtype:count``
+    pairs sorted by dtype), ``parameter_count`` and ``tensor_bytes``.
+    """
+    count = 0
+    params = 0
+    data_end = 0
+    dtypes: Dict[str, int] = {}
+    for key, info in header.items():
+        if key == "__metadata__" or not isinstance(info, dict):
+            continue
+        count += 1
+        dtype = str(info.get("dtype", ""))
+        dtypes[dtype] = dtypes.get(dtype, 0) + 1
+        params += math.prod(info.get("shape") or [])
+        offsets = info.get("data_offsets") or [0, 0]
+        data_end = max(data_end, int(offsets[1]))
+    return {
+        "tensor_count": str(count),
+        "tensor_dtypes": ",".join(f"{d}:{n}" for d, n in sorted(dtypes.items())),
+        "parameter_count": str(params),
+        "tensor_bytes": str(data_end),
+    }
+
 
 class MetadataExtractorAgent:
     """Extract metadata from LoRA files."""
@@ -9,22 +79,31 @@ class MetadataExtractorAgent:
     def extract(self, filepath: Path, include_tensor_keys: bool = False) -> Dict[str, str]:
         """Extract basic metadata from a safetensors file.
 
+        The header is parsed by :func:`read_header`, so neither torch nor the
+        tensor data are loaded.
+
         Parameters
         ----------
         filepath:
             The safetensors file to read metadata from.
         include_tensor_keys:
-            Whether to include the list of tensor keys from the file. Disabled by
-            default as these can be very large.
+            Whether to include the list of tensor keys and their shapes from
+            the file. Disabled by default as these can be very large.
         """
         metadata = {"filename": filepath.name}
         try:
-            with safe_open(str(filepath), framework="pt") as f:
-                meta = f.metadata() or {}
-                metadata.update(meta)
-                if include_tensor_keys:
-                    keys = list(f.keys())
-                    metadata["tensor_keys"] = ",".join(keys)
+            header = read_header(filepath)
+            meta = header.get("__metadata__") or {}
+            metadata.update({k: str(v) for k, v in meta.items()})
+            metadata.update(summarize_tensors(header))
+            if include_tensor_keys:
+                tensors = {
+                    k: v for k, v in header.items() if k != "__metadata__"
+                }
+                metadata["tensor_keys"] = ",".join(tensors)
+                metadata["tensor_shapes"] = json.dumps(
+                    {k: v.get("shape") for k, v in tensors.items()}
+                )
         except Exception as exc:
             metadata["error"] = str(exc)
         return metadata
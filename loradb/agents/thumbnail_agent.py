@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List
+
+try:  # Pillow is optional, previews are served full size without it
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - depends on the environment
+    Image = None
+    ImageOps = None
+
+# Raised for previews Pillow cannot or will not decode. Unreadable files give
+# ``OSError`` (``UnidentifiedImageError`` is one); oversized ones give
+# ``DecompressionBombError``, which is not.
+IMAGE_ERRORS: tuple = (OSError,)
+if Image is not None:
+    IMAGE_ERRORS += (Image.DecompressionBombError,)
+
+import config
+from .indexing_agent import PREVIEW_EXTENSIONS
+
+_MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+class ThumbnailAgent:
+    """Create downscaled copies of preview images.
+
+    Every preview gets one thumbnail per width in ``config.THUMB_WIDTHS``,
+    stored as ``<thumb_dir>/<width>/<preview name>.<format>``. A thumbnail
+    older than its preview is considered stale and rebuilt. Without Pillow
+    no thumbnails are made and :py:meth:`thumbnail` returns ``None``.
+    """
+
+    def __init__(
+        self,
+        uploads_dir: Path | None = None,
+        thumb_dir: Path | None = None,
+        widths: Iterable[int] | None = None,
+        workers: int | None = None,
+    ) -> None:
+        self.uploads_dir = Path(uploads_dir or config.UPLOAD_DIR)
+        self.thumb_dir = Path(thumb_dir or config.THUMB_DIR)
+        self.widths = sorted(widths or config.THUMB_WIDTHS)
+        self.format = config.THUMB_FORMAT
+        self.workers = workers or config.THUMB_WORKERS
+        self._pool: ThreadPoolExecutor | None = None
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    @property
+    def media_type(self) -> str:
+        return _MEDIA_TYPES[self.format]
+
+    def path_for(self, name: str, width: int) -> Path:
+        """Return the thumbnail location of preview ``name`` at ``width``."""
+        return self.thumb_dir / str(width) / f"{name}.{self.format}"
+
+    def _is_fresh(self, name: str, source_mtime: int) -> bool:
+        for width in self.widths:
+            try:
+                if self.path_for(name, width).stat().st_mtime_ns < source_mtime:
+                    return False
+            except FileNotFoundError:
+                return False
+        return True
+
+    def generate(self, name: str) -> List[Path]:
+        """Write all thumbnails of preview ``name`` and return their paths.
+
+        Up-to-date thumbnails are kept. Returns an empty list without Pillow
+        or when the preview does not exist.
+        """
+        src = self.uploads_dir / name
+        if not self.available:
+            return []
+        try:
+            source_mtime = src.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
+        paths = [self.path_for(name, w) for w in self.widths]
+        if self._is_fresh(name, source_mtime):
+            return paths
+        with Image.open(src) as im:
+            image = ImageOps.exif_transpose(im)
+            if self.format == "jpeg" or image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGB" if self.format == "jpeg" else "RGBA")
+            # Scale down from the largest width so every step stays cheap
+            for width, dest in sorted(zip(self.widths, paths), reverse=True):
+                if image.width > width:
+                    height = max(1, round(image.height * width / image.width))
+                    image = image.resize((width, height), Image.LANCZOS)
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                # Unique name, concurrent requests may build the same thumbnail
+                fd, tmp = tempfile.mkstemp(
+                    prefix=f".{dest.name}.", suffix=".part", dir=dest.parent
+                )
+                try:
+                    with os.fdopen(fd, "wb") as fh:
+                        image.save(
+                            fh, format=self.format.upper(), quality=config.THUMB_QUALITY
+                        )
+                    os.replace(tmp, dest)
+                except BaseException:
+                    os.unlink(tmp)
+                    raise
+        return paths
+
+    def thumbnail(self, name: str, width: int) -> Path | None:
+        """Return the thumbnail of ``name`` at ``width``, building it if needed.
+
+        Returns ``None`` when thumbnails cannot be made.
+        """
+        if width not in self.widths or not self.available:
+            return None
+        try:
+            paths = self.generate(name)
+        except IMAGE_ERRORS:
+            # Not an image Pillow can read, or too large to decode safely
+            return None
+        return paths[self.widths.index(width)] if paths else None
+
+    def submit(self, names: Iterable[str]) -> None:
+        """Build thumbnails for ``names`` on background threads."""
+        if not self.available:
+            return
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="thumbs"
+                )
+            for name in names:
+                if Path(name).suffix.lower() not in PREVIEW_EXTENSIONS:
+                    continue
+                if name in self._pending:
+                    continue
+                self._pending.add(name)
+                self._pool.submit(self._run, name)
+
+    def _run(self, name: str) -> None:
+        try:
+            self.generate(name)
+        except IMAGE_ERRORS:
+            pass
+        finally:
+            with self._lock:
+                self._pending.discard(name)
+
+    def backfill(self) -> int:
+        """Schedule thumbnails for every preview that lacks them.
+
+        Returns the number of previews scheduled.
+        """
+        if not self.available or not self.uploads_dir.exists():
+            return 0
+        missing: List[str] = []
+        with os.scandir(self.uploads_dir) as it:
+            for entry in it:
+                if Path(entry.name).suffix.lower() not in PREVIEW_EXTENSIONS:
+                    continue
+                if not self._is_fresh(entry.name, entry.stat().st_mtime_ns):
+                    missing.append(entry.name)
+        self.submit(missing)
+        return len(missing)
+
+    def start_backfill(self) -> threading.Thread | None:
+        """Run :py:meth:`backfill` on a daemon thread and return it.
+
+        Scanning a large preview folder stats every file, which is kept off
+        the thread importing the application. Returns ``None`` without
+        Pillow.
+        """
+        if not self.available:
+            return None
+        thread = threading.Thread(target=self.backfill, name="thumbs-backfill", daemon=True)
+        thread.start()
+        return thread
+
+    def remove(self, names: Iterable[str]) -> None:
+        """Delete the thumbnails of previews ``names``."""
+        for name in names:
+            for width in self.widths:
+                self.path_for(name, width).unlink(missing_ok=True)
+
+    def join(self) -> None:
+        """Wait for all scheduled thumbnails (used by tests and shutdown)."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
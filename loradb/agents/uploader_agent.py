@@ -1,77 +1,559 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Iterable, List
-import tempfile
+from typing import Callable, Dict, Iterable, List
+import errno
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
 import shutil
 
+try:  # pragma: no cover - not available on Windows
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+try:  # Pillow is optional, archive members are then only sniffed
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on the environment
+    Image = None
+
 import config
 from .frontend_agent import FrontendAgent
+from .indexing_agent import PREVIEW_EXTENSIONS, IndexingAgent, file_sha256
+
+# ioctl request cloning the extents of one file into another (Linux)
+_FICLONE = 0x40049409
+
+_SESSION_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# Leading bytes of the preview formats accepted from archives
+_IMAGE_SIGNATURES = (b"\x89PNG\r\n\x1a\n", b"\xff\xd8\xff", b"GIF87a", b"GIF89a")
+
+
+class ArchiveLimitError(ValueError):
+    """Raised when a preview archive exceeds the configured size limits."""
+
+
+class DuplicateContentError(FileExistsError):
+    """Raised when an uploaded file is identical to a stored LoRA."""
+
+    def __init__(self, name: str, existing: str) -> None:
+        super().__init__(f"{name} is identical to {existing}")
+        self.name = name
+        self.existing = existing
+
+
+#: Ways of bringing an existing file into the library, in the order they are
+#: tried. ``"move"`` uses the same methods as ``"hardlink"`` and removes the
+#: source once the file is stored.
+IMPORT_STRATEGIES: Dict[str, tuple[str, ...]] = {
+    "copy": ("copy",),
+    "reflink": ("reflink", "copy"),
+    "hardlink": ("hardlink", "reflink", "copy"),
+    "move": ("hardlink", "reflink", "copy"),
+}
+
+
+def _ficlone(src_fd: int, dest_fd: int) -> None:
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported")
+    fcntl.ioctl(dest_fd, _FICLONE, src_fd)
+
+
+def clone_file(src: Path, dest: Path, method: str) -> None:
+    """Create ``dest`` from ``src`` without copying the data in Python.
+
+    ``"hardlink"`` adds a second name for the same inode. ``"reflink"`` tries
+    a copy-on-write clone and then ``copy_file_range``, which lets the kernel
+    share extents or copy server side. Raises ``OSError`` if the filesystem
+    supports neither.
+    """
+    if method == "hardlink":
+        os.link(src, dest)
+        return
+    if method != "reflink":
+        raise ValueError(f"Unknown clone method: {method}")
+    with open(src, "rb") as s, open(dest, "xb") as d:
+        try:
+            try:
+                _ficlone(s.fileno(), d.fileno())
+                return
+            except OSError:
+                if not hasattr(os, "copy_file_range"):
+                    raise
+            remaining = os.fstat(s.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(s.fileno(), d.fileno(), remaining)
+                if copied == 0:
+                    raise OSError(errno.EIO, "Short copy", str(src))
+                remaining -= copied
+        except OSError:
+            dest.unlink(missing_ok=True)
+            raise
+
+
+def place_file(
+    src: Path,
+    dest: Path,
+    strategy: str = "copy",
+    copy: Callable[[Path, Path], object] = shutil.copyfile,
+) -> str:
+    """Create ``dest`` from ``src`` with the first working method of ``strategy``.
+
+    The methods of ``strategy`` (see :py:data:`IMPORT_STRATEGIES`) are tried
+    in order. Every strategy ends with ``"copy"``, which calls
+    ``copy(src, dest)``. Returns the method used.
+    """
+    try:
+        methods = IMPORT_STRATEGIES[strategy]
+    except KeyError:
+        raise ValueError(f"Unknown import strategy: {strategy}") from None
+    for method in methods:
+        if method == "copy":
+            copy(src, dest)
+            return method
+        try:
+            clone_file(src, dest, method)
+        except OSError:
+            continue
+        return method
+    raise AssertionError("every strategy ends with copy")  # pragma: no cover
+
+
+def link_file(src: Path, dest: Path) -> str:
+    """Make ``dest`` share the data of ``src`` without copying it.
+
+    A reflink (copy-on-write clone) is tried first and a hardlink second.
+    Returns ``"reflink"`` or ``"hardlink"`` and raises ``OSError`` if the
+    filesystem supports neither.
+    """
+    try:
+        with open(src, "rb") as s, open(dest, "xb") as d:
+            _ficlone(s.fileno(), d.fileno())
+        return "reflink"
+    except OSError:
+        dest.unlink(missing_ok=True)
+    os.link(src, dest)
+    return "hardlink"
+
 
 class UploaderAgent:
-    """Handle uploading LoRA files and preview images."""
+    """Handle uploading LoRA files and preview images.
 
-    def __init__(self, upload_dir: Path | None = None, frontend: FrontendAgent | None = None) -> None:
+    When an ``indexer`` is set, LoRA files are hashed while they are written
+    and compared to the library. ``config.DEDUPE_MODE`` decides what happens
+    to identical content: ``"reject"`` refuses it, ``"link"`` stores it as a
+    reflink or hardlink of the existing file and ``"off"`` keeps a copy.
+    """
+
+    def __init__(
+        self,
+        upload_dir: Path | None = None,
+        frontend: FrontendAgent | None = None,
+        indexer: IndexingAgent | None = None,
+    ) -> None:
         self.upload_dir = Path(upload_dir or config.UPLOAD_DIR)
         self.upload_dir.mkdir(parents=True, exist_ok=True)
         self.frontend = frontend
+        self.indexer = indexer
+        # Guards the session state files; ``_finalizing`` holds the ids of
+        # sessions being hashed and stored, which happens outside the lock
+        self._session_lock = threading.Lock()
+        self._finalizing: set[str] = set()
+
+    @staticmethod
+    def _write_stream(fileobj, dest: Path) -> str:
+        """Copy ``fileobj`` to ``dest`` in chunks and flush it to disk.
+
+        Returns the hex SHA-256 of the written data. The caller renames
+        ``dest`` into place once it is done with it.
+        """
+        digest = hashlib.sha256()
+        with dest.open("wb") as out:
+            while True:
+                chunk = fileobj.read(config.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        return digest.hexdigest()
 
     def save_file(self, filename: str, fileobj) -> Path:
-        """Save a single file and return its path."""
+        """Save a single file and return its path.
+
+        The data is written to a temporary name next to the destination and
+        renamed once synced, so a crash never leaves a truncated file under
+        the final name. Identical content is handled according to
+        ``config.DEDUPE_MODE``; ``"reject"`` raises
+        :py:class:`DuplicateContentError`.
+        """
+        tmp, sha256 = self.stage_file(filename, fileobj)
+        try:
+            return self.store_staged(tmp, filename, sha256)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def stage_file(self, filename: str, fileobj) -> tuple[Path, str]:
+        """Write ``fileobj`` to a temporary file next to ``filename``.
+
+        Returns the temporary path and the SHA-256 of the data. Pass both to
+        :py:meth:`store_staged` to move the file into place.
+        """
+        tmp = self.upload_dir / f".{filename}.part"
+        try:
+            return tmp, self._write_stream(fileobj, tmp)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def stage_path(
+        self, src: Path, filename: str, strategy: str = "copy"
+    ) -> tuple[Path, str | None, str]:
+        """Stage the existing file ``src`` next to ``filename``.
+
+        ``src`` is placed with :py:func:`place_file`. Returns the temporary
+        path, the SHA-256 of the data and the method used. Only copies are hashed
+        while they are written; for linked files the hash is ``None`` and
+        :py:meth:`store_staged` computes it when a file of the same size
+        exists. ``src`` itself is never modified.
+        """
+        tmp = self.upload_dir / f".{filename}.part"
+        sha256 = None
+
+        def copy(src: Path, dest: Path) -> None:
+            nonlocal sha256
+            with src.open("rb") as fh:
+                _, sha256 = self.stage_file(filename, fh)
+
+        tmp.unlink(missing_ok=True)
+        method = place_file(src, tmp, strategy, copy=copy)
+        return tmp, sha256, method
+
+    def store_staged(self, src: Path, filename: str, sha256: str | None) -> Path:
+        """Move the fully written ``src`` to ``filename`` in the upload folder.
+
+        Identical content is handled according to ``config.DEDUPE_MODE``.
+        Without ``sha256`` the file is only hashed if a stored file has the
+        same size. ``src`` is left in place if it was not needed.
+        """
         dest = self.upload_dir / filename
-        with dest.open("wb") as f:
-            shutil.copyfileobj(fileobj, f)
+        existing = None
+        if self.indexer is not None and config.DEDUPE_MODE != "off":
+            size = src.stat().st_size
+            if sha256 is None and self.indexer.has_file_size(size, exclude=filename):
+                sha256 = file_sha256(src)
+            if sha256 is not None:
+                existing = self.indexer.find_duplicate(sha256, size, exclude=filename)
+        if existing is None:
+            self._move(src, dest)
+        elif config.DEDUPE_MODE == "reject":
+            raise DuplicateContentError(filename, existing)
+        else:
+            dest.unlink(missing_ok=True)
+            try:
+                link_file(self.upload_dir / existing, dest)
+            except OSError:
+                # Filesystem cannot share blocks, keep the copy
+                self._move(src, dest)
+        if self.indexer is not None and sha256 is not None:
+            self.indexer.set_file_hash(dest, sha256)
         return dest
 
+    @staticmethod
+    def _move(src: Path, dest: Path) -> None:
+        try:
+            os.replace(src, dest)
+        except OSError as exc:
+            if exc.errno != errno.EXDEV:
+                raise
+            shutil.move(str(src), str(dest))
+
     def save_files(self, files: Iterable) -> List[Path]:
         """Save multiple uploaded files.
 
         If a file with the exact same name already exists in the uploads
-        directory the upload is aborted by raising ``FileExistsError``.
+        directory the upload is aborted by raising ``FileExistsError``; the
+        same happens for duplicate content in ``"reject"`` mode. Files saved
+        earlier in the same call are removed again in that case.
         """
-        saved: List[Path] = []
-        seen: set[Path] = set()
+        files = list(files)
+        seen: set[str] = set()
         for file in files:
             name = Path(file.filename).name
-            dest = self.upload_dir / name
-            if dest.exists() or dest in seen:
+            if (self.upload_dir / name).exists() or name in seen:
                 raise FileExistsError(f"{name} already exists")
-            with dest.open("wb") as f:
-                shutil.copyfileobj(file.file, f)
-            saved.append(dest)
-            seen.add(dest)
+            seen.add(name)
+        saved: List[Path] = []
+        try:
+            for file in files:
+                saved.append(self.save_file(Path(file.filename).name, file.file))
+        except BaseException:
+            for path in saved:
+                path.unlink(missing_ok=True)
+                if self.indexer is not None:
+                    self.indexer.remove_metadata(path.name)
+            raise
         return saved
 
-    def save_preview_zip(self, zip_file) -> List[Path]:
-        """Save and extract a zip of preview images for a LoRA."""
+    # --- Resumable upload sessions ----------------------------------------
+    #
+    # A session preallocates ``<id>.part`` in ``config.STAGING_DIR`` and keeps
+    # its state in ``<id>.json`` next to it. The file is split into chunks of
+    # ``chunk_size`` bytes which may arrive in any order and concurrently;
+    # each is synced before it is recorded, so a session survives restarts.
+
+    def _session_paths(self, session_id: str) -> tuple[Path, Path]:
+        if not _SESSION_ID_RE.fullmatch(session_id):
+            raise KeyError(session_id)
+        staging = Path(config.STAGING_DIR)
+        return staging / f"{session_id}.part", staging / f"{session_id}.json"
+
+    def _load_session(self, session_id: str) -> Dict:
+        part, state = self._session_paths(session_id)
+        try:
+            return json.loads(state.read_text())
+        except FileNotFoundError:
+            raise KeyError(session_id) from None
+
+    @staticmethod
+    def _save_session(state_path: Path, session: Dict) -> None:
+        tmp = state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(session))
+        os.replace(tmp, state_path)
+
+    @staticmethod
+    def _session_status(session: Dict) -> Dict:
+        total = max(1, -(-session["size"] // session["chunk_size"]))
+        received = session["chunks"]
+        return {
+            "id": session["id"],
+            "filename": session["filename"],
+            "size": session["size"],
+            "chunk_size": session["chunk_size"],
+            "received": sum(c["length"] for c in received.values()),
+            "missing": [i for i in range(total) if str(i) not in received],
+        }
+
+    def create_session(
+        self, filename: str, size: int, chunk_size: int | None = None, sha256: str | None = None
+    ) -> Dict:
+        """Start a resumable upload of ``size`` bytes stored as ``filename``.
+
+        ``sha256`` optionally gives the expected hash of the whole file which
+        is checked by :py:meth:`finalize_session`. ``chunk_size`` may not
+        exceed ``config.UPLOAD_SESSION_MAX_CHUNK``. Returns the session status.
+        """
+        chunk_size = chunk_size or config.UPLOAD_CHUNK_SIZE
+        if size < 0 or chunk_size <= 0:
+            raise ValueError("invalid size")
+        if chunk_size > config.UPLOAD_SESSION_MAX_CHUNK:
+            raise ValueError(
+                f"chunk_size exceeds {config.UPLOAD_SESSION_MAX_CHUNK} bytes"
+            )
+        if (self.upload_dir / filename).exists():
+            raise FileExistsError(f"{filename} already exists")
+        self.purge_sessions()
+        staging = Path(config.STAGING_DIR)
+        staging.mkdir(parents=True, exist_ok=True)
+        session = {
+            "id": uuid.uuid4().hex,
+            "filename": filename,
+            "size": size,
+            "chunk_size": chunk_size,
+            "sha256": sha256.lower() if sha256 else None,
+            "chunks": {},
+        }
+        part, state = self._session_paths(session["id"])
+        with part.open("wb") as fh:
+            fh.truncate(size)
+        self._save_session(state, session)
+        return self._session_status(session)
+
+    def session_status(self, session_id: str) -> Dict:
+        """Return size, received bytes and missing chunk numbers of a session."""
+        return self._session_status(self._load_session(session_id))
+
+    def write_chunk(
+        self, session_id: str, offset: int, data: bytes, sha256: str | None = None
+    ) -> Dict:
+        """Write ``data`` at ``offset`` of the staged file.
+
+        ``offset`` must start a chunk and ``data`` must fill it. When the
+        client sends the chunk's ``sha256`` a mismatch raises ``ValueError``
+        and nothing is recorded. Rewriting a chunk is allowed until the
+        session is finalized.
+        """
+        part, state = self._session_paths(session_id)
+        with self._session_lock:
+            if session_id in self._finalizing:
+                raise ValueError("session is being finalized")
+        session = self._load_session(session_id)
+        chunk_size, size = session["chunk_size"], session["size"]
+        index, rest = divmod(offset, chunk_size)
+        if rest or offset < 0 or (offset >= size and size):
+            raise ValueError("offset does not start a chunk")
+        if len(data) != min(chunk_size, size - offset):
+            raise ValueError("chunk has the wrong length")
+        digest = hashlib.sha256(data).hexdigest()
+        if sha256 and sha256.lower() != digest:
+            raise ValueError("chunk checksum mismatch")
+        fd = os.open(part, os.O_WRONLY)
+        try:
+            os.pwrite(fd, data, offset)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        with self._session_lock:
+            session = self._load_session(session_id)
+            session["chunks"][str(index)] = {"length": len(data), "sha256": digest}
+            self._save_session(state, session)
+        return self._session_status(session)
+
+    def finalize_session(self, session_id: str) -> Path:
+        """Verify a complete session and move the file into the upload folder.
+
+        Raises ``ValueError`` if chunks are missing or the file does not match
+        the hash given on creation; the session is kept so the client can
+        resend data. The session is removed once the file is stored. Only
+        claiming the session holds the session lock, so other sessions keep
+        receiving chunks while a large file is hashed and stored.
+        """
+        part, state = self._session_paths(session_id)
+        with self._session_lock:
+            if session_id in self._finalizing:
+                raise ValueError("session is being finalized")
+            session = self._load_session(session_id)
+            status = self._session_status(session)
+            if status["missing"]:
+                raise ValueError(f"{len(status['missing'])} chunks missing")
+            self._finalizing.add(session_id)
+        try:
+            filename = session["filename"]
+            if (self.upload_dir / filename).exists():
+                raise FileExistsError(f"{filename} already exists")
+            sha256 = file_sha256(part)
+            if session["sha256"] and session["sha256"] != sha256:
+                raise ValueError("file checksum mismatch")
+            try:
+                dest = self.store_staged(part, filename, sha256)
+            finally:
+                part.unlink(missing_ok=True)
+                state.unlink(missing_ok=True)
+        finally:
+            with self._session_lock:
+                self._finalizing.discard(session_id)
+        return dest
+
+    def abort_session(self, session_id: str) -> None:
+        """Discard a session and its staged data."""
+        for path in self._session_paths(session_id):
+            path.unlink(missing_ok=True)
+
+    def purge_sessions(self, max_age: float | None = None) -> int:
+        """Remove sessions untouched for ``max_age`` seconds and return their count."""
+        max_age = config.UPLOAD_SESSION_TTL if max_age is None else max_age
+        staging = Path(config.STAGING_DIR)
+        if not staging.is_dir():
+            return 0
+        cutoff = time.time() - max_age
+        removed = 0
+        for state in staging.glob("*.json"):
+            try:
+                stale = state.stat().st_mtime < cutoff
+            except FileNotFoundError:
+                continue
+            if stale:
+                self.abort_session(state.stem)
+                removed += 1
+        return removed
+
+    def save_preview_zip(self, zip_file) -> List[Dict[str, str]]:
+        """Extract a zip of preview images for a LoRA.
+
+        Members are read straight from the uploaded (spooled) file and are
+        written, validated and thumbnailed on ``config.PREVIEW_ZIP_WORKERS``
+        threads. An archive with more than ``config.PREVIEW_ZIP_MAX_MEMBERS``
+        images or more than ``config.PREVIEW_ZIP_MAX_BYTES`` of uncompressed
+        images raises :py:class:`ArchiveLimitError` before anything is
+        written. Returns one result per member whose ``status`` is
+        ``"saved"`` (with the stored ``filename``), ``"skipped"`` for
+        non-images or ``"invalid"`` (with an ``error``).
+        """
         stem = Path(zip_file.filename).stem
-        extracted: List[Path] = []
-        with tempfile.TemporaryDirectory() as td:
-            temp_path = Path(td) / zip_file.filename
-            with open(temp_path, "wb") as f:
-                shutil.copyfileobj(zip_file.file, f)
-            with zipfile.ZipFile(temp_path) as zf:
-                index = 0
-                for info in zf.infolist():
-                    if info.is_dir():
-                        continue
-                    suffix = Path(info.filename).suffix.lower()
-                    if suffix not in {".png", ".jpg", ".jpeg", ".gif"}:
-                        continue
-                    if index == 0:
-                        dest_name = f"{stem}{suffix}"
-                    else:
-                        dest_name = f"{stem}_{index}{suffix}"
-                    dest = self.upload_dir / dest_name
-                    with zf.open(info) as src, dest.open("wb") as out:
-                        shutil.copyfileobj(src, out)
-                    extracted.append(dest)
-                    index += 1
+        results: List[Dict[str, str]] = []
+        jobs: List[tuple] = []
+        with zipfile.ZipFile(zip_file.file) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                result = {"name": info.filename}
+                results.append(result)
+                suffix = Path(info.filename).suffix.lower()
+                if suffix not in PREVIEW_EXTENSIONS:
+                    result["status"] = "skipped"
+                    continue
+                index = len(jobs)
+                dest_name = f"{stem}{suffix}" if index == 0 else f"{stem}_{index}{suffix}"
+                jobs.append((zf, info, self.upload_dir / dest_name, result))
+            if len(jobs) > config.PREVIEW_ZIP_MAX_MEMBERS:
+                raise ArchiveLimitError(
+                    f"Archive holds {len(jobs)} images, the limit is "
+                    f"{config.PREVIEW_ZIP_MAX_MEMBERS}"
+                )
+            # Declared sizes are binding: zipfile stops reading at them and
+            # fails the CRC check if the data was longer.
+            total = sum(info.file_size for _, info, _, _ in jobs)
+            if total > config.PREVIEW_ZIP_MAX_BYTES:
+                raise ArchiveLimitError(
+                    f"Archive expands to {total} bytes, the limit is "
+                    f"{config.PREVIEW_ZIP_MAX_BYTES}"
+                )
+            with ThreadPoolExecutor(max_workers=config.PREVIEW_ZIP_WORKERS) as pool:
+                list(pool.map(lambda job: self._extract_preview(*job), jobs))
+        extracted = [
+            self.upload_dir / r["filename"] for r in results if r["status"] == "saved"
+        ]
         if self.frontend:
-            self.frontend.refresh_preview_cache(stem)
-        return extracted
+            self.frontend.add_previews(extracted)
+        return results
+
+    def _extract_preview(
+        self, zf: zipfile.ZipFile, info: zipfile.ZipInfo, dest: Path, result: Dict
+    ) -> None:
+        """Write, check and thumbnail one archive member (worker thread)."""
+        tmp = dest.with_name(f".{dest.name}.part")
+        try:
+            with zf.open(info) as src, tmp.open("wb") as out:
+                head = src.read(8)
+                if not head.startswith(_IMAGE_SIGNATURES):
+                    raise ValueError("not a PNG, JPEG or GIF image")
+                out.write(head)
+                shutil.copyfileobj(src, out, config.UPLOAD_CHUNK_SIZE)
+            if Image is not None:
+                with Image.open(tmp) as im:
+                    im.verify()
+            os.replace(tmp, dest)
+        except Exception as exc:
+            tmp.unlink(missing_ok=True)
+            result.update(status="invalid", error=str(exc) or type(exc).__name__)
+            return
+        result.update(status="saved", filename=dest.name)
+        thumbnailer = getattr(self.frontend, "thumbnailer", None)
+        if thumbnailer is not None:
+            try:
+                thumbnailer.generate(dest.name)
+            except OSError:
+                pass
 
     def save_preview_files(self, stem: str, files: Iterable) -> List[Path]:
         """Save preview image ``files`` for the LoRA identified by ``stem``."""
@@ -79,7 +561,7 @@ class UploaderAgent:
         index = 0
         for file in files:
             suffix = Path(file.filename).suffix.lower()
-            if suffix not in {".png", ".jpg", ".jpeg", ".gif"}:
+            if suffix not in PREVIEW_EXTENSIONS:
                 continue
             if index == 0:
                 dest_name = f"{stem}{suffix}"
@@ -91,7 +573,7 @@ class UploaderAgent:
             extracted.append(dest)
             index += 1
         if self.frontend:
-            self.frontend.refresh_preview_cache(stem)
+            self.frontend.add_previews(extracted)
         return extracted
 
     def delete_lora(self, filename: str) -> None:
@@ -100,10 +582,13 @@ class UploaderAgent:
         if path.exists():
             path.unlink()
         stem = Path(filename).stem
-        for ext in [".png", ".jpg", ".jpeg", ".gif"]:
+        removed: List[str] = []
+        for ext in sorted(PREVIEW_EXTENSIONS):
             for p in self.upload_dir.glob(f"{stem}*{ext}"):
                 p.unlink(missing_ok=True)
+                removed.append(p.name)
         if self.frontend:
+            self.frontend.remove_previews(removed)
             self.frontend.invalidate_preview_cache(stem)
 
     def delete_preview(self, filename: str) -> None:
@@ -112,4 +597,4 @@ class UploaderAgent:
         if path.exists():
             path.unlink()
         if self.frontend:
-            self.frontend.invalidate_preview_cache(Path(filename).stem)
+            self.frontend.remove_previews([filename])
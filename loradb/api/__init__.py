@@ -1,24 +1,41 @@
-import random
 import re
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
 
-from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import APIRouter, Body, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse, Response
 
 import config
 
 from ..agents.frontend_agent import FrontendAgent
-from ..agents.indexing_agent import IndexingAgent
+from ..agents.indexing_agent import PREVIEW_EXTENSIONS, IndexingAgent, file_sha256
+from ..agents.ingest_agent import IngestAgent
 from ..agents.metadata_extractor_agent import MetadataExtractorAgent
-from ..agents.uploader_agent import UploaderAgent
+from ..agents.thumbnail_agent import ThumbnailAgent
+from ..agents.uploader_agent import ArchiveLimitError, UploaderAgent
 
 router = APIRouter()
 
 uploader = UploaderAgent()
 extractor = MetadataExtractorAgent()
 indexer = IndexingAgent()
-frontend = FrontendAgent(Path(uploader.upload_dir), Path(config.TEMPLATE_DIR))
+thumbnailer = ThumbnailAgent(uploader.upload_dir)
+frontend = FrontendAgent(
+    Path(uploader.upload_dir),
+    Path(config.TEMPLATE_DIR),
+    indexer=indexer,
+    thumbnailer=thumbnailer,
+)
 uploader.frontend = frontend
+uploader.indexer = indexer
+ingest = IngestAgent(indexer, extractor)
+# Previews stored before thumbnails existed or by ``bulk_import``
+thumbnailer.start_backfill()
+indexer.start_stats_reconciler()
 
 # Regular expression for valid LoRA filenames. Only allow alphanumerics,
 # dashes and underscores ending with the ``.safetensors`` extension. This
@@ -54,21 +71,263 @@ async def upload_wizard_form(request: Request):
 
 @router.post("/upload")
 async def upload(request: Request, files: list[UploadFile] = File(...)):
+    """Store uploaded files and queue them for indexing.
+
+    The response is sent once the files are synced to disk; metadata
+    extraction runs in the background and can be followed via ``/jobs``.
+    """
     try:
-        saved_paths = uploader.save_files(files)
+        saved_paths = await run_in_threadpool(uploader.save_files, files)
     except FileExistsError as exc:
         raise HTTPException(status_code=409, detail=str(exc))
     results = []
     for path in saved_paths:
-        meta = extractor.extract(Path(path))
-        indexer.add_metadata(meta)
-        results.append(meta)
+        job_id = await run_in_threadpool(ingest.submit, Path(path))
+        results.append({"filename": path.name, "job_id": job_id, "status": "queued"})
     # HTML uploads redirect to gallery
     if "text/html" in request.headers.get("accept", ""):
         return RedirectResponse(url="/grid", status_code=303)
     return results
 
 
+_CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+
+def _session_call(fn, *args, **kwargs):
+    """Run an upload session method mapping its errors to HTTP codes."""
+    try:
+        return fn(*args, **kwargs)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown upload session")
+    except FileExistsError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.post("/upload_sessions")
+async def create_upload_session(
+    filename: str = Form(...),
+    size: int = Form(...),
+    chunk_size: int | None = Form(None),
+    sha256: str | None = Form(None),
+):
+    """Start a resumable upload of a LoRA file."""
+    filename = _validate_filename(filename)
+    return _session_call(uploader.create_session, filename, size, chunk_size, sha256)
+
+
+@router.get("/upload_sessions/{session_id}")
+async def upload_session_status(session_id: str):
+    """Return received bytes and missing chunks of an upload session."""
+    return _session_call(uploader.session_status, session_id)
+
+
+@router.put("/upload_sessions/{session_id}")
+async def upload_session_chunk(request: Request, session_id: str):
+    """Store one chunk given by the ``Content-Range`` header.
+
+    Oversized chunks are refused before their body is read, and the body is
+    never read past the announced length.
+    """
+    match = _CONTENT_RANGE_RE.match(request.headers.get("content-range", ""))
+    if not match:
+        raise HTTPException(status_code=400, detail="Content-Range header required")
+    start, end = int(match.group(1)), int(match.group(2))
+    length = end - start + 1
+    if length > config.UPLOAD_SESSION_MAX_CHUNK:
+        raise HTTPException(status_code=413, detail="Chunk too large")
+    data = bytearray()
+    async for piece in request.stream():
+        data += piece
+        if len(data) > length:
+            break
+    if length != len(data):
+        raise HTTPException(status_code=400, detail="Content-Range does not match body")
+    return await run_in_threadpool(
+        _session_call,
+        uploader.write_chunk,
+        session_id,
+        start,
+        data,
+        request.headers.get("x-chunk-sha256"),
+    )
+
+
+@router.post("/upload_sessions/{session_id}/complete")
+async def complete_upload_session(session_id: str):
+    """Verify an upload session, store the file and queue it for indexing."""
+    path = await run_in_threadpool(_session_call, uploader.finalize_session, session_id)
+    job_id = await run_in_threadpool(ingest.submit, path)
+    return {"filename": path.name, "job_id": job_id, "status": "queued"}
+
+
+@router.delete("/upload_sessions/{session_id}")
+async def abort_upload_session(session_id: str):
+    """Discard an upload session."""
+    _session_call(uploader.abort_session, session_id)
+    return {"status": "ok"}
+
+
+def _etag(sha256: str | None, size: int, mtime_ns: int) -> str:
+    """Strong ETag from the content hash, weak one from the fingerprint."""
+    if sha256:
+        return f'"{sha256}"'
+    return f'W/"{size:x}-{mtime_ns:x}"'
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Evaluate ``If-None-Match`` and ``If-Modified-Since`` for a GET."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+# Files stored before hashes were recorded are hashed one at a time in the
+# background; ``_hashing`` holds the names already queued.
+_hash_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="download-hash")
+_hashing: set[str] = set()
+_hashing_lock = threading.Lock()
+
+
+def _hash_file(path: Path) -> None:
+    try:
+        indexer.set_file_hash(path, file_sha256(path))
+    except FileNotFoundError:
+        pass
+    finally:
+        with _hashing_lock:
+            _hashing.discard(path.name)
+
+
+def _queue_hash(path: Path) -> None:
+    """Hash ``path`` in the background unless that is already queued."""
+    with _hashing_lock:
+        if path.name in _hashing:
+            return
+        _hashing.add(path.name)
+    _hash_pool.submit(_hash_file, path)
+
+
+@router.api_route("/download/{filename}", methods=["GET", "HEAD"])
+async def download(request: Request, filename: str):
+    """Serve a LoRA file with ``Range`` and conditional request support.
+
+    The ETag is the SHA-256 of the content, also sent as
+    ``X-Content-SHA256``. Files uploaded before hashes were recorded get a
+    weak ETag from size and modification time and are hashed in the
+    background, so the response never waits for a full read of the file.
+    """
+    filename = _validate_filename(filename)
+    path = Path(config.UPLOAD_DIR) / filename
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    sha256 = indexer.get_file_hash(path)
+    if sha256 is None:
+        _queue_hash(path)
+    etag = _etag(sha256, st.st_size, st.st_mtime_ns)
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(st.st_mtime, usegmt=True),
+        "cache-control": "no-cache",
+    }
+    if sha256:
+        headers["x-content-sha256"] = sha256
+    if _not_modified(request, etag, st.st_mtime):
+        return Response(status_code=304, headers=headers)
+    # Starlette answers single and multi ``Range`` requests and ``If-Range``;
+    # servers offering the ``pathsend`` extension send the body zero-copy.
+    return FileResponse(
+        path,
+        headers=headers,
+        media_type="application/octet-stream",
+        filename=filename,
+        stat_result=st,
+    )
+
+
+def _manifest_entries(rows):
+    for row in rows:
+        row["etag"] = _etag(row["sha256"], row["size"], row["mtime_ns"])
+        row["last_modified"] = formatdate(row["mtime_ns"] / 1e9, usegmt=True)
+        row["url"] = f"/download/{row['filename']}"
+    return rows
+
+
+@router.get("/manifest")
+async def manifest():
+    """Return size, modification time, hash and ETag of every LoRA file."""
+    return _manifest_entries(indexer.file_manifest())
+
+
+@router.post("/manifest")
+async def manifest_for(filenames: list[str] = Body(..., embed=True)):
+    """Return manifest entries for the posted ``filenames``.
+
+    Names without a stored file are listed under ``missing``.
+    """
+    entries = _manifest_entries(indexer.file_manifest(filenames))
+    found = {e["filename"] for e in entries}
+    return {"files": entries, "missing": [f for f in filenames if f not in found]}
+
+
+@router.get("/related/{filename}")
+async def related(filename: str, limit: int = Query(10, ge=1, le=100)):
+    """Return LoRAs sharing the most categories with ``filename``."""
+    return indexer.related(_validate_filename(filename), limit)
+
+
+@router.get("/changes")
+async def changes(since: int = 0, limit: int = Query(1000, ge=1, le=10000)):
+    """Return LoRA files added, changed or deleted after sequence ``since``."""
+    entries, latest = indexer.changes(since, limit)
+    next_seq = entries[-1]["seq"] if entries else max(since, 0)
+    return {
+        "changes": entries,
+        "next": min(next_seq, latest),
+        "latest": latest,
+        "more": next_seq < latest,
+    }
+
+
+@router.get("/thumbs/{width}/{name}")
+async def thumb(width: int, name: str):
+    """Serve preview ``name`` downscaled to ``width`` pixels.
+
+    Missing thumbnails are built on request. Without Pillow the client is
+    redirected to the full size preview.
+    """
+    if Path(name).name != name or name.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    if Path(name).suffix.lower() not in PREVIEW_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    if width not in thumbnailer.widths:
+        raise HTTPException(status_code=404, detail="Unknown width")
+    if not (thumbnailer.uploads_dir / name).is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    path = await run_in_threadpool(thumbnailer.thumbnail, name, width)
+    if path is None:
+        return RedirectResponse(url=f"/uploads/{name}", status_code=307)
+    return FileResponse(
+        path,
+        media_type=thumbnailer.media_type,
+        headers={"cache-control": f"public, max-age={config.THUMB_MAX_AGE}"},
+    )
+
+
 @router.get("/upload_previews", response_class=HTMLResponse)
 async def upload_previews_form(request: Request, lora: str | None = None):
     """Form for uploading preview images or zip files.
@@ -87,40 +346,140 @@ async def upload_previews(
     files: list[UploadFile] = File(...),
     lora: str | None = Form(None),
 ):
+    results = None
     if len(files) == 1 and files[0].filename.lower().endswith(".zip") and lora is None:
         stem = Path(files[0].filename).stem
-        uploader.save_preview_zip(files[0])
+        try:
+            results = await run_in_threadpool(uploader.save_preview_zip, files[0])
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail="Invalid zip file")
+        except ArchiveLimitError as exc:
+            raise HTTPException(status_code=413, detail=str(exc))
     else:
         if not lora:
             return {"error": "missing lora"}
         stem = lora
-        uploader.save_preview_files(stem, files)
+        await run_in_threadpool(uploader.save_preview_files, stem, files)
     frontend.refresh_preview_cache(stem)
     if "text/html" in request.headers.get("accept", ""):
         return RedirectResponse(url="/grid", status_code=303)
+    if results is not None:
+        return {"status": "ok", "files": results}
     return {"status": "ok"}
 
 
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Return the state of a background upload job."""
+    job = ingest.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
+def _search_page(**kwargs):
+    """Run :py:meth:`IndexingAgent.search_page` mapping bad input to 400."""
+    try:
+        return indexer.search_page(**kwargs)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
 @router.get("/search")
-async def search(query: str, limit: int | None = None, offset: int = 0):
-    return indexer.search(query, limit=limit, offset=offset)
+async def search(
+    response: Response,
+    query: str,
+    limit: int | None = None,
+    offset: int = 0,
+    categories: bool = False,
+    sort: str = "relevance",
+    cursor: str | None = None,
+    architecture: str | None = None,
+    base_model: str | None = None,
+):
+    entries, next_cursor = _search_page(
+        query=query,
+        limit=limit,
+        offset=offset,
+        with_categories=categories,
+        sort=sort,
+        cursor=cursor,
+        architecture=architecture,
+        base_model=base_model,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return entries
+
+
+@router.get("/facets")
+async def facets(
+    q: str = "*",
+    category: int | None = None,
+    architecture: str | None = None,
+    base_model: str | None = None,
+    tag_limit: int = 20,
+):
+    """Return counts per architecture, base model, category and tag."""
+    return indexer.facets(
+        q or "*",
+        category_id=category,
+        architecture=architecture,
+        base_model=base_model,
+        tag_limit=tag_limit,
+    )
+
+
+@router.get("/suggest")
+async def suggest(q: str = "", limit: int = 10):
+    """Return model names, tags and categories starting with ``q``."""
+    return indexer.suggest(q, limit=limit)
+
+
+@router.get("/tags")
+async def tags(prefix: str = "", limit: int = 20):
+    """Return the most used tags, optionally only those starting with ``prefix``."""
+    if prefix:
+        return indexer.tag_autocomplete(prefix, limit=limit)
+    return indexer.top_tags(limit=limit)
+
+
+@router.get("/tags/loras")
+async def loras_by_tags(
+    tag: list[str] = Query(...), limit: int | None = None, offset: int = 0
+):
+    """Return LoRAs carrying every given ``tag``."""
+    return indexer.search_by_tags(tag, limit=limit, offset=offset)
 
 
 @router.get("/grid_data")
 async def grid_data(
-    q: str = "*", category: int | None = None, offset: int = 0, limit: int = 50
+    response: Response,
+    q: str = "*",
+    category: int | None = None,
+    offset: int = 0,
+    limit: int = 50,
+    sort: str = "relevance",
+    cursor: str | None = None,
+    architecture: str | None = None,
+    base_model: str | None = None,
 ):
     if not q:
         q = "*"
-    if category is not None:
-        entries = indexer.search_by_category(category, q, limit=limit, offset=offset)
-    else:
-        entries = indexer.search(q, limit=limit, offset=offset)
-    for e in entries:
-        e["categories"] = indexer.get_categories_for(e["filename"])
-        stem = Path(e.get("filename", "")).stem
-        previews = frontend._find_previews(stem)
-        e["preview_url"] = random.choice(previews) if previews else None
+    entries, next_cursor = _search_page(
+        query=q,
+        limit=limit,
+        offset=offset,
+        with_categories=True,
+        category_id=category,
+        sort=sort,
+        cursor=cursor,
+        architecture=architecture,
+        base_model=base_model,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    frontend.assign_preview_urls(entries)
     return entries
 
 
@@ -193,11 +552,10 @@ async def assign_categories(
     else:
         raise HTTPException(status_code=400, detail="missing category")
     cleaned = [_validate_filename(f) for f in files]
-    for fname in cleaned:
-        indexer.assign_category(fname, cid)
+    assigned = indexer.assign_many(cleaned, cid)
     if "text/html" in request.headers.get("accept", ""):
         return RedirectResponse(url="/grid", status_code=303)
-    return {"status": "ok"}
+    return {"status": "ok", "assigned": assigned}
 
 
 @router.post("/bulk_assign", response_class=HTMLResponse)
@@ -232,15 +590,23 @@ async def grid(request: Request):
     category = request.query_params.get("category")
     limit = int(request.query_params.get("limit", 50))
     offset = int(request.query_params.get("offset", 0))
+    sort = request.query_params.get("sort") or "relevance"
+    architecture = request.query_params.get("architecture") or None
+    base_model = request.query_params.get("base_model") or None
     categories = indexer.list_categories()
-    if category:
-        entries = indexer.search_by_category(
-            int(category), query, limit=limit, offset=offset
-        )
-    else:
-        entries = indexer.search(query, limit=limit, offset=offset)
-    for e in entries:
-        e["categories"] = indexer.get_categories_for(e["filename"])
+    filters = {
+        "category_id": int(category) if category else None,
+        "architecture": architecture,
+        "base_model": base_model,
+    }
+    entries, next_cursor = _search_page(
+        query=query,
+        limit=limit,
+        offset=offset,
+        with_categories=True,
+        sort=sort,
+        **filters,
+    )
     return frontend.render_grid(
         entries,
         query=query if query != "*" else "",
@@ -248,6 +614,10 @@ async def grid(request: Request):
         selected_category=category or "",
         limit=limit,
         user=request.state.user,
+        sort=sort,
+        next_cursor=next_cursor,
+        architecture=architecture or "",
+        base_model=base_model or "",
     )
 
 
@@ -259,8 +629,7 @@ async def detail(request: Request, filename: str):
     entry = indexer.get_entry(filename)
     if not entry:
         entry = {"filename": filename}
-    meta = extractor.extract(file_path)
-    entry["metadata"] = meta
+    entry["metadata"] = indexer.get_metadata(file_path)
     entry["categories"] = indexer.get_categories_with_ids(filename)
     categories = indexer.list_categories()
     return frontend.render_detail(entry, categories=categories, user=request.state.user)
@@ -285,6 +654,15 @@ async def delete_files(request: Request):
     return {"deleted": deleted}
 
 
+@router.get("/admin/metrics")
+async def admin_metrics():
+    """Return hit/miss/eviction counters of the in-process caches."""
+    return {
+        "preview_cache": frontend.preview_cache.stats(),
+        "metadata_cache": indexer.metadata_cache.stats(),
+    }
+
+
 @router.get("/admin/users", response_class=HTMLResponse)
 async def user_admin(request: Request):
     auth = request.app.state.auth
@@ -0,0 +1,82 @@
+import bisect
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+# Upper bound appended to a prefix to find the end of its range
+_MAX_CHAR = "\U0010ffff"
+
+
+class SuggestIndex:
+    """Sorted in-memory prefix index used for search box suggestions.
+
+    Every item is identified by ``(kind, ref)`` and has a display ``value``.
+    The folded value as well as each later word of it are stored as sorted
+    keys, so ``"eye"`` finds both ``"eyes"`` and ``"blue eyes"``. Lookups are
+    a binary search followed by a short range scan.
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, str, str]] = ()) -> None:
+        self._items: Dict[Tuple[str, str], str] = {}
+        self._keys: List[Tuple[str, str, str]] = []
+        self._lock = threading.Lock()
+        for kind, ref, value in items:
+            self._items[(kind, ref)] = value
+            self._keys.extend(self._tokens(kind, ref, value))
+        self._keys.sort()
+
+    @staticmethod
+    def _tokens(kind: str, ref: str, value: str) -> List[Tuple[str, str, str]]:
+        folded = value.casefold().strip()
+        if not folded:
+            return []
+        keys = {folded}
+        keys.update(folded.split()[1:])
+        return [(key, kind, ref) for key in keys]
+
+    def add(self, kind: str, ref: str, value: str) -> None:
+        """Add or update the item ``(kind, ref)``."""
+        with self._lock:
+            old = self._items.get((kind, ref))
+            if old == value:
+                return
+            if old is not None:
+                self._remove_keys(kind, ref, old)
+            self._items[(kind, ref)] = value
+            for key in self._tokens(kind, ref, value):
+                bisect.insort(self._keys, key)
+
+    def remove(self, kind: str, ref: str) -> None:
+        """Remove the item ``(kind, ref)`` if present."""
+        with self._lock:
+            old = self._items.pop((kind, ref), None)
+            if old is not None:
+                self._remove_keys(kind, ref, old)
+
+    def _remove_keys(self, kind: str, ref: str, value: str) -> None:
+        for key in self._tokens(kind, ref, value):
+            i = bisect.bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Tuple[str, str, str]]:
+        """Return up to ``limit`` ``(kind, ref, value)`` items matching ``prefix``."""
+        prefix = prefix.casefold().strip()
+        if not prefix:
+            return []
+        results: List[Tuple[str, str, str]] = []
+        seen = set()
+        with self._lock:
+            start = bisect.bisect_left(self._keys, (prefix,))
+            end = bisect.bisect_left(self._keys, (prefix + _MAX_CHAR,))
+            for i in range(start, end):
+                _, kind, ref = self._keys[i]
+                if (kind, ref) in seen:
+                    continue
+                seen.add((kind, ref))
+                results.append((kind, ref, self._items[(kind, ref)]))
+                if len(results) >= limit:
+                    break
+        return results
+
+    def __len__(self) -> int:
+        return len(self._items)
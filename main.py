@@ -9,7 +9,7 @@ from starlette.middleware.sessions import SessionMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 import config
-from loradb.api import indexer, extractor, frontend
+from loradb.api import indexer, frontend
 from loradb.api import router as api_router
 from loradb.auth import AuthManager
 
@@ -22,6 +22,7 @@ app.mount("/uploads", StaticFiles(directory=config.UPLOAD_DIR), name="uploads")
 UPLOAD_DIR = Path(config.UPLOAD_DIR)
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 env = Environment(loader=FileSystemLoader(config.TEMPLATE_DIR))
+env.filters["srcset"] = frontend.srcset
 
 app.include_router(api_router)
 
@@ -47,6 +48,8 @@ async def auth_middleware(request: Request, call_next):
     if (
         path.startswith("/static")
         or path.startswith("/uploads")
+        or path.startswith("/download")
+        or path.startswith("/thumbs")
         or path.startswith("/login")
         or path == "/showcase"
         or path.startswith("/showcase_detail")
@@ -69,6 +72,7 @@ async def auth_middleware(request: Request, call_next):
         "/delete_category",
         "/delete",
         "/admin/users",
+        "/admin/metrics",
     ]
     if any(path.startswith(p) for p in admin_paths) and user.get("role") != "admin":
         template = env.get_template("access_denied.html")
@@ -116,7 +120,7 @@ async def model_detail(request: Request, filename: str):
         raise HTTPException(status_code=404, detail="not found")
     file_path = Path(config.UPLOAD_DIR) / filename
     if file_path.exists():
-        entry["metadata"] = extractor.extract(file_path)
+        entry["metadata"] = indexer.get_metadata(file_path)
     previews = frontend._find_previews(Path(filename).stem)
     template = env.get_template("modeldetail.html")
     return template.render(
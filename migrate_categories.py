@@ -1,10 +1,13 @@
 from pathlib import Path
+from typing import Dict, List
+
 from loradb.agents import IndexingAgent
 
 
 def main() -> None:
     uploads = Path('loradb/uploads')
     indexer = IndexingAgent()
+    members: Dict[str, List[str]] = {}
     for txt in uploads.glob('*.txt'):
         stem = txt.stem
         lora_file = uploads / f'{stem}.safetensors'
@@ -14,8 +17,11 @@ def main() -> None:
             content = f.read()
         categories = [c.strip() for c in content.replace(',', '\n').splitlines() if c.strip()]
         for cat in categories:
-            cid = indexer.create_category(cat)
-            indexer.assign_category(lora_file.name, cid)
+            members.setdefault(cat, []).append(lora_file.name)
+    with indexer.batch():
+        ids = indexer.create_categories(members)
+        for cat, filenames in members.items():
+            indexer.assign_many(filenames, ids[cat])
     print('Migration complete')
 
 
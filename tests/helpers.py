@@ -0,0 +1,14 @@
+"""Test data shared by several test modules."""
+
+import json
+import struct
+
+
+def safetensors_bytes(title):
+    """Return a minimal ``.safetensors`` file whose metadata names ``title``."""
+    header = json.dumps({"__metadata__": {"modelspec.title": title}}).encode()
+    return struct.pack("<Q", len(header)) + header
+
+
+def write_safetensors(path, title):
+    path.write_bytes(safetensors_bytes(title))
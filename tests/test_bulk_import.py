@@ -0,0 +1,139 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+import bulk_import
+from loradb.agents.indexing_agent import IndexingAgent, file_sha256
+from loradb.agents.uploader_agent import UploaderAgent
+from tests.helpers import write_safetensors
+
+
+def _setup(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    monkeypatch.setattr(config, "UPLOAD_DIR", uploads)
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    write_safetensors(src / "a.safetensors", "A")
+    write_safetensors(src / "sub" / "b.safetensors", "B")
+    write_safetensors(src / "sub" / "a.safetensors", "Other A")
+    (tmp_path / "img" / "a").mkdir(parents=True)
+    (tmp_path / "img" / "a" / "1.png").write_bytes(b"png")
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    uploader = UploaderAgent(upload_dir=uploads, indexer=indexer)
+    return src, indexer, uploader
+
+
+def test_import_dry_run_writes_nothing(tmp_path, monkeypatch):
+    src, indexer, uploader = _setup(tmp_path, monkeypatch)
+    stats = bulk_import.import_loras(
+        src, tmp_path / "img", uploader, indexer, dry_run=True, journal=tmp_path / "j"
+    )
+    assert stats["imported"] == 2
+    assert stats["name_clashes"] == 1
+    assert stats["previews"] == 1
+    assert list(uploader.upload_dir.iterdir()) == []
+    assert not (tmp_path / "j").exists()
+
+
+def test_import_resumes_from_journal(tmp_path, monkeypatch):
+    src, indexer, uploader = _setup(tmp_path, monkeypatch)
+    journal = tmp_path / "j"
+    journal.write_text(json.dumps({"source": "a.safetensors", "status": "imported"}) + "\n")
+    stats = bulk_import.import_loras(
+        src,
+        tmp_path / "img",
+        uploader,
+        indexer,
+        {"b.safetensors": ["Cats"]},
+        batch_size=1,
+        journal=journal,
+    )
+    assert stats["resumed"] == 1
+    assert stats["imported"] == 1
+    assert [e["filename"] for e in indexer.search("*")] == ["b.safetensors"]
+    assert indexer.get_categories_for("b.safetensors") == ["Cats"]
+    assert not journal.exists()
+    assert "1/1" in bulk_import.format_progress(stats)
+
+
+def test_import_move_strategy_links_and_removes_sources(tmp_path, monkeypatch):
+    src, indexer, uploader = _setup(tmp_path, monkeypatch)
+    (src / "sub" / "a.safetensors").unlink()
+    stats = bulk_import.import_loras(
+        src, tmp_path / "img", uploader, indexer, journal=tmp_path / "j", strategy="move"
+    )
+    assert stats["imported"] == 2
+    assert stats["linked"] == 2
+    assert list(src.rglob("*.safetensors")) == []
+    assert not (tmp_path / "img" / "a" / "1.png").exists()
+    assert (uploader.upload_dir / "a.png").read_bytes() == b"png"
+    assert sorted(e["filename"] for e in indexer.search("*")) == [
+        "a.safetensors",
+        "b.safetensors",
+    ]
+
+
+def test_stage_path_hashes_copies_only(tmp_path, monkeypatch):
+    src, indexer, uploader = _setup(tmp_path, monkeypatch)
+    source = src / "a.safetensors"
+    tmp, sha256, method = uploader.stage_path(source, "a.safetensors")
+    assert (sha256, method) == (file_sha256(source), "copy")
+    assert tmp.read_bytes() == source.read_bytes()
+    tmp, sha256, method = uploader.stage_path(source, "a.safetensors", "hardlink")
+    assert (sha256, method) == (None, "hardlink")
+    assert tmp.stat().st_ino == source.stat().st_ino
+    with pytest.raises(ValueError):
+        uploader.stage_path(source, "a.safetensors", "symlink")
+
+
+def test_import_skips_names_already_stored(tmp_path, monkeypatch):
+    src, indexer, uploader = _setup(tmp_path, monkeypatch)
+    stored = uploader.upload_dir / "b.safetensors"
+    stored.write_bytes(b"stored")
+    indexer.add_metadata({"filename": stored.name}, stored)
+    stats = bulk_import.import_loras(
+        src, tmp_path / "img", uploader, indexer, journal=tmp_path / "j"
+    )
+    assert stats["existing"] == 1
+    assert stats["imported"] == 1
+    assert stored.read_bytes() == b"stored"
+
+
+def test_failed_import_can_be_resumed(tmp_path, monkeypatch):
+    src, indexer, uploader = _setup(tmp_path, monkeypatch)
+    (src / "sub" / "a.safetensors").unlink()
+    write_safetensors(src / "c.safetensors", "C")
+    add_metadata = indexer.add_metadata
+    calls = []
+
+    def failing(meta, path=None):
+        calls.append(meta["filename"])
+        if len(calls) == 2:
+            raise RuntimeError("disk full")
+        add_metadata(meta, path)
+
+    monkeypatch.setattr(indexer, "add_metadata", failing)
+    with pytest.raises(RuntimeError):
+        bulk_import.import_loras(
+            src, tmp_path / "img", uploader, indexer, batch_size=2, journal=tmp_path / "j"
+        )
+    assert not indexer._reindex_complete()
+    assert not [p for p in uploader.upload_dir.iterdir() if p.name.endswith(".part")]
+
+    monkeypatch.setattr(indexer, "add_metadata", add_metadata)
+    stats = bulk_import.import_loras(
+        src, tmp_path / "img", uploader, indexer, batch_size=2, journal=tmp_path / "j"
+    )
+    assert stats["existing"] == 0
+    assert stats["imported"] == 3
+    assert sorted(e["filename"] for e in indexer.search("*")) == [
+        "a.safetensors",
+        "b.safetensors",
+        "c.safetensors",
+    ]
+    assert indexer._reindex_complete()
@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from loradb.cache import LRUCache
+
+
+def test_lru_evicts_oldest_and_counts():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+
+
+def test_entry_ttl_expires():
+    cache = LRUCache(maxsize=10, ttl=60)
+    cache.put("missing", [], ttl=0.01)
+    cache.put("found", ["x"])
+    time.sleep(0.02)
+    assert cache.get("missing") is None
+    assert cache.get("found") == ["x"]
+    assert cache.stats()["expirations"] == 1
@@ -0,0 +1,65 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from loradb.agents.indexing_agent import IndexingAgent
+
+
+def _indexer(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    for name in ["a", "b", "c"]:
+        indexer.add_metadata({"filename": f"{name}.safetensors"})
+    return indexer
+
+
+def test_search_includes_categories(tmp_path):
+    indexer = _indexer(tmp_path)
+    animals = indexer.create_category("Animals")
+    cats = indexer.create_category("Cats")
+    indexer.assign_category("a.safetensors", cats)
+    indexer.assign_category("a.safetensors", animals)
+    indexer.assign_category("b.safetensors", animals)
+
+    entries = {e["filename"]: e for e in indexer.search("*", with_categories=True)}
+    assert entries["a.safetensors"]["categories"] == ["Animals", "Cats"]
+    assert entries["c.safetensors"]["categories"] == [IndexingAgent.NO_CATEGORY_NAME]
+
+    in_animals = indexer.search_by_category(animals, with_categories=True)
+    assert sorted(e["filename"] for e in in_animals) == ["a.safetensors", "b.safetensors"]
+
+    bulk = indexer.get_categories_for_many(["a.safetensors", "c.safetensors"])
+    assert bulk["a.safetensors"] == indexer.get_categories_for("a.safetensors")
+    assert bulk["c.safetensors"] == [IndexingAgent.NO_CATEGORY_NAME]
+
+
+def test_related_orders_by_shared_categories(tmp_path):
+    indexer = _indexer(tmp_path)
+    animals = indexer.create_category("Animals")
+    cats = indexer.create_category("Cats")
+    for name in ["a", "b", "c"]:
+        indexer.assign_category(f"{name}.safetensors", animals)
+    indexer.assign_category("a.safetensors", cats)
+    indexer.assign_category("c.safetensors", cats)
+
+    assert indexer.related("a.safetensors") == ["c.safetensors", "b.safetensors"]
+    assert indexer.related("a.safetensors", limit=1) == ["c.safetensors"]
+
+
+def test_bulk_category_writes(tmp_path):
+    indexer = _indexer(tmp_path)
+    ids = indexer.create_categories(["Cats", "Dogs", "Cats"])
+    assert sorted(ids) == ["Cats", "Dogs"]
+    assert indexer.create_category("Cats") == ids["Cats"]
+
+    names = ["a.safetensors", "b.safetensors", "c.safetensors"]
+    assert indexer.assign_many(names, ids["Cats"]) == 3
+    assert indexer.assign_many(names[:1], ids["Cats"]) == 0
+    assert indexer.unassign_many(["c.safetensors", "x.safetensors"], ids["Cats"]) == 1
+    assert indexer.move_between_categories(ids["Cats"], ids["Dogs"], ["a.safetensors"]) == 1
+
+    counts = {c["name"]: c["count"] for c in indexer.list_categories_with_counts()}
+    assert counts == {IndexingAgent.NO_CATEGORY_NAME: 1, "Cats": 1, "Dogs": 1}
+    assert indexer.move_between_categories(ids["Cats"], ids["Dogs"]) == 1
+    assert indexer.get_categories_for("b.safetensors") == ["Dogs"]
+    assert indexer.reconcile_stats() == {}
@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+from loradb.agents.indexing_agent import IndexingAgent
+
+
+def test_change_feed_keeps_latest_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_DIR", tmp_path / "uploads")
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    indexer.add_metadata({"filename": "a.safetensors"})
+    indexer.add_metadata({"filename": "b.safetensors"})
+    changes, latest = indexer.changes()
+    assert [c["filename"] for c in changes] == ["a.safetensors", "b.safetensors"]
+    assert latest == changes[-1]["seq"]
+
+    indexer.remove_metadata("a.safetensors")
+    changes, latest = indexer.changes(since=latest)
+    assert [(c["filename"], c["deleted"]) for c in changes] == [("a.safetensors", True)]
+
+    changes, _ = indexer.changes(limit=1)
+    assert [c["filename"] for c in changes] == ["b.safetensors"]
@@ -0,0 +1,357 @@
+import hashlib
+import os
+import sys
+import threading
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+pytest.importorskip("inotify_simple")
+from client import client as lazy
+from client.client import CacheManager, DownloadCancelled, LazyDownloader
+
+LAST_MODIFIED = "Sat, 17 Oct 2026 12:00:00 GMT"
+
+
+class BrokenStream(httpx.SyncByteStream):
+    """Body that sends ``data`` and then fails like a dropped connection."""
+
+    def __init__(self, data, hook=None):
+        self.data = data
+        self.hook = hook
+
+    def __iter__(self):
+        yield self.data
+        if self.hook is not None:
+            self.hook()
+            yield b"x" * 64
+        raise httpx.ReadError("connection reset")
+
+
+class FakeServer:
+    """In-memory stand-in for the ``/manifest``, ``/download`` and ``/changes`` routes."""
+
+    def __init__(self):
+        self.files = {}
+        self.hashed = set()
+        self.changes = []
+        self.requests = []
+        # name -> number of bytes after which the next transfer breaks off
+        self.break_after = {}
+        self.hooks = {}
+        # names whose next transfer sends damaged bytes
+        self.corrupt = set()
+
+    def add(self, name, data, hashed=True):
+        self.files[name] = data
+        if hashed:
+            self.hashed.add(name)
+
+    def __call__(self, request):
+        self.requests.append(request)
+        path = request.url.path
+        if path == "/manifest":
+            names = httpx.Response(200, content=request.content).json()["filenames"]
+            files = [
+                {
+                    "filename": n,
+                    "size": len(self.files[n]),
+                    "sha256": self._sha(n) if n in self.hashed else None,
+                }
+                for n in names
+                if n in self.files
+            ]
+            return httpx.Response(200, json={"files": files, "missing": []})
+        if path == "/changes":
+            since = int(request.url.params["since"])
+            latest = self.changes[-1]["seq"] if self.changes else 0
+            page = [c for c in self.changes if c["seq"] > since]
+            next_seq = page[-1]["seq"] if page else since
+            body = {
+                "changes": page,
+                "next": min(next_seq, latest),
+                "latest": latest,
+                "more": False,
+            }
+            return httpx.Response(200, json=body)
+        if path.startswith("/download/"):
+            return self._download(request, path.rsplit("/", 1)[1])
+        return httpx.Response(404)
+
+    def _sha(self, name):
+        return hashlib.sha256(self.files[name]).hexdigest()
+
+    def _download(self, request, name):
+        data = self.files[name]
+        headers = {"last-modified": LAST_MODIFIED}
+        if name in self.hashed:
+            headers["etag"] = f'"{self._sha(name)}"'
+            headers["x-content-sha256"] = self._sha(name)
+        status, start = 200, 0
+        if_range = request.headers.get("if-range")
+        wanted = request.headers.get("range")
+        if wanted and if_range in (headers.get("etag"), LAST_MODIFIED):
+            start = int(wanted.removeprefix("bytes=").rstrip("-"))
+            status = 206
+        body = data[start:]
+        if name in self.corrupt:
+            self.corrupt.discard(name)
+            body = bytes(b ^ 0xFF for b in body)
+        cut = self.break_after.pop(name, None)
+        hook = self.hooks.pop(name, None)
+        if cut is not None or hook is not None:
+            stream = BrokenStream(body[:cut], hook)
+            return httpx.Response(status, headers=headers, stream=stream)
+        return httpx.Response(status, headers=headers, content=body)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(lazy, "CHUNK_SIZE", 16)
+    monkeypatch.setattr(lazy.time, "sleep", lambda seconds: None)
+    return FakeServer()
+
+
+def _downloader(tmp_path, server, **kwargs):
+    data_dir = tmp_path / "mount"
+    data_dir.mkdir(exist_ok=True)
+    downloader = LazyDownloader("http://server", data_dir, **kwargs)
+    downloader.client = httpx.Client(transport=httpx.MockTransport(server))
+    return downloader
+
+
+def _download_requests(server):
+    return [r for r in server.requests if r.url.path.startswith("/download/")]
+
+
+@pytest.mark.parametrize("hashed", [True, False])
+def test_broken_transfer_resumes_with_range(tmp_path, server, hashed):
+    data = os.urandom(256)
+    server.add("a.safetensors", data, hashed=hashed)
+    server.break_after["a.safetensors"] = 96
+    downloader = _downloader(tmp_path, server)
+    lazy.make_placeholder(downloader.data_dir / "a.safetensors")
+
+    assert downloader.download("a.safetensors")
+    assert (downloader.data_dir / "a.safetensors").read_bytes() == data
+    first, second = _download_requests(server)
+    assert "range" not in first.headers
+    assert second.headers["range"] == "bytes=96-"
+    expected = f'"{hashlib.sha256(data).hexdigest()}"' if hashed else LAST_MODIFIED
+    assert second.headers["if-range"] == expected
+    assert downloader.cache.metrics()["cached_bytes"] == len(data)
+
+
+def test_checksum_mismatch_discards_partial_and_retries(tmp_path, server):
+    data = os.urandom(128)
+    server.add("a.safetensors", data)
+    downloader = _downloader(tmp_path, server)
+    partial = downloader.partial_dir / "a.safetensors"
+    # Bytes left over from an earlier version of the file
+    partial.write_bytes(b"stale")
+    with pytest.raises(ValueError):
+        downloader.download("a.safetensors")
+    assert _download_requests(server)[0].headers["range"] == "bytes=5-"
+    assert not partial.exists()
+    assert downloader.download("a.safetensors")
+    assert (downloader.data_dir / "a.safetensors").read_bytes() == data
+    assert "range" not in _download_requests(server)[1].headers
+
+    server.add("b.safetensors", data)
+    server.corrupt.add("b.safetensors")
+    with pytest.raises(ValueError):
+        downloader.download("b.safetensors")
+    assert not (downloader.partial_dir / "b.safetensors").exists()
+    assert downloader.download("b.safetensors")
+    assert (downloader.data_dir / "b.safetensors").read_bytes() == data
+
+
+def _cached(data_dir, name, size):
+    (data_dir / name).write_bytes(b"x" * size)
+
+
+def test_eviction_order_skips_open_and_pinned_files(tmp_path):
+    data_dir = tmp_path / "mount"
+    data_dir.mkdir()
+    for name in ("old", "pinned", "open", "new"):
+        _cached(data_dir, f"{name}.safetensors", 10)
+    cache = CacheManager(data_dir, budget_bytes=40, pinned=["pinned.safetensors"])
+    for index, name in enumerate(("pinned", "open", "old", "new")):
+        cache.files[f"{name}.safetensors"] = {"last_access": index, "opens": 1}
+    cache.opened("open.safetensors", local=True)
+    cache.files["open.safetensors"]["last_access"] = 0
+
+    assert cache.make_room() == 0
+    assert cache.make_room(incoming=15) == 2
+    sizes = {p.name: p.stat().st_size for p in data_dir.glob("*.safetensors")}
+    assert sizes == {
+        "old.safetensors": 0,
+        "new.safetensors": 0,
+        "pinned.safetensors": 10,
+        "open.safetensors": 10,
+    }
+    assert cache.metrics()["cached_bytes"] == 20
+    assert cache.counters["evictions"] == 2
+
+    cache.closed("open.safetensors")
+    cache.files["open.safetensors"]["last_access"] = 0
+    assert cache.make_room(incoming=30) == 1
+    assert (data_dir / "open.safetensors").stat().st_size == 0
+    assert cache.has_room(30) and not cache.has_room(31)
+
+
+def test_lfu_evicts_least_opened_first(tmp_path):
+    data_dir = tmp_path / "mount"
+    data_dir.mkdir()
+    _cached(data_dir, "busy.safetensors", 10)
+    _cached(data_dir, "rare.safetensors", 10)
+    cache = CacheManager(data_dir, budget_bytes=20, policy="lfu")
+    cache.files = {
+        "busy.safetensors": {"last_access": 0, "opens": 5},
+        "rare.safetensors": {"last_access": 9, "opens": 1},
+    }
+    assert cache.make_room(incoming=5) == 1
+    assert (data_dir / "rare.safetensors").stat().st_size == 0
+
+
+def _change(seq, name, size=10, deleted=False):
+    return {"seq": seq, "filename": name, "size": size, "deleted": deleted}
+
+
+def test_changes_are_applied_and_reset(tmp_path, server):
+    downloader = _downloader(tmp_path, server)
+    data_dir = downloader.data_dir
+    _cached(data_dir, "changed.safetensors", 10)
+    _cached(data_dir, "gone.safetensors", 10)
+    downloader.cache.rescan()
+    server.changes = [
+        _change(1, "new.safetensors"),
+        _change(2, "changed.safetensors", size=20),
+        _change(3, "gone.safetensors", deleted=True),
+        _change(4, "notes.txt"),
+    ]
+    assert downloader.sync() == 4
+    assert (data_dir / "new.safetensors").stat().st_size == 0
+    assert (data_dir / "changed.safetensors").stat().st_size == 0
+    assert not (data_dir / "gone.safetensors").exists()
+    assert downloader._load_seq() == 4
+    assert downloader.cache.metrics()["cached_bytes"] == 0
+
+    assert downloader.sync() == 0
+    # The server database was recreated with a lower sequence number
+    server.changes = [_change(1, "fresh.safetensors")]
+    assert downloader.sync() == 1
+    assert (data_dir / "fresh.safetensors").exists()
+    assert downloader._load_seq() == 1
+
+
+def test_same_size_replacement_is_found_by_checksum(tmp_path, server):
+    server.add("a.safetensors", b"first model")
+    downloader = _downloader(tmp_path, server)
+    path = downloader.data_dir / "a.safetensors"
+    lazy.make_placeholder(path)
+    assert downloader.download("a.safetensors")
+    unchanged = _change(1, "a.safetensors", size=11)
+    unchanged["sha256"] = server._sha("a.safetensors")
+    server.changes = [unchanged]
+    assert downloader.sync() == 1
+    assert path.read_bytes() == b"first model"
+
+    server.add("a.safetensors", b"other model")
+    replaced = _change(2, "a.safetensors", size=11)
+    replaced["sha256"] = server._sha("a.safetensors")
+    server.changes = [replaced]
+    assert downloader.sync() == 1
+    assert path.stat().st_size == 0
+    assert downloader.cache.checksum("a.safetensors") is None
+    assert downloader.download("a.safetensors")
+    assert path.read_bytes() == b"other model"
+
+
+def test_changes_to_a_running_download_wait_for_it(tmp_path, server):
+    server.add("a.safetensors", b"old model")
+    downloader = _downloader(tmp_path, server)
+    path = downloader.data_dir / "a.safetensors"
+    lazy.make_placeholder(path)
+    release = threading.Event()
+    fetch = downloader.download
+
+    def download(name, **kwargs):
+        release.wait(5)
+        return fetch(name, **kwargs)
+
+    downloader.download = download
+    future = downloader.schedule("a.safetensors")
+    server.changes = [_change(1, "a.safetensors", deleted=True)]
+    assert downloader.sync() == 1
+    assert downloader._load_seq() == 1
+    assert path.exists()
+
+    release.set()
+    assert future.result(timeout=5)
+    # Done callbacks have run once the workers exit
+    downloader.pool.shutdown(wait=True)
+    assert not path.exists()
+    assert downloader.cache.metrics()["cached_bytes"] == 0
+
+
+def test_foreground_download_cancels_prefetch(tmp_path, server):
+    data = os.urandom(256)
+    server.add("bg.safetensors", data)
+    server.add("fg.safetensors", b"foreground")
+    downloader = _downloader(tmp_path, server, prefetch={"related": False, "recent": 0})
+    prefetcher = downloader.prefetcher
+    lazy.make_placeholder(downloader.data_dir / "bg.safetensors")
+    lazy.make_placeholder(downloader.data_dir / "fg.safetensors")
+    started = []
+
+    def open_placeholder():
+        started.append(downloader.schedule("fg.safetensors"))
+
+    server.hooks["bg.safetensors"] = open_placeholder
+    server.break_after["bg.safetensors"] = 64
+    with pytest.raises(DownloadCancelled):
+        downloader.download(
+            "bg.safetensors", cancel=prefetcher.cancel, prefetch=True
+        )
+    assert started[0].result(timeout=5)
+    assert (downloader.data_dir / "fg.safetensors").read_bytes() == b"foreground"
+    assert (downloader.partial_dir / "bg.safetensors").stat().st_size == 64
+
+    # Once the foreground download is done the prefetch resumes
+    prefetcher._wait_for_foreground()
+    assert not prefetcher.cancel.is_set()
+    assert downloader.download("bg.safetensors", cancel=prefetcher.cancel, prefetch=True)
+    assert (downloader.data_dir / "bg.safetensors").read_bytes() == data
+    assert _download_requests(server)[-1].headers["range"] == "bytes=64-"
+
+
+class QueueDrained(Exception):
+    pass
+
+
+def test_prefetch_requeues_cancelled_download(tmp_path, server):
+    downloader = _downloader(tmp_path, server, prefetch={"related": False, "recent": 0})
+    prefetcher = downloader.prefetcher
+    calls = []
+
+    def download(name, **kwargs):
+        calls.append(name)
+        if len(calls) == 1:
+            raise DownloadCancelled(name)
+        return True
+
+    def next_item():
+        if not prefetcher.queue:
+            raise QueueDrained
+        return original()
+
+    original = prefetcher._next
+    downloader.download = download
+    prefetcher._next = next_item
+    prefetcher.add(["a.safetensors", "b.safetensors"])
+    with pytest.raises(QueueDrained):
+        prefetcher.run()
+    assert calls == ["a.safetensors", "a.safetensors", "b.safetensors"]
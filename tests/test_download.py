@@ -0,0 +1,77 @@
+import hashlib
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+import config
+import loradb.api as api
+import main
+from loradb.agents.indexing_agent import IndexingAgent
+
+client = TestClient(main.app)
+
+
+def _setup(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(config, "UPLOAD_DIR", uploads)
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    monkeypatch.setattr(api, "indexer", indexer)
+    data = bytes(range(256)) * 4
+    path = uploads / "dl.safetensors"
+    path.write_bytes(data)
+    indexer.add_metadata({"filename": path.name}, path)
+    return data
+
+
+def _wait_for_hashes():
+    # The hash pool has a single worker, so this runs after queued hashes
+    api._hash_pool.submit(lambda: None).result()
+
+
+def test_download_range_and_etag(tmp_path, monkeypatch):
+    data = _setup(tmp_path, monkeypatch)
+    resp = client.get("/download/dl.safetensors")
+    assert resp.status_code == 200
+    assert resp.content == data
+    assert resp.headers["etag"].startswith("W/")
+    assert "x-content-sha256" not in resp.headers
+
+    _wait_for_hashes()
+    resp = client.head("/download/dl.safetensors")
+    etag = resp.headers["etag"]
+    assert etag == f'"{hashlib.sha256(data).hexdigest()}"'
+    assert resp.headers["x-content-sha256"] == hashlib.sha256(data).hexdigest()
+
+    resp = client.get("/download/dl.safetensors", headers={"Range": "bytes=100-199"})
+    assert resp.status_code == 206
+    assert resp.content == data[100:200]
+
+    resp = client.get("/download/dl.safetensors", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    resp = client.get(
+        "/download/dl.safetensors",
+        headers={"If-Modified-Since": resp.headers["last-modified"]},
+    )
+    assert resp.status_code == 304
+    assert client.get("/download/missing.safetensors").status_code == 404
+
+
+def test_manifest_lists_hashes(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    [entry] = client.get("/manifest").json()
+    assert entry["filename"] == "dl.safetensors"
+    assert entry["sha256"] is None
+    assert entry["etag"].startswith("W/")
+
+    client.head("/download/dl.safetensors")
+    _wait_for_hashes()
+    resp = client.post(
+        "/manifest", json={"filenames": ["dl.safetensors", "gone.safetensors"]}
+    )
+    body = resp.json()
+    assert body["missing"] == ["gone.safetensors"]
+    assert body["files"][0]["etag"] == f'"{body["files"][0]["sha256"]}"'
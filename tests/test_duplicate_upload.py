@@ -20,3 +20,43 @@ def test_duplicate_lora_rejected(tmp_path):
     agent.save_files([DummyFile("model.safetensors")])
     with pytest.raises(FileExistsError):
         agent.save_files([DummyFile("model.safetensors")])
+
+
+def test_duplicate_content_rejected(tmp_path, monkeypatch):
+    import config
+    from loradb.agents.indexing_agent import IndexingAgent
+    from loradb.agents.uploader_agent import DuplicateContentError
+
+    uploads = tmp_path / "uploads"
+    monkeypatch.setattr(config, "UPLOAD_DIR", uploads)
+    monkeypatch.setattr(config, "DEDUPE_MODE", "reject")
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    agent = UploaderAgent(upload_dir=uploads, indexer=indexer)
+    [first] = agent.save_files([DummyFile("a.safetensors", b"same")])
+    indexer.add_metadata({"filename": "a.safetensors"}, first)
+    assert indexer.get_file_hash(first) is not None
+
+    with pytest.raises(DuplicateContentError) as exc:
+        agent.save_files(
+            [DummyFile("c.safetensors", b"other"), DummyFile("b.safetensors", b"same")]
+        )
+    assert exc.value.existing == "a.safetensors"
+    assert sorted(p.name for p in uploads.iterdir()) == ["a.safetensors"]
+
+
+def test_duplicate_content_linked(tmp_path, monkeypatch):
+    import config
+    from loradb.agents.indexing_agent import IndexingAgent
+
+    uploads = tmp_path / "uploads"
+    monkeypatch.setattr(config, "UPLOAD_DIR", uploads)
+    monkeypatch.setattr(config, "DEDUPE_MODE", "link")
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    # A file indexed before hashes were recorded is hashed on demand
+    uploads.mkdir()
+    (uploads / "a.safetensors").write_bytes(b"same")
+    indexer.add_metadata({"filename": "a.safetensors"}, uploads / "a.safetensors")
+    agent = UploaderAgent(upload_dir=uploads, indexer=indexer)
+    [copy] = agent.save_files([DummyFile("b.safetensors", b"same")])
+    assert copy.read_bytes() == b"same"
+    assert indexer.get_file_hash(copy) == indexer.get_file_hash(uploads / "a.safetensors")
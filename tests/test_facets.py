@@ -0,0 +1,62 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from loradb.agents.indexing_agent import IndexingAgent
+
+
+def _add(indexer, name, arch, base, title=""):
+    indexer.add_metadata(
+        {
+            "filename": f"{name}.safetensors",
+            "modelspec.title": title,
+            "modelspec.architecture": arch,
+            "ss_base_model_version": base,
+        }
+    )
+
+
+def test_facet_counts_and_filters(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    _add(indexer, "a", "lora", "sdxl", "cat")
+    _add(indexer, "b", "lora", "sd15", "cat")
+    _add(indexer, "c", "lycoris", "sdxl", "dog")
+    cid = indexer.create_category("Animals")
+    indexer.assign_category("a.safetensors", cid)
+
+    counts = indexer.facets()
+    assert counts["architecture"] == [
+        {"value": "lora", "count": 2},
+        {"value": "lycoris", "count": 1},
+    ]
+    assert {"id": 0, "value": "No Category", "count": 2} in counts["category"]
+
+    counts = indexer.facets("cat")
+    assert counts["base_model"] == [
+        {"value": "sd15", "count": 1},
+        {"value": "sdxl", "count": 1},
+    ]
+    assert counts["category"][0]["count"] == 1
+
+    found = indexer.search("*", architecture="lora", base_model="sdxl")
+    assert [e["filename"] for e in found] == ["a.safetensors"]
+
+
+def test_facet_counts_within_category(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    _add(indexer, "a", "lora", "sdxl", "cat")
+    _add(indexer, "b", "lora", "sd15", "cat")
+    _add(indexer, "c", "lycoris", "sdxl", "dog")
+    cid = indexer.create_category("Animals")
+    indexer.assign_category("a.safetensors", cid)
+    indexer.assign_category("c.safetensors", cid)
+
+    counts = indexer.facets(category_id=cid, tag_limit=0)
+    assert counts["base_model"] == [{"value": "sdxl", "count": 2}]
+    assert counts["category"] == [{"id": cid, "value": "Animals", "count": 2}]
+    assert counts["tag"] == []
+
+    counts = indexer.facets("cat", category_id=indexer.NO_CATEGORY_ID)
+    assert counts["architecture"] == [{"value": "lora", "count": 1}]
+    assert counts["category"] == [{"id": 0, "value": "No Category", "count": 1}]
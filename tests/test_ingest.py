@@ -0,0 +1,57 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+from loradb.agents.indexing_agent import IndexingAgent
+from loradb.agents.ingest_agent import IngestAgent
+from loradb.agents.uploader_agent import UploaderAgent
+from tests.helpers import safetensors_bytes
+
+
+class DummyUpload:
+    def __init__(self, filename, data):
+        self.filename = filename
+        self.file = io.BytesIO(data)
+
+
+def test_upload_is_indexed_in_background(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    monkeypatch.setattr(config, "UPLOAD_DIR", uploads)
+    monkeypatch.setattr(config, "UPLOAD_CHUNK_SIZE", 7)
+    uploader = UploaderAgent(uploads)
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    ingest = IngestAgent(indexer)
+
+    data = safetensors_bytes("Background")
+    [path] = uploader.save_files([DummyUpload("bg.safetensors", data)])
+    assert path.read_bytes() == data
+    assert list(uploads.iterdir()) == [path]
+
+    job_id = ingest.submit(path)
+    assert ingest.status(job_id)["filename"] == "bg.safetensors"
+    ingest.join()
+    assert ingest.status(job_id)["status"] == "done"
+    assert indexer.get_entry("bg.safetensors")["name"] == "Background"
+    assert ingest.status("missing") is None
+
+
+def test_index_is_marked_complete_once_the_queue_drains(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    ingest = IngestAgent(indexer)
+    path = tmp_path / "a.safetensors"
+    path.write_bytes(safetensors_bytes("A"))
+    assert indexer._reindex_complete()
+
+    ingest.submit(path)
+    ingest.join()
+    assert indexer._reindex_complete()
+
+    # A failed job leaves the mark for the reindex on the next start
+    ingest.extractor.extract = lambda path: 1 / 0
+    job_id = ingest.submit(path)
+    ingest.join()
+    assert ingest.status(job_id)["status"] == "failed"
+    assert not indexer._reindex_complete()
@@ -0,0 +1,34 @@
+import json
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from loradb.agents.metadata_extractor_agent import MetadataExtractorAgent
+
+
+def test_header_only_extract(tmp_path):
+    header = {
+        "__metadata__": {"modelspec.title": "Blossom"},
+        "a.weight": {"dtype": "F16", "shape": [4, 8], "data_offsets": [0, 64]},
+        "b.weight": {"dtype": "F32", "shape": [8], "data_offsets": [64, 96]},
+    }
+    raw = json.dumps(header).encode()
+    path = tmp_path / "Blossom.safetensors"
+    path.write_bytes(struct.pack("<Q", len(raw)) + raw + b"\0" * 96)
+
+    meta = MetadataExtractorAgent().extract(path, include_tensor_keys=True)
+    assert meta["modelspec.title"] == "Blossom"
+    assert meta["tensor_count"] == "2"
+    assert meta["tensor_dtypes"] == "F16:1,F32:1"
+    assert meta["parameter_count"] == "40"
+    assert meta["tensor_keys"] == "a.weight,b.weight"
+
+
+def test_invalid_file_reports_error(tmp_path):
+    path = tmp_path / "broken.safetensors"
+    path.write_bytes(b"\xff" * 4)
+    meta = MetadataExtractorAgent().extract(path)
+    assert meta["filename"] == "broken.safetensors"
+    assert "error" in meta
@@ -22,3 +22,24 @@ def test_preview_filtering(tmp_path):
     assert "/uploads/Mizuki.png" in previews
     assert "/uploads/Mizuki_18.png" in previews
     assert "/uploads/Mizuki_Furui_SDXL_10.png" not in previews
+
+
+def test_preview_index_lookup(tmp_path):
+    from loradb.agents.indexing_agent import IndexingAgent
+
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    (uploads / "Mizuki.png").write_text("a")
+    (uploads / "Mizuki_18.png").write_text("a")
+    (uploads / "Mizuki_Furui_SDXL_10.png").write_text("a")
+
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    indexer.rebuild_preview_index(uploads)
+    agent = FrontendAgent(uploads, Path("loradb/templates"), indexer=indexer)
+
+    previews = agent.find_previews_many(["Mizuki", "Mizuki_Furui_SDXL"])
+    assert previews["Mizuki"] == ["/uploads/Mizuki.png", "/uploads/Mizuki_18.png"]
+    assert previews["Mizuki_Furui_SDXL"] == ["/uploads/Mizuki_Furui_SDXL_10.png"]
+
+    agent.remove_previews(["Mizuki_18.png"])
+    assert agent._find_previews("Mizuki") == ["/uploads/Mizuki.png"]
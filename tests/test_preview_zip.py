@@ -0,0 +1,56 @@
+import io
+import os
+import sys
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import config
+from loradb.agents.uploader_agent import ArchiveLimitError, UploaderAgent
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+def _zip(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    buf.seek(0)
+    return SimpleNamespace(filename="Cat.zip", file=buf)
+
+
+def test_preview_zip_reports_each_member(tmp_path, monkeypatch):
+    monkeypatch.setattr("loradb.agents.uploader_agent.Image", None)
+    uploader = UploaderAgent(upload_dir=tmp_path)
+    upload = _zip(
+        {
+            "a.png": PNG + b"a",
+            "dir/b.jpg": b"\xff\xd8\xff" + b"b",
+            "fake.png": b"not an image",
+            "notes.txt": b"hi",
+        }
+    )
+    results = uploader.save_preview_zip(upload)
+    assert results == [
+        {"name": "a.png", "status": "saved", "filename": "Cat.png"},
+        {"name": "dir/b.jpg", "status": "saved", "filename": "Cat_1.jpg"},
+        {"name": "fake.png", "status": "invalid", "error": "not a PNG, JPEG or GIF image"},
+        {"name": "notes.txt", "status": "skipped"},
+    ]
+    assert (tmp_path / "Cat_1.jpg").read_bytes() == b"\xff\xd8\xffb"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["Cat.png", "Cat_1.jpg"]
+
+
+def test_preview_zip_limits(tmp_path, monkeypatch):
+    uploader = UploaderAgent(upload_dir=tmp_path)
+    monkeypatch.setattr(config, "PREVIEW_ZIP_MAX_MEMBERS", 1)
+    with pytest.raises(ArchiveLimitError):
+        uploader.save_preview_zip(_zip({"a.png": PNG, "b.png": PNG}))
+    monkeypatch.setattr(config, "PREVIEW_ZIP_MAX_MEMBERS", 10)
+    monkeypatch.setattr(config, "PREVIEW_ZIP_MAX_BYTES", 100)
+    with pytest.raises(ArchiveLimitError):
+        uploader.save_preview_zip(_zip({"a.png": PNG + bytes(200)}))
+    assert list(tmp_path.iterdir()) == []
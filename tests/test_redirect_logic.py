@@ -18,6 +18,7 @@ def setup_module(module):
     api.indexer.assign_category = lambda filename, cid: None
     api.indexer.unassign_category = lambda filename, cid: None
     api.indexer.create_category = lambda name: 1
+    api.indexer.assign_many = lambda filenames, cid: len(filenames)
 
 
 def test_assign_category_valid_redirect():
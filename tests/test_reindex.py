@@ -0,0 +1,58 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+from loradb.agents.indexing_agent import IndexingAgent
+from loradb.agents.metadata_extractor_agent import MetadataExtractorAgent
+from tests.helpers import write_safetensors
+
+
+def test_reindex_skips_unchanged_files(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(config, "UPLOAD_DIR", uploads)
+    write_safetensors(uploads / "a.safetensors", "A")
+    write_safetensors(uploads / "b.safetensors", "B")
+
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    assert indexer.lora_count() == 2
+
+    stats = indexer.reindex_all(batch_size=1)
+    assert stats["skipped"] == 2
+    assert stats["indexed"] == 0
+
+    (uploads / "b.safetensors").unlink()
+    write_safetensors(uploads / "c.safetensors", "C")
+    stats = indexer.reindex_all()
+    assert stats["indexed"] == 1
+    assert stats["removed"] == 1
+    names = sorted(e["filename"] for e in indexer.search("*"))
+    assert names == ["a.safetensors", "c.safetensors"]
+
+
+def test_metadata_served_from_cache(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(config, "UPLOAD_DIR", uploads)
+    path = uploads / "a.safetensors"
+    write_safetensors(path, "A")
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+
+    calls = []
+    original = MetadataExtractorAgent.extract
+
+    def counting_extract(self, filepath, include_tensor_keys=False):
+        calls.append(filepath)
+        return original(self, filepath, include_tensor_keys)
+
+    monkeypatch.setattr(MetadataExtractorAgent, "extract", counting_extract)
+    assert indexer.get_metadata(path)["modelspec.title"] == "A"
+    assert indexer.get_metadata(path)["modelspec.title"] == "A"
+    assert calls == []
+
+    write_safetensors(path, "Changed title")
+    assert indexer.get_metadata(path)["modelspec.title"] == "Changed title"
+    assert len(calls) == 1
+    assert indexer.get_entry("a.safetensors")["name"] == "Changed title"
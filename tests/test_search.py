@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from loradb.agents.indexing_agent import IndexingAgent
+
+
+def _indexer(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    indexer.add_metadata({"filename": "a.safetensors", "modelspec.title": "Zebra cat"})
+    indexer.add_metadata({"filename": "b.safetensors", "modelspec.title": "Apple"})
+    indexer.add_metadata(
+        {"filename": "c.safetensors", "modelspec.title": "Mango", "ss_tag_frequency": "cat"}
+    )
+    return indexer
+
+
+def test_name_title_ranks_above_tags(tmp_path):
+    indexer = _indexer(tmp_path)
+    names = [e["filename"] for e in indexer.search("cat")]
+    assert names == ["a.safetensors", "c.safetensors"]
+
+
+@pytest.mark.parametrize("sort", IndexingAgent.SORT_MODES)
+def test_cursor_pages_cover_all_rows(tmp_path, sort):
+    indexer = _indexer(tmp_path)
+    seen = []
+    cursor = None
+    while True:
+        entries, cursor = indexer.search_page("*", limit=1, sort=sort, cursor=cursor)
+        seen.extend(e["filename"] for e in entries)
+        if not cursor:
+            break
+    assert seen == [e["filename"] for e in indexer.search("*", sort=sort)]
+    if sort == "name":
+        assert seen == ["b.safetensors", "c.safetensors", "a.safetensors"]
+
+
+def test_cursor_must_match_sort(tmp_path):
+    indexer = _indexer(tmp_path)
+    _, cursor = indexer.search_page("*", limit=1, sort="name")
+    with pytest.raises(ValueError):
+        indexer.search_page("*", limit=1, sort="newest", cursor=cursor)
+
+
+@pytest.mark.parametrize("sort", ["newest", "name", "size"])
+def test_cursor_pages_seek_an_index(tmp_path, sort):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    with indexer.batch():
+        for i in range(5000):
+            indexer.add_metadata(
+                {"filename": f"{i}.safetensors", "modelspec.title": f"LoRA {i % 97}"}
+            )
+    _, cursor = indexer.search_page("*", limit=50, sort=sort)
+    sql, params = indexer._page_sql(
+        "*", 50, 0, True, None, sort, cursor, None, None
+    )
+    plan = " ".join(
+        r[-1] for r in indexer.conn.execute("EXPLAIN QUERY PLAN " + sql, params)
+    )
+    assert "TEMP B-TREE" not in plan
+    assert "SCAN" not in plan.replace("SCAN l VIRTUAL TABLE", "")
+    entries, _ = indexer.search_page("*", limit=50, sort=sort, cursor=cursor)
+    assert len(entries) == 50
+
+
+def test_readding_a_tagless_file_replaces_its_entry(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    indexer.add_metadata({"filename": "a.safetensors", "modelspec.title": "Old"})
+    indexer.add_metadata({"filename": "a.safetensors", "modelspec.title": "New"})
+    assert [e["name"] for e in indexer.search("*")] == ["New"]
+    assert indexer.search("Old") == []
@@ -0,0 +1,78 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import config
+from loradb.agents.indexing_agent import IndexingAgent
+from tests.helpers import write_safetensors
+
+
+def test_stats_follow_writes_and_reconcile(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(config, "UPLOAD_DIR", uploads)
+    write_safetensors(uploads / "a.safetensors", "A")
+    (uploads / "a.png").write_bytes(b"png")
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    size_a = (uploads / "a.safetensors").stat().st_size
+    assert indexer.lora_count() == 1
+    assert indexer.preview_count() == 1
+    assert indexer.storage_volume() == size_a
+
+    write_safetensors(uploads / "b.safetensors", "Bee")
+    indexer.add_metadata({"filename": "b.safetensors"}, uploads / "b.safetensors")
+    indexer.index_previews(["b.png", "b_1.png", "b.png"])
+    cat = indexer.create_category("Cats")
+    indexer.assign_category("a.safetensors", cat)
+    indexer.assign_category("b.safetensors", cat)
+    indexer.assign_category("b.safetensors", cat)
+    assert indexer.lora_count() == 2
+    assert indexer.preview_count() == 3
+    assert indexer.storage_volume() == size_a + (uploads / "b.safetensors").stat().st_size
+    assert indexer.top_categories()[0]["count"] == 2
+
+    indexer.remove_metadata("b.safetensors")
+    indexer.remove_previews(["b_1.png"])
+    indexer.unassign_category("b.safetensors", cat)
+    assert indexer.lora_count() == 1
+    assert indexer.preview_count() == 2
+    assert indexer.storage_volume() == size_a
+    assert indexer.top_categories()[0]["count"] == 1
+    assert indexer.reconcile_stats() == {}
+
+    # Files copied into the folder behind the index's back
+    (uploads / "c.png").write_bytes(b"png")
+    with indexer.batch():
+        indexer.conn.execute("UPDATE library_stats SET value = 99 WHERE key = 'loras'")
+    drift = indexer.reconcile_stats(rescan=True)
+    assert drift == {"loras": -98}
+    # The rescan drops b.png, which was never on disk, and finds c.png
+    assert indexer.preview_count() == 2
+
+
+def test_category_counts_track_uncategorized(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_DIR", tmp_path / "uploads")
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    for name in ("a", "b", "c"):
+        indexer.add_metadata({"filename": f"{name}.safetensors"})
+    cats = indexer.create_category("Cats")
+    dogs = indexer.create_category("Dogs")
+    indexer.assign_category("a.safetensors", cats)
+    indexer.assign_category("a.safetensors", dogs)
+    indexer.assign_category("b.safetensors", cats)
+
+    def counts():
+        return {c["name"]: c["count"] for c in indexer.list_categories_with_counts()}
+
+    assert counts() == {"No Category": 1, "Cats": 2, "Dogs": 1}
+    indexer.unassign_category("a.safetensors", dogs)
+    indexer.unassign_category("a.safetensors", dogs)
+    assert counts() == {"No Category": 1, "Cats": 2, "Dogs": 0}
+    indexer.delete_category(cats)
+    assert counts() == {"No Category": 3, "Dogs": 0}
+    indexer.remove_metadata("c.safetensors")
+    assert counts() == {"No Category": 2, "Dogs": 0}
+    assert indexer.category_count() == 2
+    assert indexer.top_categories()[0]["name"] == "No Category"
+    assert indexer.reconcile_stats() == {}
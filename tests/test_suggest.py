@@ -0,0 +1,30 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from loradb.agents.indexing_agent import IndexingAgent
+from loradb.suggest import SuggestIndex
+
+
+def test_prefix_matches_later_words():
+    index = SuggestIndex([("tag", "blue eyes", "blue eyes"), ("tag", "eyeliner", "eyeliner")])
+    assert [v for _, _, v in index.complete("eye")] == ["eyeliner", "blue eyes"]
+    index.remove("tag", "eyeliner")
+    assert [v for _, _, v in index.complete("eye")] == ["blue eyes"]
+
+
+def test_indexer_keeps_suggestions_in_sync(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    indexer.add_metadata({"filename": "a.safetensors", "modelspec.title": "Blossom"})
+    assert indexer.suggest("blo") == [
+        {"type": "model", "value": "Blossom", "filename": "a.safetensors"}
+    ]
+    indexer.add_metadata({"filename": "b.safetensors", "ss_tag_frequency": "blonde"})
+    cid = indexer.create_category("Blue")
+    assert {s["value"] for s in indexer.suggest("bl")} == {"Blossom", "blonde", "Blue"}
+
+    indexer.remove_metadata("a.safetensors")
+    indexer.remove_metadata("b.safetensors")
+    indexer.delete_category(cid)
+    assert indexer.suggest("bl") == []
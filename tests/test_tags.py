@@ -0,0 +1,39 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from loradb.agents.indexing_agent import IndexingAgent, parse_tag_frequency
+
+
+def _freq(**datasets):
+    return json.dumps(datasets)
+
+
+def test_parse_tag_frequency_merges_datasets():
+    raw = _freq(set_a={"Cat": 2, " blue eyes": 1}, set_b={"cat": 3})
+    assert parse_tag_frequency(raw) == {"cat": 5, "blue eyes": 1}
+    assert parse_tag_frequency("cat, dog") == {"cat": 1, "dog": 1}
+
+
+def test_tag_queries(tmp_path):
+    indexer = IndexingAgent(db_path=tmp_path / "index.db")
+    indexer.add_metadata(
+        {"filename": "a.safetensors", "ss_tag_frequency": _freq(x={"cat": 4, "blue eyes": 1})}
+    )
+    indexer.add_metadata(
+        {"filename": "b.safetensors", "ss_tag_frequency": _freq(x={"cat": 1, "dog": 2})}
+    )
+
+    assert indexer.get_entry("a.safetensors")["tags"] == "cat, blue eyes"
+    assert indexer.top_tags(1) == [{"tag": "cat", "loras": 2, "count": 5}]
+    assert [t["tag"] for t in indexer.tag_autocomplete("b")] == ["blue eyes"]
+    found = indexer.search_by_tags(["cat", "dog"])
+    assert [e["filename"] for e in found] == ["b.safetensors"]
+
+    indexer.remove_metadata("b.safetensors")
+    assert indexer.top_tags(5) == [
+        {"tag": "blue eyes", "loras": 1, "count": 1},
+        {"tag": "cat", "loras": 1, "count": 4},
+    ]
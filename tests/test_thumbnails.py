@@ -0,0 +1,94 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+import loradb.api as api
+import main
+from loradb.agents import thumbnail_agent
+from loradb.agents.frontend_agent import FrontendAgent
+from loradb.agents.thumbnail_agent import ThumbnailAgent
+
+client = TestClient(main.app)
+
+
+def _thumbnailer(tmp_path):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    return ThumbnailAgent(uploads, tmp_path / "thumbs", widths=(64, 128))
+
+
+def test_srcset_lists_all_widths(tmp_path):
+    thumbs = _thumbnailer(tmp_path)
+    agent = FrontendAgent(thumbs.uploads_dir, tmp_path, thumbnailer=thumbs)
+    assert agent.srcset("/uploads/a_1.png") == (
+        "/thumbs/64/a_1.png 64w, /thumbs/128/a_1.png 128w"
+    )
+    assert agent.srcset("/uploads/a b,1.png") == (
+        "/thumbs/64/a%20b%2C1.png 64w, /thumbs/128/a%20b%2C1.png 128w"
+    )
+    assert agent.srcset(None) == ""
+    assert FrontendAgent(thumbs.uploads_dir, tmp_path).srcset("/uploads/a.png") == ""
+
+
+def test_thumbnails_are_generated_and_refreshed(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    thumbs = _thumbnailer(tmp_path)
+    Image.new("RGB", (400, 200), "red").save(thumbs.uploads_dir / "a.png")
+    small, large = thumbs.generate("a.png")
+    with Image.open(small) as im:
+        assert im.size == (64, 32)
+    with Image.open(large) as im:
+        assert im.size == (128, 64)
+    assert thumbs.backfill() == 0
+    os.utime(small, ns=(0, 0))
+    assert thumbs.backfill() == 1
+    thumbs.join()
+    os.utime(large, ns=(0, 0))
+    thumbs.start_backfill().join()
+    thumbs.join()
+    assert large.stat().st_mtime_ns > 0
+    assert thumbs.backfill() == 0
+    thumbs.remove(["a.png"])
+    assert not small.exists() and not large.exists()
+
+
+def test_thumb_route_falls_back_without_pillow(tmp_path, monkeypatch):
+    thumbs = _thumbnailer(tmp_path)
+    (thumbs.uploads_dir / "a.png").write_bytes(b"png")
+    monkeypatch.setattr(api, "thumbnailer", thumbs)
+    monkeypatch.setattr(thumbnail_agent, "Image", None)
+    resp = client.get("/thumbs/64/a.png", follow_redirects=False)
+    assert resp.status_code == 307
+    assert resp.headers["location"] == "/uploads/a.png"
+    assert client.get("/thumbs/100/a.png").status_code == 404
+    assert client.get("/thumbs/64/missing.png").status_code == 404
+    assert client.get("/thumbs/64/a.txt").status_code == 400
+
+
+def test_thumb_route_redirects_for_unreadable_previews(tmp_path, monkeypatch):
+    Image = pytest.importorskip("PIL.Image")
+    thumbs = _thumbnailer(tmp_path)
+    (thumbs.uploads_dir / "broken.png").write_bytes(b"\x89PNG\r\n\x1a\nnope")
+    Image.new("RGB", (64, 64)).save(thumbs.uploads_dir / "huge.png")
+    monkeypatch.setattr(api, "thumbnailer", thumbs)
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 10)
+    for name in ("broken.png", "huge.png"):
+        resp = client.get(f"/thumbs/64/{name}", follow_redirects=False)
+        assert resp.status_code == 307
+        assert resp.headers["location"] == f"/uploads/{name}"
+
+
+def test_concurrent_generation_uses_separate_temp_files(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    thumbs = _thumbnailer(tmp_path)
+    Image.new("RGB", (400, 200), "blue").save(thumbs.uploads_dir / "a.png")
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: thumbs.generate("a.png"), range(8)))
+    assert all(r == results[0] for r in results)
+    leftovers = [p for p in thumbs.thumb_dir.rglob("*") if p.name.endswith(".part")]
+    assert leftovers == []
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["TESTING"] = "1"
+import config
+import main
+from loradb.agents.uploader_agent import UploaderAgent
+
+client = TestClient(main.app)
+
+
+def test_chunks_resume_out_of_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "STAGING_DIR", tmp_path / "staging")
+    agent = UploaderAgent(upload_dir=tmp_path / "uploads")
+    data = os.urandom(10)
+    session = agent.create_session(
+        "big.safetensors", len(data), chunk_size=4, sha256=hashlib.sha256(data).hexdigest()
+    )
+    sid = session["id"]
+    assert session["missing"] == [0, 1, 2]
+
+    agent.write_chunk(sid, 8, data[8:])
+    with pytest.raises(ValueError):
+        agent.write_chunk(sid, 0, data[:4], sha256="0" * 64)
+    with pytest.raises(ValueError):
+        agent.finalize_session(sid)
+
+    # A new agent picks the session up from the staging directory
+    agent = UploaderAgent(upload_dir=tmp_path / "uploads")
+    agent.write_chunk(sid, 0, data[:4], sha256=hashlib.sha256(data[:4]).hexdigest())
+    assert agent.session_status(sid)["missing"] == [1]
+    agent.write_chunk(sid, 4, data[4:8])
+
+    path = agent.finalize_session(sid)
+    assert path.read_bytes() == data
+    assert list((tmp_path / "staging").iterdir()) == []
+    with pytest.raises(KeyError):
+        agent.session_status(sid)
+
+
+def test_finalize_does_not_block_other_sessions(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "STAGING_DIR", tmp_path / "staging")
+    agent = UploaderAgent(upload_dir=tmp_path / "uploads")
+    first = agent.create_session("a.safetensors", 4, chunk_size=4)["id"]
+    second = agent.create_session("b.safetensors", 4, chunk_size=4)["id"]
+    agent.write_chunk(first, 0, b"aaaa")
+    seen = []
+
+    def hash_while_writing(path):
+        if not seen:
+            # Runs while ``first`` is finalized
+            seen.append(agent.write_chunk(second, 0, b"bbbb")["missing"])
+            with pytest.raises(ValueError):
+                agent.write_chunk(first, 0, b"aaaa")
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+
+    monkeypatch.setattr("loradb.agents.uploader_agent.file_sha256", hash_while_writing)
+    assert agent.finalize_session(first).read_bytes() == b"aaaa"
+    assert seen == [[]]
+    assert agent.finalize_session(second).read_bytes() == b"bbbb"
+
+
+def test_oversized_chunks_are_refused(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "STAGING_DIR", tmp_path / "staging")
+    monkeypatch.setattr(config, "UPLOAD_SESSION_MAX_CHUNK", 8)
+    agent = UploaderAgent(upload_dir=tmp_path / "uploads")
+    with pytest.raises(ValueError):
+        agent.create_session("big.safetensors", 100, chunk_size=9)
+    resp = client.put(
+        "/upload_sessions/" + "0" * 32,
+        content=b"x" * 9,
+        headers={"Content-Range": "bytes 0-8/100"},
+    )
+    assert resp.status_code == 413